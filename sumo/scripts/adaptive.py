@@ -1,16 +1,9 @@
-import os
-import sys
 import csv
 from pathlib import Path
 
-if "SUMO_HOME" not in os.environ:
-    sys.exit("ERROR: Please set SUMO_HOME (e.g., export SUMO_HOME=/usr/share/sumo)")
+from sumo_backend import load_traci, start_sumo
 
-tools = os.path.join(os.environ["SUMO_HOME"], "tools")
-sys.path.append(tools)
-
-import traci
-from sumolib import checkBinary
+traci = load_traci()
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 SUMO_CFG = str(BASE_DIR / "intersection.sumocfg")
@@ -35,8 +28,7 @@ def get_total_queue(lane_ids):
 
 
 def main():
-    sumoBinary = checkBinary("sumo")  # use "sumo-gui" if you want to watch
-    traci.start([sumoBinary, "-c", SUMO_CFG])
+    start_sumo(traci, SUMO_CFG)  # gui=True here and in load_traci() to watch
 
     # Lanes controlled by TLS (auto-detected)
     controlled_lanes = sorted(set(traci.trafficlight.getControlledLanes(TLS_ID)))
@@ -0,0 +1,132 @@
+import os, sys, subprocess, time
+from pathlib import Path
+
+# Steps/sec of traci (TCP) vs libsumo (in-process) on intersection.sumocfg.
+#
+# Each backend runs in its own process (libsumo keeps one simulation per
+# process) for each workload, at each demand scale (sumo --scale):
+#   step  - simulationStep() only, the floor for any controller
+#   poll  - simulationStep() + the calls full_adaptive_4way_2_ambulance_log.py
+#           used to make every step: log_row() queues + departed/arrived, the
+#           gap-out queue, the phase, and find_ambulance_request()
+#   obs   - the same reads from an Observation (subscriptions) instead
+#   track - Observation + EmergencyTracker instead of the per-vehicle scan
+#
+#   python bench_backend.py            # both backends, all workloads
+#   python bench_backend.py 3          # best of 3 runs each
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+SUMO_CFG = str(BASE_DIR / "intersection.sumocfg")
+
+TLS_ID = "J0"
+SIM_SECONDS = 900
+BACKENDS = ("traci", "libsumo")
+WORKLOADS = ("step", "poll", "obs", "track")
+SCALES = (1, 6)   # x6 ~ 2,800 vehicles/h departing, as many as the entries can take
+REPEATS = 1
+
+LANES = {
+    "N": ["north_in_0", "north_in_1"],
+    "E": ["east_in_0", "east_in_1"],
+    "S": ["south_in_0", "south_in_1"],
+    "W": ["west_in_0", "west_in_1"],
+}
+EMERGENCY_TYPE_ID = "ambulance"
+EMERGENCY_DIST = 200
+
+
+def find_ambulance(traci):
+    for vid in traci.vehicle.getIDList():
+        if traci.vehicle.getTypeID(vid) != EMERGENCY_TYPE_ID:
+            continue
+        lane_id = traci.vehicle.getLaneID(vid)
+        traci.vehicle.getLanePosition(vid)
+        traci.lane.getLength(lane_id)
+
+
+def poll(traci):
+    # log_row()
+    q = {d: sum(traci.lane.getLastStepHaltingNumber(l) for l in LANES[d]) for d in LANES}
+    traci.simulation.getDepartedNumber()
+    traci.simulation.getArrivedNumber()
+    # gap-out queue(dir_key) + current_green_direction()
+    sum(traci.lane.getLastStepHaltingNumber(l) for l in LANES["N"])
+    traci.trafficlight.getPhase(TLS_ID)
+    find_ambulance(traci)
+    return q
+
+
+def observe(obs):
+    q = {d: obs.queue(d) for d in LANES}
+    obs.departed, obs.arrived, obs.queue("N"), obs.phase
+    find_ambulance(obs.traci)
+    return q
+
+
+def track(obs, emergency):
+    q = {d: obs.queue(d) for d in LANES}
+    obs.departed, obs.arrived, obs.queue("N"), obs.phase
+    emergency.closest_request()
+    return q
+
+
+def child(workload, scale):
+    """Run one simulation in this process, print steps/sec on the last line."""
+    from sumo_backend import load_traci, start_sumo
+    from observation import Observation
+    from emergency import EmergencyTracker
+
+    traci = load_traci()
+    start_sumo(traci, SUMO_CFG, extra_args=["--no-step-log", "--summary-output", os.devnull,
+                                            "--scale", str(scale)])
+    obs = Observation(traci, TLS_ID, LANES)
+    emergency = EmergencyTracker(obs, EMERGENCY_TYPE_ID, EMERGENCY_DIST)
+    t0 = time.perf_counter()
+    if workload in ("obs", "track"):
+        obs.subscribe()
+    if workload == "track":
+        emergency.subscribe()
+    for _ in range(SIM_SECONDS):
+        if workload == "obs":
+            obs.step()
+            observe(obs)
+            continue
+        if workload == "track":
+            obs.step()
+            emergency.update()
+            track(obs, emergency)
+            continue
+        traci.simulationStep()
+        if workload == "poll":
+            poll(traci)
+    elapsed = time.perf_counter() - t0
+    traci.close()
+    print(f"STEPS_PER_SEC {SIM_SECONDS / elapsed:.1f}")
+
+
+def run(backend, workload, scale):
+    env = dict(os.environ, SUMO_BACKEND=backend)
+    out = subprocess.run([sys.executable, __file__, "--child", workload, str(scale)], env=env,
+                         capture_output=True, text=True)
+    for line in out.stdout.splitlines():
+        if line.startswith("STEPS_PER_SEC"):
+            return float(line.split()[1])
+    sys.exit(f"ERROR: {backend}/{workload} failed:\n{out.stdout}\n{out.stderr}")
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else REPEATS
+    print(f"{SUMO_CFG}, {SIM_SECONDS} steps, best of {repeats}")
+    print(f"{'scale':<7}{'workload':<10}" + "".join(f"{b + ' steps/s':>18}" for b in BACKENDS) + f"{'speedup':>10}")
+    for scale in SCALES:
+        for workload in WORKLOADS:
+            best = {b: max(run(b, workload, scale) for _ in range(repeats)) for b in BACKENDS}
+            print(f"{scale:<7}{workload:<10}" + "".join(f"{best[b]:>18.0f}" for b in BACKENDS)
+                  + f"{best['libsumo'] / best['traci']:>9.1f}x")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3 and sys.argv[1] == "--child":
+        child(sys.argv[2], float(sys.argv[3]))
+    else:
+        main()
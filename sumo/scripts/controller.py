@@ -0,0 +1,608 @@
+import argparse, ast, csv, time
+from pathlib import Path
+
+from sumo_backend import load_traci, start_sumo
+from observation import Observation
+from emergency import EmergencyTracker
+
+# One simulation engine for the 4-way controllers. Stepping, observation
+# (subscriptions), ambulance tracking, CSV logging and GUI pacing live in
+# Engine; what to show next is a strategy class per mode:
+#
+#   fixed      - N, E, S, W in turn, GREEN_TIME each
+#   rotational - N, E, S, W in turn, green from the queue, gap-out
+#   adaptive   - longest queue first, MAX_WAIT fairness, gap-out
+#   ambulance  - adaptive + ambulance preemption (all-red, then green for it)
+#
+# GAP_TIME = 0 turns gap-out off (the *_4way_1.py variants).
+#
+#   python controller.py --mode adaptive
+#   python controller.py --mode ambulance --gui
+#   python controller.py --mode rotational --set G_MAX=35 --route routes_2.rou.xml --seed 3
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+SUMO_CFG = BASE_DIR / "intersection.sumocfg"
+ROUTES_DIR = BASE_DIR / "routes"
+OUT_DIR = BASE_DIR / "output"
+
+TLS_ID = "J0"
+
+# ====== ADJUST HERE (defaults; per mode below, per run with --set KEY=VALUE) ======
+PARAMS = {
+    "SIM_SECONDS": 900,
+    "GREEN_TIME": 30,       # fixed mode
+    "G_MIN": 10,
+    "G_MAX": 30,
+    "GAP_TIME": 3,          # seconds of empty queue before ending green early (0 = never)
+    "YELLOW_TIME": 3,
+    "MAX_WAIT": 90,         # fairness: max seconds a direction can wait
+    "USE_LINEAR": True,
+    "Q_REF": 15,            # only used in linear mapping
+    "STEP_DELAY": 0.2,      # delay between simulation steps (GUI only)
+
+    "EMERGENCY_TYPE_ID": "ambulance",
+    "EMERGENCY_DIST": 200,  # meters to stop line
+    "ALL_RED_TIME": 1,      # seconds (buffer)
+    "EXTRA_CLEAR_TIME": 3,  # seconds to hold green after ambulance passes junction
+}
+LOG_BLOCK = 300  # CSV rows buffered per writerows() call
+# ==================================================================================
+
+# PARAMS every mode reads (the engine); the rest are per strategy, Strategy.USES
+ENGINE_PARAMS = ("SIM_SECONDS", "YELLOW_TIME", "STEP_DELAY", "EMERGENCY_TYPE_ID", "EMERGENCY_DIST")
+
+LANES = {
+    "N": ["north_in_0", "north_in_1"],
+    "E": ["east_in_0", "east_in_1"],
+    "S": ["south_in_0", "south_in_1"],
+    "W": ["west_in_0", "west_in_1"],
+}
+
+# Matches intersection.net.xml order exactly
+PHASE = {
+    "N_G": 0, "N_Y": 1,
+    "E_G": 2, "E_Y": 3,
+    "S_G": 4, "S_Y": 5,
+    "W_G": 6, "W_Y": 7,
+    "ALL_RED": 8,
+    "ALL_YELLOW": 9,
+}
+
+ORDER = ["N", "E", "S", "W"]
+
+CSV_HEADER = [
+    "time", "phase", "served_dir", "green_time", "departed", "arrived",
+    "qN", "qE", "qS", "qW", "total_queue",
+]
+EMG_COLUMNS = {  # ambulance columns after CSV_HEADER, by emg_columns layout
+    # full_adaptive_4way_2_ambulance_log.py: waiting / clearance per event
+    "clearance": [
+        "emg_active", "emg_id", "emg_dir", "emg_dist",
+        "emg_waiting_time", "emg_clearance_time",
+    ],
+    # fixed_4way_ambulace_log.py: detection / first green (plot_3way_results_v3_amb_log.py)
+    "detect": [
+        "emg_active", "emg_id", "emg_dir", "emg_dist",
+        "emg_detect_t", "emg_green_t", "emg_wait_time",
+    ],
+}
+
+
+def clamp(x, lo, hi):
+    return max(lo, min(hi, x))
+
+
+def new_emg():
+    return {
+        "active": False,
+        "vid": None,
+        "dir": None,
+        "t_detect": None,   # first detected within EMERGENCY_DIST
+        "t_green": None,    # first got green
+        "t_clear": None,
+        "waiting": None,    # t_green - t_detect
+        "clearance": None,  # t_clear - t_detect
+    }
+
+
+class Engine:
+    """
+    engine = Engine(strategy, params, gui=False, out_csv=path)
+    engine.run()
+
+    Strategies drive it through run_phase() / run_green_gapout() (or advance()
+    for one-step decisions) and read engine.obs / engine.emergency.
+
+    CSV rows follow the scripts each mode replaced:
+    log_after_step - row t holds the state after simulationStep() t (fixed,
+                     rotational, adaptive) instead of before it (ambulance);
+                     None = the strategy's own setting
+    emg_columns    - EMG_COLUMNS layout to append, False for none (None =
+                     "clearance" if the strategy preempts, else none)
+    log_yellow     - rows for the yellow after a gap-out green (the *_4way_2
+                     scripts did not write them)
+    """
+
+    def __init__(self, strategy, params, gui=False, out_csv=None, sumo_args=(), port=None,
+                 log_after_step=None, emg_columns=None, log_yellow=True):
+        self.strategy = strategy
+        self.p = params
+        self.gui = gui
+        self.out_csv = Path(out_csv) if out_csv else None
+        self.sumo_args = list(sumo_args)
+        self.port = port
+        self.log_after_step = strategy.log_after_step if log_after_step is None else log_after_step
+        if emg_columns is None:
+            emg_columns = "clearance" if strategy.preempts else False
+        if emg_columns and emg_columns not in EMG_COLUMNS:
+            raise ValueError(f"emg_columns={emg_columns!r}, expected False or one of {sorted(EMG_COLUMNS)}")
+        self.emg_columns = emg_columns
+        self.log_yellow = log_yellow
+        self.traci = load_traci(gui)
+        self.obs = Observation(self.traci, TLS_ID, LANES)
+        self.emergency = EmergencyTracker(self.obs, params["EMERGENCY_TYPE_ID"], params["EMERGENCY_DIST"])
+        self.t = 0
+        self.emg = new_emg()
+        self.rows = []
+        self._writer = None
+        # run totals for summary()
+        self.n_rows = 0
+        self.queue_sum = 0
+        self.queue_max = 0
+        self.departed_sum = 0
+        self.arrived_sum = 0
+        self.emg_waiting = {}    # vid -> waiting time (last logged)
+        self.emg_clearance = {}  # vid -> clearance time
+        self.wall_s = 0.0
+
+    @property
+    def running(self):
+        return self.t < self.p["SIM_SECONDS"]
+
+    def current_green_direction(self):
+        """"N"|"E"|"S"|"W", None during yellow / all-red."""
+        for d in ORDER:
+            if self.obs.phase == PHASE[f"{d}_G"]:
+                return d
+        return None
+
+    def step(self):
+        self.obs.step()
+        self.emergency.update()
+        if self.gui:
+            time.sleep(self.p["STEP_DELAY"])
+        self.t += 1
+
+    def watch_emergency(self):
+        """
+        Log-only ambulance tracking for strategies that do not preempt:
+        detect -> its approach turns green (waiting) -> it leaves the incoming lane (clearance).
+        """
+        emg = self.emg
+        req = self.emergency.closest_request()
+        if req:
+            if not emg["active"] or emg["vid"] != req["vid"]:
+                emg.update(new_emg(), active=True, vid=req["vid"], dir=req["approach"], t_detect=self.t)
+            emg["dist"] = req["dist"]
+        if not emg["active"]:
+            return
+        if emg["waiting"] is None and self.current_green_direction() == emg["dir"]:
+            emg["t_green"] = self.t
+            emg["waiting"] = self.t - emg["t_detect"]
+        if self.emergency.is_cleared(emg["vid"]):
+            emg["t_clear"] = self.t
+            emg["clearance"] = self.t - emg["t_detect"]
+            emg["active"] = False
+
+    def advance(self, phase_idx, served_dir, green_time):
+        """One simulated second: step, and its CSV row before or after the step (log_after_step)."""
+        t = self.t
+        if not self.log_after_step:
+            self.log(phase_idx, served_dir, green_time, t)
+        self.step()
+        if self.log_after_step:
+            self.log(phase_idx, served_dir, green_time, t)
+
+    def log(self, phase_idx, served_dir, green_time, t):
+        """One CSV row for second t with the current observation."""
+        q = self.obs.queues
+        total = q["N"] + q["E"] + q["S"] + q["W"]
+        emg = self.emg
+        row = [
+            t, phase_idx, served_dir, green_time, self.obs.departed, self.obs.arrived,
+            q["N"], q["E"], q["S"], q["W"], total,
+        ]
+        if self.emg_columns == "detect":
+            # as the old log-only script: active stays set after the first
+            # detection, the last event's values stay until the next one
+            row += [
+                int(emg["t_detect"] is not None),
+                emg["vid"] if emg["vid"] else "",
+                emg["dir"] if emg["dir"] else "",
+                f"{emg['dist']:.2f}" if emg.get("dist") is not None else "",
+                emg["t_detect"] if emg["t_detect"] is not None else "",
+                emg["t_green"] if emg["t_green"] is not None else "",
+                emg["waiting"] if emg["waiting"] is not None else "",
+            ]
+        elif self.emg_columns:
+            row += [
+                int(emg["active"]),
+                emg["vid"] if emg["vid"] else "",
+                emg["dir"] if emg["dir"] else "",
+                emg.get("dist", "") if emg["active"] else "",
+                emg["waiting"] if emg["waiting"] is not None else "",
+                emg["clearance"] if emg["clearance"] is not None else "",
+            ]
+        self.rows.append(row)
+        self.n_rows += 1
+        self.queue_sum += total
+        self.queue_max = max(self.queue_max, total)
+        self.departed_sum += self.obs.departed
+        self.arrived_sum += self.obs.arrived
+        if emg["waiting"] is not None:
+            self.emg_waiting[emg["vid"]] = emg["waiting"]
+        if emg["clearance"] is not None:
+            self.emg_clearance[emg["vid"]] = emg["clearance"]
+
+        if self._writer is not None and len(self.rows) >= LOG_BLOCK:
+            self.flush()
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.writerows(self.rows)
+        self.rows = []
+
+    def summary(self):
+        """Per-run totals over the logged rows (ambulance times per event, i.e. per vehicle)."""
+        waits = list(self.emg_waiting.values())
+        clears = list(self.emg_clearance.values())
+        return {
+            "steps": self.t,
+            "avg_queue": self.queue_sum / max(self.n_rows, 1),
+            "max_queue": self.queue_max,
+            "departed": self.departed_sum,
+            "arrived": self.arrived_sum,
+            "emg_events": len(waits),
+            "emg_wait_mean": sum(waits) / len(waits) if waits else "",
+            "emg_wait_max": max(waits) if waits else "",
+            "emg_clear_mean": sum(clears) / len(clears) if clears else "",
+            "wall_s": self.wall_s,
+            "steps_per_s": self.t / self.wall_s if self.wall_s else 0.0,
+        }
+
+    def run_phase(self, phase_idx, duration, served_dir, green_time=None, log=True):
+        self.obs.set_phase(phase_idx, duration)
+        for _ in range(duration):
+            if not self.running:
+                break
+            if not self.strategy.preempts:
+                self.watch_emergency()
+            if log:
+                self.advance(phase_idx, served_dir, duration if green_time is None else green_time)
+            else:
+                self.step()
+
+    def run_green_gapout(self, dir_key, target_green):
+        """
+        Run green up to target_green seconds, but end early if:
+        - G_MIN has passed AND
+        - queue(dir_key) stays 0 for GAP_TIME consecutive seconds
+        then yellow. Returns seconds used (green + yellow).
+        """
+        p = self.p
+        start_t = self.t
+        phase_green = PHASE[f"{dir_key}_G"]
+        self.obs.set_phase(phase_green, target_green)  # upper bound
+
+        empty_streak = 0
+        green_used = 0
+        while green_used < target_green and self.running:
+            if not self.strategy.preempts:
+                self.watch_emergency()
+            self.advance(phase_green, dir_key, target_green)
+            green_used += 1
+
+            if p["GAP_TIME"] and green_used >= p["G_MIN"]:
+                if self.obs.queue(dir_key) == 0:
+                    empty_streak += 1
+                    if empty_streak >= p["GAP_TIME"]:
+                        break
+                else:
+                    empty_streak = 0
+
+        # after-step scripts labelled yellow rows with the green they follow
+        if self.log_after_step:
+            self.run_phase(PHASE[f"{dir_key}_Y"], p["YELLOW_TIME"], dir_key, target_green, log=self.log_yellow)
+        else:
+            self.run_phase(PHASE[f"{dir_key}_Y"], p["YELLOW_TIME"], f"{dir_key}_Y", log=self.log_yellow)
+        return self.t - start_t
+
+    def run(self):
+        OUT_DIR.mkdir(exist_ok=True)  # the .sumocfg writes output/summary.xml, output/ is not in git
+        start_sumo(self.traci, SUMO_CFG, self.gui, ["--start"] + self.sumo_args, port=self.port)
+        t0 = time.perf_counter()
+        self.obs.subscribe()
+        self.emergency.subscribe()
+
+        f = None
+        if self.out_csv is not None:
+            self.out_csv.parent.mkdir(parents=True, exist_ok=True)
+            f = open(self.out_csv, "w", newline="")
+            self._writer = csv.writer(f)
+            self._writer.writerow(CSV_HEADER + EMG_COLUMNS.get(self.emg_columns, []))
+        try:
+            while self.running:
+                self.strategy.tick(self)
+        finally:
+            self.wall_s = time.perf_counter() - t0
+            self.flush()
+            if f is not None:
+                f.close()
+            self.traci.close()
+
+
+class Strategy:
+    """tick(engine): decide and run at least one simulation step."""
+    DEFAULTS = {}
+    USES = ()               # PARAMS keys read on top of ENGINE_PARAMS
+    preempts = False        # True: handles engine.emg itself (no log-only tracking)
+    log_after_step = True   # CSV row after simulationStep(), like the pre-engine scripts
+
+    def __init__(self, params):
+        self.p = params
+
+    def green_time_from_queue(self, q):
+        p = self.p
+        if p["USE_LINEAR"]:
+            g = p["G_MIN"] + (q / max(p["Q_REF"], 1)) * (p["G_MAX"] - p["G_MIN"])
+            return int(round(clamp(g, p["G_MIN"], p["G_MAX"])))
+
+        if q <= 2: return 10
+        if q <= 5: return 15
+        if q <= 9: return 20
+        if q <= 13: return 25
+        return 35
+
+    def tick(self, engine):
+        raise NotImplementedError
+
+
+class FixedTime(Strategy):
+    USES = ("GREEN_TIME",)
+
+    def tick(self, engine):
+        g = self.p["GREEN_TIME"]
+        for d in ORDER:
+            engine.run_phase(PHASE[f"{d}_G"], g, d)
+            engine.run_phase(PHASE[f"{d}_Y"], self.p["YELLOW_TIME"], d if engine.log_after_step else f"{d}_Y", g)
+
+
+class RotationalGapOut(Strategy):
+    DEFAULTS = {"G_MAX": 35}
+    USES = ("G_MIN", "G_MAX", "GAP_TIME", "USE_LINEAR", "Q_REF")
+
+    def __init__(self, params):
+        super().__init__(params)
+        self.idx = 0
+
+    def tick(self, engine):
+        d = ORDER[self.idx % len(ORDER)]
+        self.idx += 1
+        engine.run_green_gapout(d, self.green_time_from_queue(engine.obs.queue(d)))
+
+
+class FullAdaptive(Strategy):
+    USES = RotationalGapOut.USES + ("MAX_WAIT",)
+
+    def __init__(self, params):
+        super().__init__(params)
+        self.waited = {d: 0 for d in ORDER}
+
+    def tick(self, engine):
+        q = {d: engine.obs.queue(d) for d in self.waited}
+        # fairness override
+        starving = [d for d in self.waited if self.waited[d] >= self.p["MAX_WAIT"]]
+        if starving:
+            chosen = max(starving, key=lambda d: q[d])
+        else:
+            chosen = max(q, key=q.get)
+
+        used = engine.run_green_gapout(chosen, self.green_time_from_queue(q[chosen]))
+        for d in self.waited:
+            self.waited[d] = 0 if d == chosen else self.waited[d] + used
+
+
+class AmbulancePreemption(FullAdaptive):
+    """
+    Full adaptive until an ambulance is within EMERGENCY_DIST of the stop line,
+    then ALL_RED_TIME of all-red (unless its approach is already green), then
+    green for its approach until it has left the incoming lane + EXTRA_CLEAR_TIME.
+    """
+    USES = FullAdaptive.USES + ("ALL_RED_TIME", "EXTRA_CLEAR_TIME")
+    preempts = True
+    log_after_step = False  # full_adaptive_4way_2_ambulance*.py logged before stepping
+
+    NORMAL = "NORMAL"
+    ALL_RED = "ALL_RED"
+    EMERGENCY = "EMERGENCY"
+
+    def __init__(self, params):
+        super().__init__(params)
+        self.state = self.NORMAL
+        self.state_until = 0
+        self.active = None       # request being served: {vid, approach, dist, lane}
+        self.release_at = None
+
+    def tick(self, engine):
+        req = engine.emergency.closest_request()
+        if self.state == self.NORMAL:
+            if req:
+                self.detect(engine, req)
+            else:
+                super().tick(engine)
+        elif self.state == self.ALL_RED:
+            self.all_red(engine)
+        else:
+            self.serve(engine)
+
+    def detect(self, engine, req):
+        emg = engine.emg
+        # new emergency event: start tracking
+        if not emg["active"] or emg["vid"] != req["vid"]:
+            emg.update(new_emg(), active=True, vid=req["vid"], dir=req["approach"], t_detect=engine.t)
+        emg["dist"] = req["dist"]
+
+        # already green when detected: waiting is 0
+        cg = engine.current_green_direction()
+        if cg == emg["dir"] and emg["waiting"] is None:
+            emg["t_green"] = engine.t
+            emg["waiting"] = 0
+
+        self.active = req
+        if cg == req["approach"]:
+            self.state = self.EMERGENCY
+        else:
+            self.state = self.ALL_RED
+            self.state_until = engine.t + self.p["ALL_RED_TIME"]
+            engine.obs.set_phase(PHASE["ALL_RED"], self.p["ALL_RED_TIME"])
+
+        engine.advance(engine.obs.phase, f"EMG_DETECT_{req['approach']}", 0)
+
+    def all_red(self, engine):
+        engine.obs.set_phase(PHASE["ALL_RED"], 1)
+        engine.advance(PHASE["ALL_RED"], "ALL_RED", self.p["ALL_RED_TIME"])
+        if engine.t >= self.state_until:
+            self.state = self.EMERGENCY
+
+    def serve(self, engine):
+        emg = engine.emg
+        if emg["t_clear"] is None:
+            emg["t_clear"] = engine.t
+            emg["clearance"] = emg["t_clear"] - emg["t_detect"]
+        # keep waiting / clearance for the log, but the event is being served
+        emg["active"] = False
+
+        if self.active is None:
+            self.state = self.NORMAL
+            return
+
+        # force green for the ambulance approach
+        d = self.active["approach"]
+        vid = self.active["vid"]
+        engine.obs.set_phase(PHASE[f"{d}_G"], 1)
+        if engine.gui:
+            print("AMB:", vid, "lane:", engine.emergency.lane_of(vid), "state:", self.state)
+        engine.advance(PHASE[f"{d}_G"], f"EMG_{d}", 1)
+
+        if emg["t_green"] is None and engine.obs.phase == PHASE[f"{d}_G"]:
+            emg["t_green"] = engine.t
+            emg["waiting"] = emg["t_green"] - emg["t_detect"]
+
+        # hold timer starts when the ambulance leaves the incoming lanes
+        if engine.emergency.is_cleared(vid):
+            if self.release_at is None:
+                self.release_at = engine.t + self.p["EXTRA_CLEAR_TIME"]
+            if engine.t >= self.release_at:
+                self.state = self.NORMAL
+                self.active = None
+                self.release_at = None
+                return
+        else:
+            self.release_at = None
+
+        # same ambulance still approaching: update its distance
+        new_req = engine.emergency.closest_request()
+        if new_req and new_req["vid"] == vid:
+            self.active = new_req
+
+
+MODES = {
+    "fixed": FixedTime,
+    "rotational": RotationalGapOut,
+    "adaptive": FullAdaptive,
+    "ambulance": AmbulancePreemption,
+}
+
+
+def mode_keys(mode):
+    """The PARAMS keys `mode` actually reads."""
+    return set(ENGINE_PARAMS) | set(MODES[mode].USES)
+
+
+def mode_params(mode, **overrides):
+    """
+    PARAMS, then the mode's defaults, then overrides. Unknown keys, and keys
+    the mode ignores (e.g. G_MAX for fixed), are an error.
+    """
+    unknown = set(overrides) - set(PARAMS)
+    if unknown:
+        raise KeyError(f"unknown parameter(s) {sorted(unknown)}, expected one of {sorted(PARAMS)}")
+    unused = set(overrides) - mode_keys(mode)
+    if unused:
+        raise KeyError(f"{sorted(unused)} not used by mode {mode}, it reads {sorted(mode_keys(mode))}")
+    return {**PARAMS, **MODES[mode].DEFAULTS, **overrides}
+
+
+def route_args(route=None, seed=None):
+    """SUMO options for a route file (path, or a name in sumo/routes) and a random seed."""
+    args = []
+    if route:
+        path = Path(route)
+        if not path.exists():
+            path = ROUTES_DIR / route
+        args += ["-r", str(path.resolve())]
+    if seed is not None:
+        args += ["--seed", str(seed)]
+    return args
+
+
+def run(mode, out_csv=None, gui=False, route=None, seed=None, sumo_args=(), port=None,
+        log_after_step=None, emg_columns=None, log_yellow=True, **overrides):
+    """
+    Run one simulation with `mode`; returns the Engine (rows already written to out_csv).
+    log_after_step / emg_columns / log_yellow: CSV layout, see Engine.
+    """
+    params = mode_params(mode, **overrides)
+    engine = Engine(MODES[mode](params), params, gui=gui, out_csv=out_csv,
+                    sumo_args=route_args(route, seed) + list(sumo_args), port=port,
+                    log_after_step=log_after_step, emg_columns=emg_columns, log_yellow=log_yellow)
+    engine.run()
+    if out_csv:
+        print("Saved:", out_csv)
+    return engine
+
+
+def parse_set(items):
+    """["G_MAX=35", "USE_LINEAR=False"] -> {"G_MAX": 35, "USE_LINEAR": False}"""
+    out = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        try:
+            out[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            out[key] = value
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="4-way traffic light controller (SUMO)")
+    ap.add_argument("--mode", choices=sorted(MODES), default="adaptive")
+    ap.add_argument("--gui", action="store_true", help="sumo-gui (traci backend) with STEP_DELAY pacing")
+    ap.add_argument("--route", help="route file, path or name in sumo/routes (default: from the .sumocfg)")
+    ap.add_argument("--seed", type=int)
+    ap.add_argument("--out", help="CSV path (default: output/<mode>_4way_metrics.csv)")
+    ap.add_argument("--set", nargs="*", default=[], metavar="KEY=VALUE", help="override PARAMS")
+    args = ap.parse_args()
+
+    overrides = parse_set(args.set)
+    try:
+        mode_params(args.mode, **overrides)
+    except KeyError as e:
+        ap.error(e.args[0])
+
+    out_csv = args.out or OUT_DIR / f"{args.mode}_4way_metrics.csv"
+    run(args.mode, out_csv, gui=args.gui, route=args.route, seed=args.seed, **overrides)
+
+
+if __name__ == "__main__":
+    main()
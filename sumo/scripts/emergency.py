@@ -0,0 +1,84 @@
+# Keeps track of the ambulances in the network without scanning every vehicle
+# every step.
+#
+# A vehicle's type never changes, so it is looked up once, when the vehicle
+# departs (Observation.departed_ids). Only ambulances get a subscription (lane +
+# position); arrived ones drop out. Lane lengths of the incoming lanes are read
+# once. Per step this costs one getTypeID per departed vehicle plus the
+# ambulances' subscription results, however many cars are on the network.
+
+
+class EmergencyTracker:
+    """
+    emergency = EmergencyTracker(obs, EMERGENCY_TYPE_ID, EMERGENCY_DIST)
+    emergency.subscribe()           # once, after obs.subscribe()
+    emergency.update()              # every step, after obs.step()
+    emergency.closest_request()     # {vid, approach, dist, lane} or None
+    emergency.is_cleared(vid)
+    """
+
+    def __init__(self, obs, type_id, max_dist):
+        self.obs = obs
+        self.traci = obs.traci
+        self.type_id = type_id
+        self.max_dist = max_dist
+        self.approach_of = {lane_id: d for d, lane_ids in obs.lanes.items() for lane_id in lane_ids}
+        self.lane_length = {}
+        self.ambulances = set()
+        self.state = {}  # vid -> (lane id, lane position) after the last step
+
+    def subscribe(self):
+        self.lane_length = {lane_id: self.traci.lane.getLength(lane_id) for lane_id in self.approach_of}
+        # vehicles already in the network (tracker started mid-run); afterwards only departures
+        self._learn(self.traci.vehicle.getIDList())
+        self._read_state()
+
+    def _learn(self, vids):
+        tc = self.traci.constants
+        for vid in vids:
+            if vid not in self.ambulances and self.traci.vehicle.getTypeID(vid) == self.type_id:
+                self.traci.vehicle.subscribe(vid, [tc.VAR_LANE_ID, tc.VAR_LANEPOSITION])
+                self.ambulances.add(vid)
+
+    def _read_state(self):
+        tc = self.traci.constants
+        self.state = {}
+        for vid in self.ambulances:
+            res = self.traci.vehicle.getSubscriptionResults(vid)
+            if res:
+                self.state[vid] = (res[tc.VAR_LANE_ID], res[tc.VAR_LANEPOSITION])
+
+    def update(self):
+        self.ambulances.difference_update(self.obs.arrived_ids)
+        self._learn(self.obs.departed_ids)
+        self._read_state()
+
+    def lane_of(self, vid):
+        return self.state.get(vid, ("", 0.0))[0]
+
+    def closest_request(self):
+        """
+        Closest ambulance within max_dist of the stop line on an incoming lane.
+        Ties go to the lowest vehicle id as a string ("amb10" before "amb2"):
+        getIDList() returns ids in that order (SUMO keeps vehicles in a map keyed
+        by id), so this picks the same vehicle as the old getIDList() scan.
+        Returns: dict {vid, approach, dist, lane} or None
+        """
+        best = None
+        for vid in sorted(self.state):
+            lane_id, lane_pos = self.state[vid]
+            approach = self.approach_of.get(lane_id)
+            if not approach:
+                continue
+
+            dist_to_stop = max(0.0, self.lane_length[lane_id] - lane_pos)
+            if dist_to_stop > self.max_dist:
+                continue
+
+            if best is None or dist_to_stop < best["dist"]:
+                best = {"vid": vid, "approach": approach, "dist": dist_to_stop, "lane": lane_id}
+        return best
+
+    def is_cleared(self, vid):
+        """Cleared once the ambulance is no longer on an incoming lane (or has left the network)."""
+        return self.lane_of(vid) not in self.approach_of
@@ -0,0 +1,70 @@
+# What the 4-way controllers read every step (queues per approach, departed /
+# arrived, current phase), filled from TraCI subscriptions instead of getters.
+#
+# Subscription results come back with the simulationStep() reply, so with the
+# traci backend reading any number of queues costs no extra round trip; with
+# libsumo it skips one lookup per call. Values describe the state after the
+# last step, like getLastStepHaltingNumber() / getDepartedNumber() do.
+
+
+class Observation:
+    """
+    obs = Observation(traci, TLS_ID, LANES)   # LANES: {"N": [lane ids], ...}
+    obs.subscribe()                            # once, after start_sumo()
+    obs.step()                                 # instead of traci.simulationStep()
+    obs.queue("N"), obs.total_queue(), obs.departed, obs.arrived, obs.phase
+    obs.set_phase(PHASE["N_G"], 30)            # setPhase + setPhaseDuration
+
+    phase follows set_phase() immediately (a subscription would only see the
+    new phase after the next step, getPhase() sees it right away).
+    """
+
+    def __init__(self, traci, tls_id, lanes):
+        self.traci = traci
+        self.tls_id = tls_id
+        self.lanes = lanes
+        self.halting = {}                      # lane id -> halting vehicles
+        self.queues = {d: 0 for d in lanes}    # approach -> halting vehicles
+        self.departed = 0
+        self.arrived = 0
+        self.departed_ids = ()                 # vehicles that entered / left in the last step
+        self.arrived_ids = ()
+        self.phase = None
+
+    def subscribe(self):
+        tc = self.traci.constants
+        for lane_ids in self.lanes.values():
+            for lane_id in lane_ids:
+                self.traci.lane.subscribe(lane_id, [tc.LAST_STEP_VEHICLE_HALTING_NUMBER])
+        self.traci.simulation.subscribe([tc.VAR_DEPARTED_VEHICLES_NUMBER, tc.VAR_ARRIVED_VEHICLES_NUMBER,
+                                         tc.VAR_DEPARTED_VEHICLES_IDS, tc.VAR_ARRIVED_VEHICLES_IDS])
+        self.traci.trafficlight.subscribe(self.tls_id, [tc.TL_CURRENT_PHASE])
+        self.refresh()  # subscribing already returns the current values
+
+    def refresh(self):
+        tc = self.traci.constants
+        lanes = self.traci.lane.getAllSubscriptionResults()
+        self.halting = {lane_id: lanes[lane_id][tc.LAST_STEP_VEHICLE_HALTING_NUMBER]
+                        for lane_ids in self.lanes.values() for lane_id in lane_ids}
+        self.queues = {d: sum(self.halting[l] for l in lane_ids) for d, lane_ids in self.lanes.items()}
+        sim = self.traci.simulation.getSubscriptionResults()
+        self.departed = sim[tc.VAR_DEPARTED_VEHICLES_NUMBER]
+        self.arrived = sim[tc.VAR_ARRIVED_VEHICLES_NUMBER]
+        self.departed_ids = sim[tc.VAR_DEPARTED_VEHICLES_IDS]
+        self.arrived_ids = sim[tc.VAR_ARRIVED_VEHICLES_IDS]
+        self.phase = self.traci.trafficlight.getSubscriptionResults(self.tls_id)[tc.TL_CURRENT_PHASE]
+
+    def step(self):
+        self.traci.simulationStep()
+        self.refresh()
+
+    def queue(self, dir_key):
+        return self.queues[dir_key]
+
+    def total_queue(self):
+        return sum(self.queues.values())
+
+    def set_phase(self, phase_idx, duration):
+        self.traci.trafficlight.setPhase(self.tls_id, phase_idx)
+        self.traci.trafficlight.setPhaseDuration(self.tls_id, duration)
+        self.phase = phase_idx
@@ -0,0 +1,66 @@
+import os, sys
+
+if "SUMO_HOME" not in os.environ:
+    sys.exit("ERROR: set SUMO_HOME, e.g. export SUMO_HOME=/usr/share/sumo")
+
+sys.path.append(os.path.join(os.environ["SUMO_HOME"], "tools"))
+from sumolib import checkBinary
+
+# Which TraCI implementation the controller scripts drive SUMO with.
+#
+# traci   - SUMO runs as a separate process, every call is a TCP round trip.
+#           Needed for sumo-gui.
+# libsumo - SUMO runs inside this Python process, same API (traci.lane...,
+#           traci.simulationStep()...), every call is a plain function call.
+#           Headless only, one simulation per process.
+#
+# Default: libsumo for headless runs when it is importable, traci otherwise.
+# Override with the environment, e.g. SUMO_BACKEND=traci python fixed_4way.py
+BACKEND_ENV = "SUMO_BACKEND"   # "auto" | "libsumo" | "traci"
+
+
+def backend_name(gui=False):
+    choice = os.environ.get(BACKEND_ENV, "auto").lower()
+    if choice not in ("auto", "libsumo", "traci"):
+        sys.exit(f"ERROR: {BACKEND_ENV}={choice!r}, expected auto, libsumo or traci")
+
+    if gui:
+        if choice == "libsumo":
+            print(f"{BACKEND_ENV}=libsumo ignored: sumo-gui needs traci")
+        return "traci"
+    if choice == "traci":
+        return "traci"
+
+    try:
+        import libsumo  # noqa: F401
+    except ImportError:
+        if choice == "libsumo":
+            sys.exit("ERROR: libsumo not importable (needs SUMO >= 1.5 built with it, or pip install libsumo)")
+        return "traci"
+    return "libsumo"
+
+
+def load_traci(gui=False):
+    """
+    The module to use as `traci` in a controller script:
+        traci = load_traci(USE_GUI)
+    """
+    if backend_name(gui) == "libsumo":
+        import libsumo as module
+    else:
+        import traci as module
+    return module
+
+
+def start_sumo(traci, sumo_cfg, gui=False, extra_args=(), port=None):
+    """
+    traci.start() for either backend (libsumo ignores the binary but wants the same command line).
+    port: TCP port for traci (default: a free one); unused by libsumo.
+    """
+    sumoBinary = checkBinary("sumo-gui" if gui else "sumo")
+    cmd = [sumoBinary, "-c", str(sumo_cfg), *extra_args]
+    if port is not None and traci.__name__ == "traci":
+        traci.start(cmd, port=port)
+    else:
+        traci.start(cmd)
+    print("SUMO backend:", traci.__name__)
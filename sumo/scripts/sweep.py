@@ -0,0 +1,222 @@
+import argparse, csv, itertools, json, multiprocessing as mp, os, sys, time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+import controller
+
+# Sweep: controller modes x parameter values x route files x seeds, every run a
+# headless SUMO in its own worker process (process pool, one run per process:
+# libsumo keeps one simulation per process, and nothing leaks between runs).
+# Each run gets its own directory (metrics.csv, SUMO summary.xml, run.log) and,
+# with the traci backend, its own port, so runs never share a file or socket.
+#
+#   python sweep.py                                   # SWEEP / ROUTES / SEEDS below
+#   python sweep.py --modes fixed adaptive --seeds 0 1 2 3 --workers 8
+#   python sweep.py --modes adaptive --grid G_MAX=25,30,35 GAP_TIME=2,3 --routes routes_4.rou.xml
+#
+# Output: output/sweeps/<timestamp>/runs.csv (one row per run) and a table
+# averaged over seeds on stdout.
+
+SWEEP_DIR = controller.OUT_DIR / "sweeps"
+
+# ====== ADJUST HERE ======
+SWEEP = {   # mode -> {param: [values]}, every combination of the values is run
+    "fixed": {"GREEN_TIME": [20, 30]},
+    "rotational": {"G_MAX": [30, 35]},
+    "adaptive": {"G_MAX": [30, 35], "MAX_WAIT": [60, 90]},
+    "ambulance": {"G_MAX": [30, 35]},
+}
+ROUTES = ["routes.rou.xml", "routes_2.rou.xml", "routes_3.rou.xml", "routes_4.rou.xml"]
+SEEDS = [0, 1, 2]
+WORKERS = os.cpu_count()
+BASE_PORT = 8900    # traci backend: run i listens on BASE_PORT + i
+KEEP_CSV = True     # per-run metrics.csv (runs.csv is always written)
+# =========================
+
+RUN_FIELDS = ["run_id", "mode", "params", "route", "seed", "status",
+              "avg_queue", "max_queue", "departed", "arrived",
+              "mean_travel_time", "running_waiting_time",
+              "emg_events", "emg_wait_mean", "emg_wait_max", "emg_clear_mean",
+              "steps", "wall_s", "steps_per_s"]
+
+
+def expand(sweep, routes, seeds):
+    """One dict per run, in a fixed order (run_id / port depend only on the matrix)."""
+    runs = []
+    for mode, grid in sweep.items():
+        keys = sorted(grid)
+        for values in itertools.product(*(grid[k] for k in keys)):
+            params = dict(zip(keys, values))
+            for route in routes:
+                for seed in seeds:
+                    run_id = len(runs)
+                    runs.append({"run_id": run_id, "mode": mode, "params": params,
+                                 "route": route, "seed": seed, "port": BASE_PORT + run_id})
+    return runs
+
+
+def params_label(params):
+    return " ".join(f"{k}={v}" for k, v in sorted(params.items())) or "-"
+
+
+def read_sumo_summary(path):
+    """
+    Last <step> of a SUMO summary-output file: meanTravelTime (arrived vehicles)
+    and meanWaitingTime (vehicles still running at the end).
+    """
+    last = None
+    for _, elem in ET.iterparse(path):
+        if elem.tag == "step":
+            last = dict(elem.attrib)
+            elem.clear()
+    if last is None:
+        return {}
+    return {"mean_travel_time": float(last["meanTravelTime"]),
+            "running_waiting_time": float(last["meanWaitingTime"])}
+
+
+def run_one(run):
+    """Pool worker: one simulation, returns its runs.csv row."""
+    run_dir = run["sweep_dir"] / f"run_{run['run_id']:04d}"
+    run_dir.mkdir(parents=True, exist_ok=True)
+    # SUMO (libsumo runs in this process) and the controller print to fd 1/2
+    log = os.open(run_dir / "run.log", os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    os.dup2(log, 1)
+    os.dup2(log, 2)
+
+    row = {"run_id": run["run_id"], "mode": run["mode"], "params": params_label(run["params"]),
+           "route": run["route"], "seed": run["seed"], **run["params"]}
+    summary_xml = run_dir / "summary.xml"
+    try:
+        engine = controller.run(
+            run["mode"], run_dir / "metrics.csv" if run["keep_csv"] else None,
+            route=run["route"], seed=run["seed"], port=run["port"],
+            sumo_args=["--summary-output", str(summary_xml), "--no-step-log"],
+            log_after_step=True,  # same row timing in every mode, so the averages compare
+            **run["params"])
+        row.update(engine.summary())
+        row.update(read_sumo_summary(summary_xml))
+        row["status"] = "ok"
+    except Exception as e:  # one broken run must not stop the sweep
+        row["status"] = f"error: {type(e).__name__}: {e}"
+    return row
+
+
+def mean(values):
+    values = [v for v in values if v != "" and v is not None]
+    return sum(values) / len(values) if values else None
+
+
+def print_table(rows):
+    """Mean over seeds per (route, mode, params), best average queue first within a route."""
+    groups = {}
+    for r in rows:
+        if r["status"] == "ok":
+            groups.setdefault((r["route"], r["mode"], r["params"]), []).append(r)
+
+    cols = [("avg_queue", "avgQ", ".2f"), ("max_queue", "maxQ", ".1f"), ("arrived", "arrived", ".0f"),
+            ("mean_travel_time", "travel_s", ".1f"), ("running_waiting_time", "run_wait_s", ".1f"),
+            ("emg_wait_mean", "amb_wait_s", ".1f")]
+    print(f"{'route':<18}{'mode':<12}{'params':<26}{'seeds':>6}" + "".join(f"{h:>12}" for _, h, _ in cols))
+    for key in sorted(groups, key=lambda k: (k[0], mean(r["avg_queue"] for r in groups[k]))):
+        route, mode, params = key
+        line = f"{route:<18}{mode:<12}{params:<26}{len(groups[key]):>6}"
+        for field, _, fmt in cols:
+            m = mean(r.get(field, "") for r in groups[key])
+            line += f"{'-' if m is None else format(m, fmt):>12}"
+        print(line)
+
+
+def parse_grid(items):
+    """["G_MAX=25,30", "USE_LINEAR=False"] -> {"G_MAX": [25, 30], "USE_LINEAR": [False]}"""
+    grid = {}
+    for item in items:
+        key, _, values = item.partition("=")
+        grid[key] = [controller.parse_set([f"{key}={v}"])[key] for v in values.split(",")]
+    return grid
+
+
+def mode_grids(modes, grid):
+    """
+    --grid for each mode, without the keys that mode does not read (G_MAX means
+    nothing to fixed). Returns ({mode: grid}, {mode: dropped keys}); a key no
+    selected mode reads is a ValueError.
+    """
+    unknown = set(grid) - set(controller.PARAMS)
+    if unknown:
+        raise ValueError(f"unknown parameter(s) {sorted(unknown)}, expected one of {sorted(controller.PARAMS)}")
+    unused = [k for k in grid if not any(k in controller.mode_keys(m) for m in modes)]
+    if unused:
+        raise ValueError(f"{sorted(unused)} not used by any of the modes {modes}")
+    sweep, dropped = {}, {}
+    for m in modes:
+        keys = controller.mode_keys(m)
+        sweep[m] = {k: v for k, v in grid.items() if k in keys}
+        if len(sweep[m]) < len(grid):
+            dropped[m] = sorted(set(grid) - keys)
+    return sweep, dropped
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parallel SUMO controller sweep")
+    ap.add_argument("--modes", nargs="+", choices=sorted(controller.MODES), help="default: all in SWEEP")
+    ap.add_argument("--grid", nargs="*", metavar="KEY=V1,V2",
+                    help="parameter values for the selected modes that read them (replaces SWEEP grids)")
+    ap.add_argument("--routes", nargs="+", default=ROUTES)
+    ap.add_argument("--seeds", nargs="+", type=int, default=SEEDS)
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--no-csv", action="store_true", help="skip per-run metrics.csv")
+    args = ap.parse_args()
+
+    modes = args.modes or list(SWEEP)
+    sweep = {m: SWEEP.get(m, {}) for m in modes}
+    if args.grid:
+        try:
+            sweep, dropped = mode_grids(modes, parse_grid(args.grid))
+        except ValueError as e:
+            ap.error(e.args[0])
+        for m, keys in dropped.items():
+            print(f"{m}: ignoring {', '.join(keys)} (not used by this mode)")
+    for m, g in sweep.items():
+        try:
+            controller.mode_params(m, **{k: v[0] for k, v in g.items()})
+        except KeyError as e:
+            ap.error(e.args[0])
+    for route in args.routes:
+        if not (controller.ROUTES_DIR / route).exists() and not os.path.exists(route):
+            ap.error(f"route file not found: {route}")
+
+    sweep_dir = SWEEP_DIR / datetime.now().strftime("%Y%m%d_%H%M%S")
+    sweep_dir.mkdir(parents=True, exist_ok=True)
+    runs = expand(sweep, args.routes, args.seeds)
+    for r in runs:
+        r["sweep_dir"] = sweep_dir
+        r["keep_csv"] = KEEP_CSV and not args.no_csv
+    (sweep_dir / "sweep.json").write_text(json.dumps(
+        {"sweep": sweep, "routes": args.routes, "seeds": args.seeds, "workers": args.workers}, indent=2))
+
+    swept = sorted({k for g in sweep.values() for k in g})
+    print(f"{len(runs)} runs on {args.workers} workers -> {sweep_dir}")
+    t0 = time.perf_counter()
+    rows = []
+    with open(sweep_dir / "runs.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RUN_FIELDS + swept, extrasaction="ignore")
+        writer.writeheader()
+        with mp.Pool(args.workers, maxtasksperchild=1) as pool:
+            for row in pool.imap_unordered(run_one, runs):
+                rows.append(row)
+                writer.writerow({k: round(v, 3) if isinstance(v, float) else v for k, v in row.items()})
+                f.flush()
+                print(f"[{len(rows)}/{len(runs)}] {row['mode']} {row['params']} {row['route']} "
+                      f"seed={row['seed']}: {row['status']}", flush=True)
+
+    elapsed = time.perf_counter() - t0
+    failed = sum(r["status"] != "ok" for r in rows)
+    print(f"\n{len(rows)} runs in {elapsed:.1f}s ({failed} failed), {sweep_dir / 'runs.csv'}\n")
+    print_table(rows)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
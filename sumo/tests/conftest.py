@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# The controller scripts are flat modules that import each other by name
+SCRIPTS_DIR = Path(__file__).resolve().parents[1] / "scripts"
+sys.path.append(str(SCRIPTS_DIR))
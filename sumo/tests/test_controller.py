@@ -0,0 +1,122 @@
+import csv, itertools, os
+
+import pytest
+
+# sumo_backend exits without SUMO_HOME (sumolib lives in its tools/)
+if "SUMO_HOME" not in os.environ:
+    pytest.skip("SUMO_HOME not set", allow_module_level=True)
+
+import controller
+
+SIM_SECONDS = 300
+ROUTE = "routes_4.rou.xml"
+
+# (phase, served_dir, seconds) of the first SIM_SECONDS with the default PARAMS,
+# as the pre-engine scripts ran them (fixed_4way.py, rotational_adaptive_4way_2.py,
+# full_adaptive_4way_2.py, full_adaptive_4way_2_ambulance_log.py; yellow rows included).
+PHASES = {
+    "fixed": [
+        (0, "N", 30), (1, "N", 3), (2, "E", 30), (3, "E", 3), (4, "S", 30), (5, "S", 3),
+        (6, "W", 30), (7, "W", 3), (0, "N", 30), (1, "N", 3), (2, "E", 30), (3, "E", 3),
+        (4, "S", 30), (5, "S", 3), (6, "W", 30), (7, "W", 3), (0, "N", 30), (1, "N", 3),
+        (2, "E", 3),
+    ],
+    "rotational": [
+        (0, "N", 10), (1, "N", 3), (2, "E", 12), (3, "E", 3), (4, "S", 12), (5, "S", 3),
+        (6, "W", 12), (7, "W", 3), (0, "N", 12), (1, "N", 3), (2, "E", 10), (3, "E", 3),
+        (4, "S", 13), (5, "S", 3), (6, "W", 12), (7, "W", 3), (0, "N", 12), (1, "N", 3),
+        (2, "E", 12), (3, "E", 3), (4, "S", 12), (5, "S", 3), (6, "W", 10), (7, "W", 3),
+        (0, "N", 14), (1, "N", 3), (2, "E", 12), (3, "E", 3), (4, "S", 12), (5, "S", 3),
+        (6, "W", 12), (7, "W", 3), (0, "N", 12), (1, "N", 3), (2, "E", 10), (3, "E", 3),
+        (4, "S", 12), (5, "S", 3), (6, "W", 12), (7, "W", 3), (0, "N", 5),
+    ],
+    "adaptive": [
+        (0, "N", 10), (1, "N", 3), (2, "E", 12), (3, "E", 3), (4, "S", 12), (5, "S", 3),
+        (0, "N", 12), (1, "N", 3), (4, "S", 12), (5, "S", 3), (0, "N", 12), (1, "N", 3),
+        (4, "S", 12), (5, "S", 3), (6, "W", 12), (7, "W", 3), (2, "E", 12), (3, "E", 3),
+        (0, "N", 14), (1, "N", 3), (4, "S", 12), (5, "S", 3), (0, "N", 13), (1, "N", 3),
+        (4, "S", 12), (5, "S", 3), (0, "N", 12), (1, "N", 3), (6, "W", 12), (7, "W", 3),
+        (2, "E", 12), (3, "E", 3), (0, "N", 12), (1, "N", 3), (4, "S", 12), (5, "S", 3),
+        (0, "N", 13), (1, "N", 3), (4, "S", 12), (5, "S", 1),
+    ],
+    "ambulance": [
+        (0, "N", 10), (1, "N_Y", 3), (8, "EMG_DETECT_W", 1), (8, "ALL_RED", 1), (6, "EMG_W", 13),
+        (4, "S", 12), (5, "S_Y", 3), (0, "N", 12), (1, "N_Y", 3), (4, "S", 12), (5, "S_Y", 3),
+        (0, "N", 12), (1, "N_Y", 3), (4, "S", 12), (5, "S_Y", 3), (8, "EMG_DETECT_N", 1),
+        (8, "ALL_RED", 1), (0, "EMG_N", 16), (2, "E", 12), (3, "E_Y", 3), (6, "W", 12),
+        (7, "W_Y", 3), (4, "S", 12), (5, "S_Y", 3), (8, "EMG_DETECT_S", 1), (8, "ALL_RED", 1),
+        (4, "EMG_S", 15), (0, "N", 14), (1, "N_Y", 3), (4, "S", 12), (5, "S_Y", 3),
+        (8, "EMG_DETECT_N", 1), (8, "ALL_RED", 1), (0, "EMG_N", 23), (4, "S", 12), (5, "S_Y", 3),
+        (0, "N", 12), (1, "N_Y", 3), (2, "E", 12), (3, "E_Y", 3), (8, "EMG_DETECT_N", 1),
+        (8, "ALL_RED", 1), (0, "EMG_N", 13),
+    ],
+}
+
+
+def run_rows(tmp_path, mode, **kwargs):
+    out = tmp_path / f"{mode}.csv"
+    controller.run(mode, out, route=ROUTE, SIM_SECONDS=SIM_SECONDS, **kwargs)
+    with open(out, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def phase_sequence(rows):
+    return [(int(phase), served, len(list(g)))
+            for (phase, served), g in itertools.groupby(rows, key=lambda r: (r["phase"], r["served_dir"]))]
+
+
+@pytest.mark.parametrize("mode", sorted(PHASES))
+def test_mode_runs_the_stored_phase_sequence(tmp_path, mode):
+    rows = run_rows(tmp_path, mode)
+    assert [int(r["time"]) for r in rows] == list(range(SIM_SECONDS))
+    assert phase_sequence(rows) == PHASES[mode]
+
+
+def test_row_timing_and_columns_per_strategy(tmp_path):
+    fixed = run_rows(tmp_path, "fixed")
+    ambulance = run_rows(tmp_path, "ambulance")
+    # after simulationStep(): second 0 already has the first departures
+    assert int(fixed[0]["departed"]) > 0 and int(ambulance[0]["departed"]) == 0
+    assert fixed[1]["departed"] == ambulance[2]["departed"]
+    assert list(fixed[0]) == controller.CSV_HEADER
+    assert list(ambulance[0]) == controller.CSV_HEADER + controller.EMG_COLUMNS["clearance"]
+
+
+def test_fixed_ambulance_log_wrapper_keeps_its_csv_format(tmp_path):
+    import fixed_4way_ambulace_log
+
+    out = tmp_path / "fixed_4way_metrics.csv"
+    fixed_4way_ambulace_log.main(out, gui=False, sim_seconds=SIM_SECONDS)
+    with open(out, newline="") as f:
+        rows = list(csv.DictReader(f))
+    # the columns plot_3way_results_v3_amb_log.py reads
+    assert list(rows[0]) == controller.CSV_HEADER + [
+        "emg_active", "emg_id", "emg_dir", "emg_dist", "emg_detect_t", "emg_green_t", "emg_wait_time"]
+    first = next(i for i, r in enumerate(rows) if r["emg_id"])
+    assert all(r["emg_active"] == "1" for r in rows[first:])  # stays set, as before
+    assert all(len(r["emg_dist"].split(".")[1]) == 2 for r in rows[first:])
+    waits = [r for r in rows if r["emg_wait_time"]]
+    assert waits and all(int(r["emg_wait_time"]) == int(r["emg_green_t"]) - int(r["emg_detect_t"]) for r in waits)
+
+
+def test_log_yellow_off_keeps_green_rows_only(tmp_path):
+    rows = run_rows(tmp_path, "adaptive", log_yellow=False)
+    assert {int(r["phase"]) for r in rows} == {controller.PHASE[f"{d}_G"] for d in controller.ORDER}
+    assert phase_sequence(rows) == [s for s in PHASES["adaptive"] if s[0] % 2 == 0]
+
+
+def test_strategies_only_read_known_params():
+    for mode in controller.MODES:
+        assert controller.mode_keys(mode) <= set(controller.PARAMS)
+        params = controller.mode_params(mode)
+        assert set(params) == set(controller.PARAMS)
+
+
+def test_mode_params_rejects_keys_the_mode_ignores():
+    assert controller.mode_params("fixed", GREEN_TIME=20)["GREEN_TIME"] == 20
+    with pytest.raises(KeyError, match="not used by mode fixed"):
+        controller.mode_params("fixed", G_MAX=35)
+    with pytest.raises(KeyError, match="not used by mode rotational"):
+        controller.mode_params("rotational", MAX_WAIT=60)
+    with pytest.raises(KeyError, match="unknown"):
+        controller.mode_params("adaptive", G_MAXX=35)
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+if "SUMO_HOME" not in os.environ:
+    pytest.skip("SUMO_HOME not set", allow_module_level=True)
+
+import sweep
+
+
+def test_grid_keys_apply_only_to_modes_that_read_them():
+    grid = sweep.parse_grid(["G_MAX=30,35", "GREEN_TIME=20"])
+    grids, dropped = sweep.mode_grids(["fixed", "rotational", "ambulance"], grid)
+    assert grids == {"fixed": {"GREEN_TIME": [20]},
+                     "rotational": {"G_MAX": [30, 35]},
+                     "ambulance": {"G_MAX": [30, 35]}}
+    assert dropped == {"fixed": ["G_MAX"], "rotational": ["GREEN_TIME"], "ambulance": ["GREEN_TIME"]}
+    # one run per grid point: fixed x1, rotational x2, ambulance x2
+    assert len(sweep.expand(grids, ["routes_4.rou.xml"], [0])) == 5
+
+
+def test_grid_key_no_selected_mode_reads_is_an_error():
+    with pytest.raises(ValueError, match="not used by any"):
+        sweep.mode_grids(["fixed"], {"G_MAX": [30, 35]})
+    with pytest.raises(ValueError, match="unknown"):
+        sweep.mode_grids(["fixed"], {"GREEN": [20]})
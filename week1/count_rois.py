@@ -1,16 +1,38 @@
+import importlib.util
+import sys
+from pathlib import Path
+
 from ultralytics import YOLO
 import cv2
 
+# Counts vehicles per ROI, per frame. A box center inside several ROIs (e.g. on
+# the shared w // 2 or h // 2 quadrant edge) counts in EACH of them, as this
+# script always did: RoiLabelMap(count_overlaps=True). The edge scripts count
+# such a point once, in the later ROI.
+#
+# The counting helpers are the edge scripts' (week4/edge/postprocess.py,
+# roi_labels.py), loaded by path when main() runs.
+
+EDGE_DIR = Path(__file__).resolve().parents[1] / "week4" / "edge"
+
 VIDEO_PATH = "videos/traffic_2.mp4"
 
 # We only count these COCO classes
 VEHICLE_LABELS = {"car", "motorcycle", "bus", "truck"}
 
-def point_in_rect(cx, cy, rect):
-    x1, y1, x2, y2 = rect
-    return x1 <= cx <= x2 and y1 <= cy <= y2
+def load_edge_module(name):
+    """Import week4/edge/<name>.py by its path (registered under its flat name, as the edge scripts import it)."""
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, EDGE_DIR / f"{name}.py")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
 
 def main():
+    postprocess = load_edge_module("postprocess")
+    RoiLabelMap = load_edge_module("roi_labels").RoiLabelMap  # imports postprocess by name
+
     model = YOLO("yolov8n.pt")
 
     cap = cv2.VideoCapture(VIDEO_PATH)
@@ -32,6 +54,10 @@ def main():
         "West":  (w // 2, h // 2, w, h),
     }
 
+    # All ROIs compiled into one (bitmask) label image; each box center is one lookup
+    label_map = RoiLabelMap(ROIS, frame.shape, count_overlaps=True)
+    class_filter = postprocess.make_class_filter(model.names, VEHICLE_LABELS)
+
     # Restart video
     cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
 
@@ -40,24 +66,12 @@ def main():
         if not ret:
             break
 
-        results = model(frame, verbose=False)[0]
-        counts = {name: 0 for name in ROIS}
-
-        if results.boxes is not None:
-            for box in results.boxes:
-                cls_id = int(box.cls[0])
-                label = results.names[cls_id]
-
-                if label not in VEHICLE_LABELS:
-                    continue
-
-                x1, y1, x2, y2 = box.xyxy[0]
-                cx = int((x1 + x2) / 2)
-                cy = int((y1 + y2) / 2)
+        results = model(frame, classes=class_filter.classes, verbose=False)[0]
 
-                for roi_name, rect in ROIS.items():
-                    if point_in_rect(cx, cy, rect):
-                        counts[roi_name] += 1
+        vehicles = postprocess.select(postprocess.detections_from_results(results), class_filter.vehicle)
+        cx, cy = postprocess.centroids(vehicles.xyxy)
+        label_map.ensure_shape(frame.shape)
+        counts = label_map.counts(cx, cy)
 
         # Draw ROIs
         for roi_name, (x1, y1, x2, y2) in ROIS.items():
@@ -0,0 +1,367 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parents[1]
+sys.path.append(str(REPO_ROOT / "week4" / "edge"))
+
+from latency_hist import StageLatency
+from metrics_ring import load_run
+from postprocess import make_class_filter, select, centroids, in_rect
+from roi_labels import RoiLabelMap
+from synthetic_video import make_video, load_truth, lane_bounds, max_vehicle_px
+from stub_detector import StubDetector
+
+# Edge pipeline benchmark on synthetic traffic (synthetic_video.py) with a stub
+# detector of fixed latency (stub_detector.py): no video file or weights needed,
+# and the same commit gives the same counts on every machine.
+#
+#   python week4/bench/run_bench.py                      -> results/<time>_<commit>.json
+#   python week4/bench/run_bench.py compare a.json b.json
+#
+# Scenarios (each run in its own process, so module config never leaks between runs):
+#   edge_metrics - week4/edge/edge_yolo_metrics.py main(), serial / threads / processes,
+#                  with and without tracking (detector every DETECT_STRIDE frames)
+#   trapezium    - week4/edge/edge_yolo_trapezium_roi.py main(), per ROI shape
+#   count_rois   - week1/count_rois.py's per-frame loop (that script imports ultralytics
+#                  at the top and has no headless mode, so its loop is replayed here
+#                  with the same helpers)
+# Per run: frames/s, per-stage latency (ms percentiles) and counts vs ground truth.
+
+# ----------------- CONFIG -----------------
+CACHE_DIR = BENCH_DIR / "cache"      # generated clips (deterministic, safe to delete)
+RESULTS_DIR = BENCH_DIR / "results"
+
+RESOLUTIONS = [(1280, 720), (1920, 1080)]
+FPS = 15
+SECONDS = 20
+LANES = 4
+SEED = 0
+
+STUB_LATENCY_MS = 20.0
+STUB_JITTER_MS = 0.0
+STUB_SPIN = False  # True = the "inference" holds the GIL (pure-Python detector worst case)
+
+# None = do not pace (measure max throughput); a number = pace like the live system
+BENCH_TARGET_FPS = None
+
+EDGE_MODES = ["serial", "threads", "processes"]
+EDGE_TRACKING = [True, False]
+TRAPEZIUM_ROIS = ["trapezium", "lanes", "rects"]
+COUNT_ROIS_ROIS = ["quadrants", "lanes"]
+
+RUN_TIMEOUT_S = 600
+VEHICLE_LABELS = {"car", "motorcycle", "bus", "truck"}
+# ------------------------------------------
+
+
+# ---------- ROI shapes (scaled to the clip resolution) ----------
+def stopline_roi(w, h, lanes=LANES):
+    """edge_yolo_metrics.py STOPLINE_ROI: a rect over the first two lanes, lower part of the frame."""
+    bounds = lane_bounds(w, lanes)
+    return (bounds[0][0], int(h * 0.30), bounds[1][1], int(h * 0.95))
+
+
+def roi_shapes(name, w, h, lanes=LANES):
+    bounds = lane_bounds(w, lanes)
+    if name == "trapezium":
+        return {"ROI": [(int(w * 0.35), int(h * 0.30)), (int(w * 0.75), int(h * 0.30)),
+                        (int(w * 0.92), h - 1), (int(w * 0.18), h - 1)]}
+    if name == "lanes":
+        out = {}
+        for i, (x1, x2) in enumerate(bounds):
+            d = (x2 - x1) // 8
+            out[f"Lane{i + 1}"] = [(x1 + d, int(h * 0.2)), (x2 - d, int(h * 0.2)), (x2 - 1, h - 1), (x1, h - 1)]
+        return out
+    if name == "rects":
+        return {f"Lane{i + 1}": (x1, int(h * 0.2), x2 - 1, h - 1) for i, (x1, x2) in enumerate(bounds)}
+    if name == "quadrants":  # week1/count_rois.py
+        return {"North": (0, 0, w // 2, h // 2), "South": (0, h // 2, w // 2, h),
+                "East": (w // 2, 0, w, h // 2), "West": (w // 2, h // 2, w, h)}
+    raise ValueError(f"Unknown ROI shape: {name}")
+
+
+# ---------- ground truth ----------
+class Truth:
+    def __init__(self, path, rois, shape, count_overlaps=False):
+        self.frames = load_truth(path)
+        self.label_map = RoiLabelMap(rois, shape, count_overlaps) if not isinstance(rois, tuple) else None
+        self.rect = rois if isinstance(rois, tuple) else None
+
+    def counts(self, frame_idx):
+        xyxy, cls = self.frames[frame_idx]
+        xyxy = xyxy[cls != 0].astype(np.float32)  # class 0 = pedestrians
+        cx, cy = centroids(xyxy)
+        if self.rect is not None:
+            return {"Approach": int(in_rect(cx, cy, self.rect).sum())}
+        return self.label_map.counts(cx, cy)
+
+
+def count_accuracy(truth, frame_ids, counts):
+    """counts: list of {roi: n} for the frames in frame_ids. Absolute error summed over ROIs."""
+    errors, gt_total = [], []
+    for i, c in zip(frame_ids, counts):
+        gt = truth.counts(int(i))
+        errors.append(sum(abs(c.get(k, 0) - v) for k, v in gt.items()))
+        gt_total.append(sum(gt.values()))
+    if not errors:
+        return {"frames": 0}
+    errors = np.array(errors)
+    return {"frames": len(errors), "mae": round(float(errors.mean()), 4),
+            "exact_frac": round(float((errors == 0).mean()), 4), "max_error": int(errors.max()),
+            "gt_mean": round(float(np.mean(gt_total)), 3)}
+
+
+def make_stub(*_args, **_kwargs):
+    return StubDetector(STUB_LATENCY_MS, STUB_JITTER_MS, STUB_SPIN, SEED)
+
+
+def target_fps():
+    return BENCH_TARGET_FPS or 1000  # pacer deadlines every 1 ms never throttle the loop
+
+
+# ---------- scenarios (run inside the child process) ----------
+def run_edge_metrics(cfg, video, truth_path, work):
+    import edge_yolo_metrics as edge
+
+    w, h = cfg["resolution"]
+    roi = stopline_roi(w, h)
+    edge.load_detector = make_stub
+    edge.import_runtime = lambda backend: None
+    edge.VIDEO_PATH = video
+    edge.MODEL_PATH = video  # only checked for existence, the stub has no weights
+    edge.USE_PROFILE = False
+    edge.HEADLESS = True
+    edge.SNAPSHOT_EVERY_S = 0
+    edge.REALTIME_SOURCE = False
+    edge.TARGET_FPS = target_fps()
+    edge.WARMUP_RUNS = 1
+    edge.STOPLINE_ROI = roi
+    edge.TRACKING = cfg["tracking"]
+    edge.USE_PIPELINE = cfg["mode"] == "threads"
+    edge.PROCESS_MODE = cfg["mode"] == "processes"
+    edge.PUBSUB = False
+    edge.JSON_MIRROR = False
+    edge.OUT_CHANNEL = work / "live.bin"
+    edge.OUT_JSON = work / "live_counts.json"
+    edge.OUT_STARTUP_CSV = work / "startup.csv"
+    edge.METRICS_DIR = work / "runs"
+    edge.EXPORT_CSV = False  # the bench reads the run directory, never the tracked edge_metrics.csv
+    edge.main()
+
+    run_dir = next((work / "runs").iterdir())
+    cols = load_run(run_dir)
+    stages = json.loads((run_dir / "stage_latency.json").read_text())
+    frames = len(cols["frame_idx"])
+    wall = float(cols["sim_time_sec"][-1]) if frames else 0.0
+
+    x1, y1, x2, y2 = roi
+    truth = Truth(truth_path, (x1, y1, x2, y2), (h, w))
+    counts = [{"Approach": int(c)} for c in cols["vehicle_count"]]
+    return {"frames": frames, "wall_s": wall, "stages": stages,
+            "counts": count_accuracy(truth, cols["frame_idx"], counts)}
+
+
+def run_trapezium(cfg, video, truth_path, work):
+    import edge_yolo_trapezium_roi as trap
+
+    w, h = cfg["resolution"]
+    rois = roi_shapes(cfg["roi"], w, h)
+    tallies = []
+
+    class RecordingLabelMap(trap.RoiLabelMap):
+        def tally(self, ids):
+            counts = super().tally(ids)
+            tallies.append((time.perf_counter(), counts))
+            return counts
+
+    trap.RoiLabelMap = RecordingLabelMap
+    trap.load_detector = make_stub
+    trap.VIDEO_PATH = video
+    trap.LANE_ROIS = rois
+    trap.MAX_VEHICLE_PX = max_vehicle_px(w, LANES)
+    trap.HEADLESS = True
+    trap.SNAPSHOT_EVERY_S = 0
+    trap.REALTIME_SOURCE = False
+    trap.TARGET_FPS = target_fps()
+
+    # the script keeps its model local, so time detect() through the class
+    stage = StageLatency(("inference",))
+    detect = StubDetector.detect
+
+    def timed_detect(self, *args, **kwargs):
+        dets = detect(self, *args, **kwargs)
+        stage.record("inference", self.last_timing["inference"])
+        return dets
+
+    StubDetector.detect = timed_detect
+    trap.main()
+
+    wall = tallies[-1][0] - tallies[0][0] if len(tallies) > 1 else 0.0
+    truth = Truth(truth_path, rois, (h, w))
+    # the script reads frame 0 to set up and carries on from frame 1 (no rewind)
+    frame_ids = range(1, len(tallies) + 1)
+    return {"frames": len(tallies), "wall_s": wall, "stages": stage.to_dict(),
+            "counts": count_accuracy(truth, frame_ids, [c for _, c in tallies])}
+
+
+def run_count_rois(cfg, video, truth_path, work):
+    model = make_stub()
+    w, h = cfg["resolution"]
+    rois = roi_shapes(cfg["roi"], w, h)
+    cap = cv2.VideoCapture(str(video))
+    label_map = RoiLabelMap(rois, (h, w), count_overlaps=True)  # as count_rois.py
+    class_filter = make_class_filter(model.names, VEHICLE_LABELS)
+    stage = StageLatency(("decode", "inference", "postprocess", "count"))
+
+    counts = []
+    t_start = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        ret, frame = cap.read()
+        if not ret:
+            break
+        t1 = time.perf_counter()
+        dets = model.detect(frame, 640, 0.35, class_filter.classes)
+        t2 = time.perf_counter()
+        vehicles = select(dets, class_filter.vehicle)
+        cx, cy = centroids(vehicles.xyxy)
+        t3 = time.perf_counter()
+        label_map.ensure_shape(frame.shape)
+        counts.append(label_map.counts(cx, cy))
+        t4 = time.perf_counter()
+        stage.record_all({"decode": (t1 - t0) * 1000.0, "inference": (t2 - t1) * 1000.0,
+                          "postprocess": (t3 - t2) * 1000.0, "count": (t4 - t3) * 1000.0})
+    wall = time.perf_counter() - t_start
+    cap.release()
+
+    truth = Truth(truth_path, rois, (h, w), count_overlaps=True)
+    return {"frames": len(counts), "wall_s": wall, "stages": stage.to_dict(),
+            "counts": count_accuracy(truth, range(len(counts)), counts)}
+
+
+SCENARIOS = {"edge_metrics": run_edge_metrics, "trapezium": run_trapezium, "count_rois": run_count_rois}
+
+
+def run_child(cfg):
+    w, h = cfg["resolution"]
+    video, truth = make_video(CACHE_DIR, w, h, FPS, SECONDS, LANES, SEED)
+    with tempfile.TemporaryDirectory(prefix="fyp_bench_") as tmp:
+        out = SCENARIOS[cfg["scenario"]](cfg, video, truth, Path(tmp))
+    out["fps"] = round(out["frames"] / out["wall_s"], 2) if out["wall_s"] > 0 else 0.0
+    out["wall_s"] = round(out["wall_s"], 3)
+    out["source_frames"] = FPS * SECONDS
+    return out
+
+
+# ---------- parent ----------
+def configs():
+    for res in RESOLUTIONS:
+        for mode in EDGE_MODES:
+            for tracking in EDGE_TRACKING:
+                yield {"scenario": "edge_metrics", "resolution": res, "mode": mode, "roi": "rect",
+                       "tracking": tracking}
+        for roi in TRAPEZIUM_ROIS:
+            yield {"scenario": "trapezium", "resolution": res, "mode": "serial", "roi": roi}
+        for roi in COUNT_ROIS_ROIS:
+            yield {"scenario": "count_rois", "resolution": res, "mode": "serial", "roi": roi}
+
+
+def run_key(r):
+    tracking = {True: "track", False: "notrack"}.get(r.get("tracking"), "")
+    return "/".join(str(v) for v in (r["scenario"], "x".join(map(str, r["resolution"])), r["mode"],
+                                      r["roi"], tracking) if v != "")
+
+
+def git_info():
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True,
+                                  timeout=30).stdout.strip()
+        except (OSError, subprocess.TimeoutExpired):
+            return ""
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown",
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def spawn(cfg):
+    proc = subprocess.run([sys.executable, __file__, "child", json.dumps(cfg)], capture_output=True,
+                          text=True, timeout=RUN_TIMEOUT_S, cwd=BENCH_DIR)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith("BENCH_RESULT "):
+            return json.loads(line[len("BENCH_RESULT "):])
+    return {"error": (proc.stderr or proc.stdout).strip().splitlines()[-5:]}
+
+
+def fmt_stage(stages, name):
+    s = stages.get(name)
+    return f"{s['p50_ms']:.1f}/{s['p95_ms']:.1f}" if s else "-"
+
+
+def main():
+    meta = {
+        **git_info(),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "host": platform.node(), "machine": platform.machine(), "cpu_count": os.cpu_count(),
+        "python": platform.python_version(), "numpy": np.__version__, "opencv": cv2.__version__,
+        "config": {"fps": FPS, "seconds": SECONDS, "lanes": LANES, "seed": SEED,
+                   "stub_latency_ms": STUB_LATENCY_MS, "stub_jitter_ms": STUB_JITTER_MS, "stub_spin": STUB_SPIN,
+                   "target_fps": BENCH_TARGET_FPS},
+    }
+    for w, h in RESOLUTIONS:  # generate the clips once, before any timing
+        make_video(CACHE_DIR, w, h, FPS, SECONDS, LANES, SEED)
+
+    results = []
+    print(f"{'run':<48}{'FPS':>8}{'frames':>8}{'infer p50/p95':>16}{'count MAE':>11}{'exact':>7}")
+    for cfg in configs():
+        try:
+            out = spawn(cfg)
+        except subprocess.TimeoutExpired:
+            out = {"error": [f"timeout after {RUN_TIMEOUT_S} s"]}
+        r = {**cfg, **out}
+        results.append(r)
+        if "error" in out:
+            print(f"{run_key(r):<48} FAILED: {' | '.join(out['error'])}")
+            continue
+        c = out["counts"]
+        print(f"{run_key(r):<48}{out['fps']:>8.1f}{out['frames']:>8}{fmt_stage(out['stages'], 'inference'):>16}"
+              f"{c.get('mae', float('nan')):>11.3f}{c.get('exact_frac', 0):>7.2f}")
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTS_DIR / f"{time.strftime('%Y%m%d_%H%M%S')}_{meta['commit']}.json"
+    path.write_text(json.dumps({"meta": meta, "results": results}, indent=2))
+    print("Saved:", path)
+
+
+def compare(old_path, new_path):
+    old, new = (json.loads(Path(p).read_text()) for p in (old_path, new_path))
+    before = {run_key(r): r for r in old["results"] if "error" not in r}
+    print(f"{old['meta']['commit']} -> {new['meta']['commit']}")
+    print(f"{'run':<48}{'FPS old':>9}{'FPS new':>9}{'change':>9}{'MAE old':>9}{'MAE new':>9}")
+    for r in new["results"]:
+        key = run_key(r)
+        if "error" in r or key not in before:
+            continue
+        a = before[key]
+        change = (r["fps"] / a["fps"] - 1) * 100 if a["fps"] else 0.0
+        print(f"{key:<48}{a['fps']:>9.1f}{r['fps']:>9.1f}{change:>+8.1f}%"
+              f"{a['counts'].get('mae', 0):>9.3f}{r['counts'].get('mae', 0):>9.3f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "child":
+        result = run_child(json.loads(sys.argv[2]))
+        print("BENCH_RESULT " + json.dumps(result), flush=True)
+    elif len(sys.argv) > 3 and sys.argv[1] == "compare":
+        compare(sys.argv[2], sys.argv[3])
+    else:
+        main()
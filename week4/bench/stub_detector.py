@@ -0,0 +1,78 @@
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "edge"))
+from postprocess import Detections
+from synthetic_video import CLASSES, PERSON, PERSON_COLOUR
+
+# Stand-in for backends.*Detector on synthetic_video.py clips: finds the solid
+# coloured rectangles (connected components), classifies them by colour, then
+# waits `latency_ms` to stand in for the forward pass. Same detect() / names /
+# last_timing interface as the real detectors, so the edge scripts run unchanged.
+
+NAMES = {0: "person", 1: "bicycle", 2: "car", 3: "motorcycle", 5: "bus", 7: "truck"}
+MIN_AREA = 12          # px, drops compression specks
+FOREGROUND_LEVEL = 100  # any channel above this = object (background 40, lane lines 70)
+
+PALETTE_IDS = np.array([PERSON] + list(CLASSES), dtype=np.int32)
+PALETTE = np.array([PERSON_COLOUR] + [CLASSES[c][0] for c in CLASSES], dtype=np.float32)
+
+
+class StubDetector:
+    """
+    latency_ms: fixed cost per call, plus uniform +-jitter_ms (seeded, reproducible).
+    spin=False sleeps (releases the GIL like torch / onnxruntime do), spin=True
+    burns the CPU in Python instead (worst case for the threaded pipeline).
+    """
+
+    def __init__(self, latency_ms=20.0, jitter_ms=0.0, spin=False, seed=0):
+        self.names = dict(NAMES)
+        self.fixed_hw = None  # any input size, like the pytorch backend
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.spin = spin
+        self.rng = np.random.default_rng(seed)
+        self.last_timing = {}
+
+    def _wait(self, ms):
+        if ms <= 0:
+            return
+        if not self.spin:
+            time.sleep(ms / 1000.0)
+            return
+        end = time.perf_counter() + ms / 1000.0
+        while time.perf_counter() < end:
+            pass
+
+    def find_boxes(self, image):
+        b, g, r = cv2.split(image)
+        _, mask = cv2.threshold(cv2.max(cv2.max(b, g), r), FOREGROUND_LEVEL, 1, cv2.THRESH_BINARY)
+        _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=4)
+        stats = stats[1:]  # label 0 is the background
+        stats = stats[stats[:, cv2.CC_STAT_AREA] >= MIN_AREA]
+        x, y = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+        w, h = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT]
+        xyxy = np.column_stack([x, y, x + w, y + h]).astype(np.float32)
+
+        # colour at the box centre -> nearest class colour
+        colours = image[(y + h // 2).clip(0, image.shape[0] - 1), (x + w // 2).clip(0, image.shape[1] - 1)]
+        dist = ((colours[:, None, :].astype(np.float32) - PALETTE[None]) ** 2).sum(axis=2)
+        cls = PALETTE_IDS[dist.argmin(axis=1)] if len(stats) else np.zeros(0, np.int32)
+        return xyxy, cls
+
+    def detect(self, image, imgsz=640, conf=0.35, classes=None):
+        t0 = time.perf_counter()
+        xyxy, cls = self.find_boxes(image)
+        if classes is not None:
+            keep = np.isin(cls, classes)
+            xyxy, cls = xyxy[keep], cls[keep]
+        t1 = time.perf_counter()
+        ms = self.latency_ms + (self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+        self._wait(ms - (t1 - t0) * 1000.0)  # blob search counts towards the latency budget
+        total = (time.perf_counter() - t0) * 1000.0
+        self.last_timing = {"inference": total}
+        return Detections(xyxy, np.ones(len(cls), np.float32), cls.astype(np.int32))
@@ -0,0 +1,149 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Deterministic synthetic traffic video + ground truth, so the edge pipeline can
+# be benchmarked without traffic_2.mp4 or real weights.
+#
+# Vehicles are solid rectangles driving down `lanes` vertical lanes towards the
+# camera (like the real approach video); pedestrians are small white squares on
+# the left sidewalk. Each class has its own colour, which is what the stub
+# detector (stub_detector.py) keys on. Same parameters + seed = same video and
+# the same ground truth, byte for byte.
+
+BACKGROUND = 40
+SIDEWALK_FRAC = 0.08  # left strip with pedestrians, never inside a lane
+
+# class id (COCO) -> (BGR colour, (width, length) as a fraction of the lane width)
+CLASSES = {
+    2: ((0, 0, 230), (0.55, 0.7)),       # car
+    3: ((0, 220, 220), (0.20, 0.35)),    # motorcycle
+    5: ((230, 80, 0), (0.70, 1.4)),      # bus
+    7: ((0, 200, 0), (0.65, 1.1)),       # truck
+}
+CLASS_WEIGHTS = {2: 0.65, 3: 0.15, 5: 0.08, 7: 0.12}
+PERSON = 0
+PERSON_COLOUR = (255, 255, 255)
+
+
+def lane_bounds(width, lanes):
+    """x ranges of the lanes: they share the frame right of the sidewalk."""
+    x0 = int(width * (SIDEWALK_FRAC + 0.04))
+    lane_w = (width - x0) // lanes
+    return [(x0 + i * lane_w, x0 + (i + 1) * lane_w) for i in range(lanes)]
+
+
+def max_vehicle_px(width, lanes):
+    """Longest vehicle side in px (the bus length) for this frame width and lane count."""
+    lx1, lx2 = lane_bounds(width, lanes)[0]
+    return int(np.ceil((lx2 - lx1) * max(max(size) for _, size in CLASSES.values())))
+
+
+def plan_traffic(width, height, n_frames, lanes, seed):
+    """
+    All objects of the clip: list of (cls, x1, x2, length, speed, spawn_frame).
+    A vehicle only spawns once the one ahead of it in the lane is clear, so
+    boxes never overlap (overlapping rectangles would merge into one blob).
+    """
+    rng = np.random.default_rng(seed)
+    ids = list(CLASS_WEIGHTS)
+    p = np.array([CLASS_WEIGHTS[c] for c in ids])
+    objects = []
+    for lx1, lx2 in lane_bounds(width, lanes):
+        lane_w = lx2 - lx1
+        speed = height * rng.uniform(0.006, 0.02)  # px per frame
+        t = float(rng.integers(0, 20))
+        while t < n_frames:
+            cls = int(rng.choice(ids, p=p))
+            w_frac, l_frac = CLASSES[cls][1]
+            w, length = int(lane_w * w_frac), int(lane_w * l_frac)
+            margin = max(2, lane_w // 20)  # keeps neighbouring lanes' boxes apart after compression
+            x1 = lx1 + margin + int(rng.integers(0, max(1, lane_w - w - 2 * margin)))
+            objects.append((cls, x1, x1 + w, length, speed, int(t)))
+            gap = lane_w * rng.uniform(0.3, 2.5)
+            t += (length + gap) / speed + 1
+
+    side_w = int(width * SIDEWALK_FRAC)
+    size = max(4, side_w // 3)
+    t = 0.0
+    while t < n_frames:
+        x1 = int(rng.integers(0, max(1, side_w - size)))
+        speed = height * rng.uniform(0.002, 0.005)
+        objects.append((PERSON, x1, x1 + size, size, speed, int(t)))
+        t += (size * 3) / speed + rng.uniform(0, 30)
+    return objects
+
+
+def boxes_at(objects, frame_idx, height):
+    """Visible boxes (clipped to the frame) and their classes at frame_idx."""
+    boxes, classes = [], []
+    for cls, x1, x2, length, speed, spawn in objects:
+        if frame_idx < spawn:
+            continue
+        y2 = int(round((frame_idx - spawn) * speed))
+        y1 = y2 - length
+        if y1 >= height or y2 <= 0:
+            continue
+        boxes.append((x1, max(y1, 0), x2, min(y2, height)))
+        classes.append(cls)
+    return boxes, classes
+
+
+def draw_frame(width, height, lanes, boxes, classes):
+    frame = np.full((height, width, 3), BACKGROUND, dtype=np.uint8)
+    # lane separators, dim enough that the stub detector ignores them
+    for lx1, _ in lane_bounds(width, lanes):
+        cv2.line(frame, (lx1, 0), (lx1, height), (70, 70, 70), 2)
+    for (x1, y1, x2, y2), cls in zip(boxes, classes):
+        colour = PERSON_COLOUR if cls == PERSON else CLASSES[cls][0]
+        cv2.rectangle(frame, (x1, y1), (x2 - 1, y2 - 1), colour, -1)
+    return frame
+
+
+def video_name(width, height, fps, seconds, lanes, seed):
+    return f"synthetic_{width}x{height}_{fps}fps_{seconds}s_{lanes}lanes_seed{seed}"
+
+
+def make_video(out_dir, width=1280, height=720, fps=15, seconds=20, lanes=4, seed=0):
+    """
+    Write <name>.mp4 and <name>_truth.npz (frame, x1, y1, x2, y2, cls per visible
+    object) into out_dir, unless they already exist. Returns (video, truth) paths.
+    """
+    out_dir = Path(out_dir)
+    name = video_name(width, height, fps, seconds, lanes, seed)
+    video, truth = out_dir / f"{name}.mp4", out_dir / f"{name}_truth.npz"
+    if video.exists() and truth.exists():
+        return video, truth
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    n_frames = int(fps * seconds)
+    objects = plan_traffic(width, height, n_frames, lanes, seed)
+    writer = cv2.VideoWriter(str(video), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"OpenCV cannot write {video} (no mp4v encoder?)")
+
+    rows = []
+    for i in range(n_frames):
+        boxes, classes = boxes_at(objects, i, height)
+        writer.write(draw_frame(width, height, lanes, boxes, classes))
+        rows += [(i, *b, c) for b, c in zip(boxes, classes)]
+    writer.release()
+
+    rows = np.array(rows, dtype=np.int32).reshape(-1, 6)
+    np.savez_compressed(truth, frame=rows[:, 0], xyxy=rows[:, 1:5], cls=rows[:, 5],
+                        n_frames=n_frames, width=width, height=height, fps=fps)
+    return video, truth
+
+
+def load_truth(path):
+    """{frame_idx: (xyxy (N, 4), cls (N,))} for every frame of the clip."""
+    data = np.load(path)
+    frames = {i: (np.zeros((0, 4), np.int32), np.zeros(0, np.int32)) for i in range(int(data["n_frames"]))}
+    order = np.argsort(data["frame"], kind="stable")
+    f, xyxy, cls = data["frame"][order], data["xyxy"][order], data["cls"][order]
+    starts = np.searchsorted(f, np.arange(len(frames) + 1))
+    for i in range(len(frames)):
+        a, b = starts[i], starts[i + 1]
+        frames[i] = (xyxy[a:b], cls[a:b])
+    return frames
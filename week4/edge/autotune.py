@@ -0,0 +1,169 @@
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backends import BACKENDS, THREADED_BACKENDS, load_detector, sample_frames, timed_detect
+from host_profile import allowed_cpus, profile_path, save_profile, set_affinity
+from postprocess import make_class_filter, select, centroids, in_rect
+
+# Auto-tune: short calibration sweep on a sample clip, stores the fastest
+# configuration that stays under the latency ceiling in a per-host profile
+# (week4/edge/profiles/<hostname>.json). edge_yolo_metrics.py loads it at startup.
+#
+#   python week4/edge/autotune.py
+#
+# Swept: backend x input size x threads x CPU affinity. Smaller inputs are only
+# accepted while vehicle counts stay close to the reference (largest IMGSZ, pytorch),
+# otherwise 320 px would always "win" by missing the small cars.
+# Axes a backend ignores are not swept: static exports (onnx / onnx-int8 / openvino
+# from export_model) run at their baked-in input size only, openvino at its own
+# thread count. Threads and pinning use the cores this process may run on.
+
+# ----------------- CONFIG -----------------
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+VIDEO_PATH = REPO_ROOT / "week1" / "videos" / "traffic_2.mp4"
+MODEL_PATH = REPO_ROOT / "week1" / "yolov8n.pt"
+ONNX_PATH = REPO_ROOT / "week1" / "yolov8n.onnx"
+INT8_PATH = REPO_ROOT / "week1" / "yolov8n_int8.onnx"
+OPENVINO_DIR = REPO_ROOT / "week1" / "yolov8n_openvino_model"
+
+CONF = 0.35
+TARGET_FPS = 15
+ROI = (232, 230, 775, 1000)  # same STOPLINE_ROI as edge_yolo_metrics.py
+N_FRAMES = 40
+FRAME_STEP = 5
+WARMUP = 3
+
+BACKEND_CANDIDATES = list(BACKENDS)  # the ones without a model file are skipped
+IMGSZ_CANDIDATES = [320, 416, 512, 640]
+THREAD_CANDIDATES = None  # None = 1, 2, 4, ... up to the allowed core count
+
+LATENCY_CEILING_MS = 1000.0 / TARGET_FPS  # p95 inference must fit in one frame interval
+MAX_COUNT_MAE = 0.5                        # vs the reference counts, per frame
+
+VEHICLE_LABELS = {"car", "motorcycle", "bus", "truck"}
+# ------------------------------------------
+
+
+def thread_candidates(backend):
+    if backend not in THREADED_BACKENDS:
+        return [0]  # library default, the backend has no thread setting
+    if THREAD_CANDIDATES:
+        return THREAD_CANDIDATES
+    n = len(allowed_cpus())
+    out, t = [], 1
+    while t < n:
+        out.append(t)
+        t *= 2
+    return out + [n]
+
+
+def affinity_candidates(threads):
+    """Unpinned, and pinned to the first `threads` allowed cores (fewer migrations, warmer caches)."""
+    cpus = allowed_cpus()
+    return [None] if not threads or threads >= len(cpus) else [None, cpus[:threads]]
+
+
+def imgsz_candidates(detector):
+    """IMGSZ_CANDIDATES, or just the input size a static model was exported with."""
+    if detector.fixed_hw is None:
+        return sorted(IMGSZ_CANDIDATES, reverse=True)
+    h, w = detector.fixed_hw
+    return [h if h == w else [h, w]]
+
+
+def model_file(backend):
+    return {"pytorch": MODEL_PATH, "onnx": ONNX_PATH, "onnx-int8": INT8_PATH,
+            "openvino": OPENVINO_DIR}[backend]
+
+
+def count_in_roi(dets, class_filter, roi_w, roi_h):
+    vehicles = select(dets, class_filter.vehicle)
+    cx, cy = centroids(vehicles.xyxy)
+    return int(in_rect(cx, cy, (0, 0, roi_w, roi_h)).sum())
+
+
+def run_config(detector, frames, imgsz, class_filter, roi_wh):
+    for f in frames[:WARMUP]:
+        detector.detect(f, imgsz, CONF, class_filter.classes)
+
+    ms, counts = [], []
+    t0 = time.perf_counter()
+    for f in frames:
+        dets, t = timed_detect(detector, f, imgsz, CONF, class_filter.classes)
+        ms.append(t)
+        counts.append(count_in_roi(dets, class_filter, *roi_wh))
+    wall = time.perf_counter() - t0
+
+    ms = np.asarray(ms)
+    return {"fps": len(frames) / wall, "mean_ms": float(ms.mean()),
+            "p95_ms": float(np.percentile(ms, 95)), "counts": counts}
+
+
+def pick_best(results):
+    ok = [r for r in results if r["p95_ms"] <= LATENCY_CEILING_MS and r["count_mae"] <= MAX_COUNT_MAE]
+    if not ok:
+        # nothing meets the ceiling: take the lowest latency that still counts correctly
+        ok = [r for r in results if r["count_mae"] <= MAX_COUNT_MAE] or results
+        return min(ok, key=lambda r: r["p95_ms"]), False
+    return max(ok, key=lambda r: r["fps"]), True
+
+
+def main():
+    x1, y1, x2, y2 = ROI
+    frames = [f[y1:y2, x1:x2] for f in sample_frames(VIDEO_PATH, N_FRAMES, FRAME_STEP)]
+    if not frames:
+        raise RuntimeError(f"No frames read from {VIDEO_PATH}")
+    roi_wh = (x2 - x1, y2 - y1)
+
+    backends = [b for b in BACKEND_CANDIDATES if model_file(b).exists()]
+    if not backends:
+        raise RuntimeError("No model files found for any backend")
+    print(f"Sweeping {backends} x imgsz {IMGSZ_CANDIDATES} x threads {thread_candidates(THREADED_BACKENDS[0])} "
+          f"on {len(frames)} frames, cores {allowed_cpus()} (ceiling {LATENCY_CEILING_MS:.1f} ms p95)")
+
+    results = []
+    ref_counts = None
+    original_affinity = set_affinity(None)
+    try:
+        for backend in backends:
+            for threads in thread_candidates(backend):
+                # thread count is fixed when the session / torch pool is created
+                detector = load_detector(backend, MODEL_PATH, ONNX_PATH, INT8_PATH, OPENVINO_DIR, threads)
+                class_filter = make_class_filter(detector.names, VEHICLE_LABELS)
+                sizes = imgsz_candidates(detector)
+                if detector.fixed_hw is not None and len(sizes) < len(IMGSZ_CANDIDATES):
+                    print(f"{backend}: static {detector.fixed_hw[0]}x{detector.fixed_hw[1]} export, imgsz not swept")
+                for affinity in affinity_candidates(threads):
+                    set_affinity(affinity)
+                    for imgsz in sizes:
+                        r = run_config(detector, frames, imgsz, class_filter, roi_wh)
+                        if ref_counts is None:
+                            ref_counts = np.array(r["counts"])  # first run: largest imgsz, first backend
+                        r["count_mae"] = float(np.abs(np.array(r.pop("counts")) - ref_counts).mean())
+                        r.update(backend=backend, imgsz=imgsz, threads=threads, affinity=affinity)
+                        results.append(r)
+                        pinned = "pinned" if affinity else "      "
+                        print(f"{backend:<10} imgsz={str(imgsz):<4} threads={threads:<3} {pinned} {r['fps']:6.1f} FPS "
+                              f"p95 {r['p95_ms']:7.2f} ms  MAE {r['count_mae']:.2f}")
+                set_affinity(None)
+    finally:
+        set_affinity(original_affinity)
+
+    best, meets = pick_best(results)
+    path = profile_path()
+    save_profile(path, best, results, latency_ceiling_ms=LATENCY_CEILING_MS,
+                 max_count_mae=MAX_COUNT_MAE, meets_ceiling=meets,
+                 sample=str(VIDEO_PATH.relative_to(REPO_ROOT)), frames=len(frames))
+
+    if not meets:
+        print(f"WARNING: no configuration reached {LATENCY_CEILING_MS:.1f} ms p95; using the fastest one")
+    print(f"Best: {best['backend']} imgsz={best['imgsz']} threads={best['threads']} "
+          f"affinity={best['affinity']} -> {best['fps']:.1f} FPS, p95 {best['p95_ms']:.2f} ms")
+    print("Saved:", path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+import ast
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from postprocess import Detections, detections_from_results, empty_detections
+
+# Backends for the edge scripts. All of them return postprocess.Detections
+# (full-image pixel xyxy, conf, cls), so the counting code does not care which
+# one produced the boxes.
+#
+#   "pytorch"   : ultralytics + the .pt weights (default, what we had before)
+#   "onnx"      : exported .onnx run directly with onnxruntime (no torch at runtime)
+#   "onnx-int8" : same, with an INT8 statically quantized model (see quantize_onnx_int8)
+#   "openvino"  : ultralytics-exported OpenVINO model dir, run through ultralytics
+BACKENDS = ("pytorch", "onnx", "onnx-int8", "openvino")
+THREADED_BACKENDS = ("pytorch", "onnx", "onnx-int8")  # openvino picks its own thread count
+
+IOU = 0.7  # ultralytics predict default, keep NMS identical across backends
+
+
+class UltralyticsDetector:
+    """
+    .pt (or OpenVINO export dir) through ultralytics YOLO.predict.
+    fixed_hw: None for .pt (any imgsz), the baked-in input size of a static export.
+    """
+
+    def __init__(self, model_path, threads=0):
+        from ultralytics import YOLO
+
+        if threads:
+            set_torch_threads(threads)
+        self.model = YOLO(str(model_path))
+        self.fixed_hw = openvino_input_hw(model_path) if Path(model_path).is_dir() else None
+        self.names = self.model.names
+        self.last_timing = {}  # stage -> ms of the last detect() call
+
+    def detect(self, image, imgsz=640, conf=0.35, classes=None):
+        results = self.model.predict(source=image, imgsz=imgsz, conf=conf, iou=IOU,
+                                     classes=classes, verbose=False)[0]
+        t = time.perf_counter()
+        dets = detections_from_results(results)
+        # ultralytics times its own stages (ms); our box conversion counts as post-processing
+        speed = getattr(results, "speed", None) or {}
+        self.last_timing = {"preprocess": speed.get("preprocess", 0.0), "inference": speed.get("inference", 0.0),
+                            "postprocess": speed.get("postprocess", 0.0) + (time.perf_counter() - t) * 1000.0}
+        return dets
+
+
+def openvino_input_hw(model_dir):
+    """(h, w) of a static OpenVINO export, read from its IR .xml; None if dynamic or not found."""
+    xml = next(Path(model_dir).glob("*.xml"), None)
+    if xml is None:
+        return None
+    for layer in ET.parse(xml).getroot().iter("layer"):
+        if layer.get("type") == "Parameter":
+            data = layer.find("data")
+            dims = data.get("shape", "").split(",") if data is not None else []
+            if len(dims) == 4 and dims[2].strip().isdigit() and dims[3].strip().isdigit():
+                return int(dims[2]), int(dims[3])
+            return None
+    return None
+
+
+def set_torch_threads(threads):
+    import torch
+
+    torch.set_num_threads(threads)
+
+
+class OnnxDetector:
+    """
+    YOLOv8 ONNX export run with onnxruntime on CPU.
+    Pre/post-processing re-implements what ultralytics does:
+    letterbox -> RGB CHW float -> model -> conf/class filter -> class-aware NMS -> undo letterbox.
+    """
+
+    def __init__(self, onnx_path, threads=0):
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        if threads:
+            opts.intra_op_num_threads = threads
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(onnx_path), sess_options=opts,
+                                            providers=["CPUExecutionProvider"])
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        # static export: [1, 3, H, W]; dynamic export has strings there.
+        # With a static model imgsz is ignored: every image is letterboxed into fixed_hw.
+        h, w = inp.shape[2], inp.shape[3]
+        self.fixed_hw = (h, w) if isinstance(h, int) and isinstance(w, int) else None
+        self.names = read_onnx_names(self.session)
+        self.last_timing = {}  # stage -> ms of the last detect() call
+
+    def input_hw(self, imgsz):
+        if self.fixed_hw is not None:
+            return self.fixed_hw
+        if isinstance(imgsz, int):
+            return imgsz, imgsz
+        return tuple(imgsz)
+
+    def detect(self, image, imgsz=640, conf=0.35, classes=None):
+        t0 = time.perf_counter()
+        blob, gain, pad = preprocess(image, self.input_hw(imgsz))
+        t1 = time.perf_counter()
+        out = self.session.run(None, {self.input_name: blob})[0]
+        t2 = time.perf_counter()
+        dets = decode_yolov8(out[0], image.shape[:2], gain, pad, conf, classes)
+        self.last_timing = {"preprocess": (t1 - t0) * 1000.0, "inference": (t2 - t1) * 1000.0,
+                            "postprocess": (time.perf_counter() - t2) * 1000.0}
+        return dets
+
+
+def read_onnx_names(session):
+    """ultralytics writes the class names into the ONNX metadata as a dict literal."""
+    meta = session.get_modelmeta().custom_metadata_map
+    if "names" in meta:
+        return ast.literal_eval(meta["names"])
+    return {}
+
+
+def letterbox(image, new_hw, color=(114, 114, 114)):
+    """Resize keeping aspect ratio and pad to new_hw (centered, like ultralytics)."""
+    h, w = image.shape[:2]
+    nh, nw = new_hw
+    gain = min(nh / h, nw / w)
+    rh, rw = int(round(h * gain)), int(round(w * gain))
+    if (rh, rw) != (h, w):
+        image = cv2.resize(image, (rw, rh), interpolation=cv2.INTER_LINEAR)
+    top, left = (nh - rh) // 2, (nw - rw) // 2
+    out = cv2.copyMakeBorder(image, top, nh - rh - top, left, nw - rw - left,
+                             cv2.BORDER_CONSTANT, value=color)
+    return out, gain, (left, top)
+
+
+def preprocess(image, new_hw):
+    padded, gain, pad = letterbox(image, new_hw)
+    blob = cv2.dnn.blobFromImage(padded, scalefactor=1 / 255.0, swapRB=True)  # (1, 3, H, W) float32
+    return blob, gain, pad
+
+
+def decode_yolov8(pred, orig_hw, gain, pad, conf=0.35, classes=None, iou=IOU, max_det=300):
+    """
+    pred: (4 + nc, N) raw YOLOv8 head output (cx, cy, w, h, class scores).
+    Returns Detections in original image pixels.
+    """
+    pred = pred.T  # (N, 4 + nc)
+    scores_all = pred[:, 4:]
+    cls = scores_all.argmax(axis=1)
+    scores = scores_all[np.arange(len(cls)), cls]
+
+    keep = scores >= conf
+    if classes is not None:
+        keep &= np.isin(cls, classes)
+    if not keep.any():
+        return empty_detections()
+
+    boxes, scores, cls = pred[keep, :4], scores[keep], cls[keep]
+
+    # class-aware NMS: shift boxes of each class far apart, then one NMS call
+    xywh = np.column_stack([boxes[:, 0] - boxes[:, 2] / 2, boxes[:, 1] - boxes[:, 3] / 2,
+                            boxes[:, 2], boxes[:, 3]])
+    shifted = xywh.copy()
+    shifted[:, :2] += cls[:, None] * 7680.0
+    idx = cv2.dnn.NMSBoxes(shifted.tolist(), scores.tolist(), conf, iou)
+    idx = np.array(idx, dtype=np.int64).reshape(-1)[:max_det]
+
+    xywh, scores, cls = xywh[idx], scores[idx], cls[idx]
+    xyxy = np.column_stack([xywh[:, 0], xywh[:, 1], xywh[:, 0] + xywh[:, 2], xywh[:, 1] + xywh[:, 3]])
+
+    # undo letterbox
+    xyxy[:, [0, 2]] = (xyxy[:, [0, 2]] - pad[0]) / gain
+    xyxy[:, [1, 3]] = (xyxy[:, [1, 3]] - pad[1]) / gain
+    h, w = orig_hw
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, w)
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, h)
+
+    return Detections(xyxy.astype(np.float32), scores.astype(np.float32), cls.astype(np.int32))
+
+
+def import_runtime(backend):
+    """Import the heavy runtime on its own, so startup can time it separately from the model load."""
+    if backend in ("pytorch", "openvino"):
+        import ultralytics  # noqa: F401
+    else:
+        import onnxruntime  # noqa: F401
+
+
+def load_detector(backend, pt_path, onnx_path=None, int8_path=None, openvino_dir=None, threads=0):
+    if backend == "pytorch":
+        return UltralyticsDetector(pt_path, threads)
+    if backend == "onnx":
+        return OnnxDetector(onnx_path, threads)
+    if backend == "onnx-int8":
+        return OnnxDetector(int8_path, threads)
+    if backend == "openvino":
+        return UltralyticsDetector(openvino_dir)
+    raise ValueError(f"Unknown backend: {backend} (choose from {BACKENDS})")
+
+
+# ---------- export / quantization (run once on a dev machine or the edge box) ----------
+def export_model(pt_path, fmt="onnx", imgsz=640):
+    """Export .pt with ultralytics. fmt: "onnx" or "openvino". Returns the exported path."""
+    from ultralytics import YOLO
+
+    return Path(YOLO(str(pt_path)).export(format=fmt, imgsz=imgsz, dynamic=False, simplify=True))
+
+
+def sample_frames(video_path, n_frames=200, step=15):
+    """Every step-th frame of our own video, used as INT8 calibration data."""
+    cap = cv2.VideoCapture(str(video_path))
+    frames = []
+    idx = 0
+    while len(frames) < n_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if idx % step == 0:
+            frames.append(frame)
+        idx += 1
+    cap.release()
+    return frames
+
+
+def quantize_onnx_int8(onnx_path, out_path, calib_videos, n_frames=200, step=15):
+    """
+    Static INT8 quantization (QDQ, per-channel weights) calibrated on frames
+    from our own traffic videos, so activation ranges match real scenes.
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    session = ort.InferenceSession(str(onnx_path), providers=["CPUExecutionProvider"])
+    inp = session.get_inputs()[0]
+    hw = (inp.shape[2], inp.shape[3])
+
+    frames = []
+    for video in calib_videos:
+        frames += sample_frames(video, n_frames // max(len(calib_videos), 1), step)
+    if not frames:
+        raise RuntimeError("No calibration frames read from: " + ", ".join(map(str, calib_videos)))
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self._it = iter(frames)
+
+        def get_next(self):
+            frame = next(self._it, None)
+            if frame is None:
+                return None
+            return {inp.name: preprocess(frame, hw)[0]}
+
+    prepped = Path(out_path).with_suffix(".prep.onnx")
+    quant_pre_process(str(onnx_path), str(prepped))
+    quantize_static(str(prepped), str(out_path), FrameReader(),
+                    quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    prepped.unlink(missing_ok=True)
+    copy_metadata(onnx_path, out_path)  # keep the class names for read_onnx_names
+    return Path(out_path)
+
+
+def copy_metadata(src_path, dst_path):
+    import onnx
+
+    src = onnx.load(str(src_path), load_external_data=False)
+    dst = onnx.load(str(dst_path))
+    have = {p.key for p in dst.metadata_props}
+    for prop in src.metadata_props:
+        if prop.key not in have:
+            dst.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(dst, str(dst_path))
+
+
+def timed_detect(detector, image, imgsz, conf, classes):
+    t0 = time.perf_counter()
+    dets = detector.detect(image, imgsz, conf, classes)
+    return dets, (time.perf_counter() - t0) * 1000.0
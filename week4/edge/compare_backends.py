@@ -0,0 +1,104 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from backends import load_detector, export_model, quantize_onnx_int8, sample_frames, timed_detect
+from postprocess import make_class_filter, select, centroids, in_rect
+
+# ----------------- CONFIG -----------------
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+VIDEO_PATH = REPO_ROOT / "week1" / "videos" / "traffic_2.mp4"
+PT_PATH = REPO_ROOT / "week1" / "yolov8n.pt"
+ONNX_PATH = REPO_ROOT / "week1" / "yolov8n.onnx"
+INT8_PATH = REPO_ROOT / "week1" / "yolov8n_int8.onnx"
+OPENVINO_DIR = REPO_ROOT / "week1" / "yolov8n_openvino_model"
+
+CANDIDATES = ["onnx", "onnx-int8"]  # compared against the .pt ("pytorch") reference
+IMGSZ = 640
+CONF = 0.35
+THREADS = 0        # torch / onnxruntime intra-op threads, 0 = library default
+N_FRAMES = 300
+FRAME_STEP = 2     # use every 2nd frame of the video
+ROI = (232, 230, 775, 1000)  # same STOPLINE_ROI as edge_yolo_metrics.py
+
+OUT_JSON = REPO_ROOT / "week4" / "metrics" / "backend_comparison.json"
+
+VEHICLE_LABELS = {"car", "motorcycle", "bus", "truck"}
+# ------------------------------------------
+
+
+def ensure_models():
+    if not ONNX_PATH.exists() and ({"onnx", "onnx-int8"} & set(CANDIDATES)):
+        print("Exporting ONNX...")
+        exported = export_model(PT_PATH, "onnx", IMGSZ)
+        if exported != ONNX_PATH:
+            exported.rename(ONNX_PATH)
+    if not INT8_PATH.exists() and "onnx-int8" in CANDIDATES:
+        print("Quantizing INT8 (calibrating on", VIDEO_PATH.name, ")...")
+        quantize_onnx_int8(ONNX_PATH, INT8_PATH, [VIDEO_PATH])
+    if not OPENVINO_DIR.exists() and "openvino" in CANDIDATES:
+        print("Exporting OpenVINO...")
+        exported = export_model(PT_PATH, "openvino", IMGSZ)
+        if exported != OPENVINO_DIR:
+            exported.rename(OPENVINO_DIR)
+
+
+def count_in_roi(dets, class_filter, roi_w, roi_h):
+    vehicles = select(dets, class_filter.vehicle)
+    cx, cy = centroids(vehicles.xyxy)
+    return int(in_rect(cx, cy, (0, 0, roi_w, roi_h)).sum())
+
+
+def latency_summary(ms):
+    ms = np.asarray(ms[1:] if len(ms) > 1 else ms)  # first call includes lazy init
+    return {"mean_ms": float(ms.mean()), "p50_ms": float(np.percentile(ms, 50)),
+            "p95_ms": float(np.percentile(ms, 95)), "max_ms": float(ms.max())}
+
+
+def main():
+    ensure_models()
+
+    backends = ["pytorch"] + CANDIDATES
+    detectors = {
+        b: load_detector(b, PT_PATH, ONNX_PATH, INT8_PATH, OPENVINO_DIR, THREADS) for b in backends
+    }
+    ref_names = detectors["pytorch"].names
+    class_filter = make_class_filter(ref_names, VEHICLE_LABELS)
+
+    x1, y1, x2, y2 = ROI
+    frames = [f[y1:y2, x1:x2] for f in sample_frames(VIDEO_PATH, N_FRAMES, FRAME_STEP)]
+    if not frames:
+        raise RuntimeError(f"No frames read from {VIDEO_PATH}")
+
+    latency = {b: [] for b in backends}
+    counts = {b: [] for b in backends}
+    for roi_frame in frames:
+        for b in backends:
+            dets, ms = timed_detect(detectors[b], roi_frame, IMGSZ, CONF, class_filter.classes)
+            latency[b].append(ms)
+            counts[b].append(count_in_roi(dets, class_filter, x2 - x1, y2 - y1))
+
+    ref = np.array(counts["pytorch"])
+    report = {"frames": len(frames), "imgsz": IMGSZ, "conf": CONF, "backends": {}}
+    for b in backends:
+        c = np.array(counts[b])
+        report["backends"][b] = {
+            **latency_summary(latency[b]),
+            "count_agreement": float((c == ref).mean()),    # fraction of frames with identical count
+            "count_mae": float(np.abs(c - ref).mean()),
+            "mean_count": float(c.mean()),
+        }
+
+    OUT_JSON.parent.mkdir(parents=True, exist_ok=True)
+    OUT_JSON.write_text(json.dumps(report, indent=2))
+
+    print(f"{'backend':<10} {'mean ms':>8} {'p95 ms':>8} {'agree':>7} {'MAE':>6}")
+    for b, r in report["backends"].items():
+        print(f"{b:<10} {r['mean_ms']:8.2f} {r['p95_ms']:8.2f} {r['count_agreement']:7.1%} {r['count_mae']:6.2f}")
+    print("Saved:", OUT_JSON)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import time
+from pathlib import Path
+
+import cv2
+from ultralytics import YOLO
+
+from batching import batch_class_filter, crop_rois, count_batched, compare_batched_vs_sequential
+from live_channel import JsonMirror
+
+# ----------------- CONFIG -----------------
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+MODEL_PATH = REPO_ROOT / "week1" / "yolov8n.pt"
+OUT_JSON = REPO_ROOT / "week4" / "integration" / "live_counts.json"
+JSON_EVERY_S = 1.0  # atomic, rate-limited rewrites (live_channel.JsonMirror)
+
+IMGSZ = 640
+CONF = 0.35
+TARGET_FPS = 15
+ENABLE_EMERGENCY = False
+
+# "rois"    = one camera, the 4 approach ROIs of week1/count_rois.py batched together
+# "streams" = one frame from each approach camera batched together
+BATCH_MODE = "rois"
+
+# Used by "rois" mode. None = same quadrants as week1/count_rois.py (sized from first frame)
+VIDEO_PATH = REPO_ROOT / "week1" / "videos" / "traffic_2.mp4"
+ROIS = None
+
+# Used by "streams" mode: approach -> (video path, crop ROI or None for full frame)
+CAMERA_SOURCES = {
+    "North": (REPO_ROOT / "week1" / "videos" / "traffic_2.mp4", (232, 230, 775, 1000)),
+    "South": (REPO_ROOT / "week1" / "videos" / "traffic_2.mp4", (232, 230, 775, 1000)),
+    "East":  (REPO_ROOT / "week1" / "videos" / "traffic_2.mp4", (232, 230, 775, 1000)),
+    "West":  (REPO_ROOT / "week1" / "videos" / "traffic_2.mp4", (232, 230, 775, 1000)),
+}
+
+# Print batched vs one-call-per-approach latency on the first frame(s) before running
+RUN_COMPARISON = True
+# ------------------------------------------
+
+
+def default_rois(w, h):
+    # Same layout as week1/count_rois.py
+    return {
+        "North": (0, 0, w // 2, h // 2),
+        "South": (0, h // 2, w // 2, h),
+        "East":  (w // 2, 0, w, h // 2),
+        "West":  (w // 2, h // 2, w, h),
+    }
+
+
+class RoiFrames:
+    """One camera -> one crop per ROI."""
+
+    def __init__(self, video_path, rois):
+        self.cap = cv2.VideoCapture(str(video_path))
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Cannot open video: {video_path}")
+        self.rois = rois
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        if self.rois is None:
+            h, w = frame.shape[:2]
+            self.rois = default_rois(w, h)
+        return crop_rois(frame, self.rois)
+
+    def release(self):
+        self.cap.release()
+
+
+class StreamFrames:
+    """Several cameras -> one (optionally cropped) frame per camera."""
+
+    def __init__(self, sources):
+        self.caps = {}
+        self.crops = {}
+        for name, (path, roi) in sources.items():
+            cap = cv2.VideoCapture(str(path))
+            if not cap.isOpened():
+                raise RuntimeError(f"Cannot open video for {name}: {path}")
+            self.caps[name] = cap
+            self.crops[name] = roi
+
+    def read(self):
+        names, images = [], []
+        for name, cap in self.caps.items():
+            ret, frame = cap.read()
+            if not ret:
+                return None  # stop when any stream ends
+            roi = self.crops[name]
+            if roi is not None:
+                x1, y1, x2, y2 = roi
+                frame = frame[y1:y2, x1:x2]
+            names.append(name)
+            images.append(frame)
+        return names, images
+
+    def release(self):
+        for cap in self.caps.values():
+            cap.release()
+
+
+def main():
+    if not MODEL_PATH.exists():
+        raise RuntimeError(f"Model not found: {MODEL_PATH}")
+
+    model = YOLO(str(MODEL_PATH))
+    class_filter = batch_class_filter(model.names, ENABLE_EMERGENCY)
+
+    if BATCH_MODE == "rois":
+        source = RoiFrames(VIDEO_PATH, ROIS)
+    elif BATCH_MODE == "streams":
+        source = StreamFrames(CAMERA_SOURCES)
+    else:
+        raise ValueError(f"Unknown BATCH_MODE: {BATCH_MODE}")
+
+    mirror = JsonMirror(OUT_JSON, JSON_EVERY_S)
+
+    batch = source.read()
+    if batch is None:
+        raise RuntimeError("Could not read first frame(s).")
+
+    if RUN_COMPARISON:
+        names, images = batch
+        cmp = compare_batched_vs_sequential(model, names, images, class_filter, imgsz=IMGSZ, conf=CONF)
+        print(f"{cmp['images']} images: batched {cmp['batched_ms']:.1f} ms vs "
+              f"sequential {cmp['sequential_ms']:.1f} ms per update")
+
+    frame_interval = 1.0 / TARGET_FPS
+    start_wall = time.time()
+    last_frame_wall = time.time()
+    payload = None
+
+    while batch is not None:
+        names, images = batch
+        counts, emergency, inference_ms = count_batched(
+            model, names, images, class_filter, imgsz=IMGSZ, conf=CONF
+        )
+
+        payload = {
+            "t": round(time.time() - start_wall, 3),
+            "counts": counts,
+            "emergency": bool(emergency)
+        }
+        mirror.write(payload)
+        print(counts, f"{inference_ms:.1f} ms")
+
+        # FPS throttle
+        now = time.time()
+        elapsed = now - last_frame_wall
+        if elapsed < frame_interval:
+            time.sleep(frame_interval - elapsed)
+        last_frame_wall = time.time()
+
+        batch = source.read()
+
+    if payload is not None:
+        mirror.write(payload, force=True)  # last update, whatever the rate limit skipped
+    source.release()
+    print("Done.")
+    print("Live counts JSON:", OUT_JSON)
+
+
+if __name__ == "__main__":
+    main()
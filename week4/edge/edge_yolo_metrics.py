@@ -1,12 +1,29 @@
-import os
 import time
-import json
-import csv
+T_PROCESS_START = time.perf_counter()  # startup phases are measured from here
+
+import os
+import signal
 from pathlib import Path
 
 import cv2
-import psutil
-from ultralytics import YOLO
+
+from backends import load_detector, import_runtime
+from ffmpeg_source import FFmpegCapture
+from live_channel import LiveCountsWriter, JsonMirror, default_path as default_channel_path
+from live_pubsub import LivePublisher, default_address as default_pubsub_address
+from latency_hist import StageLatency
+from metrics_ring import MetricsRing, Rollups, export_csv
+from host_profile import profile_path, load_profile, set_affinity
+from motion_gate import MotionGate
+from pacing import FramePacer
+from pipeline import StagedPipeline
+from resource_sampler import ResourceSampler
+from shm_pipeline import ProcessPipeline
+from render import SnapshotWriter, RenderTimer, close_windows
+from startup import StartupTimer, warm_up
+from tracker import Tracker, StopLineCounter
+from postprocess import make_class_filter, select, any_class, centroids, in_rect
+T_IMPORTS_DONE = time.perf_counter()
 
 # ----------------- CONFIG -----------------
 # If you run from repo root, these paths are correct.
@@ -15,15 +32,107 @@ REPO_ROOT = Path(__file__).resolve().parents[2]
 VIDEO_PATH = REPO_ROOT / "week1" / "videos" / "traffic_2.mp4"
 MODEL_PATH = REPO_ROOT / "week1" / "yolov8n.pt"
 
+# Inference backend (see backends.py / compare_backends.py):
+# "pytorch" = .pt via ultralytics, "onnx" / "onnx-int8" = onnxruntime, "openvino"
+BACKEND = "pytorch"
+ONNX_PATH = REPO_ROOT / "week1" / "yolov8n.onnx"
+INT8_PATH = REPO_ROOT / "week1" / "yolov8n_int8.onnx"
+OPENVINO_DIR = REPO_ROOT / "week1" / "yolov8n_openvino_model"
+THREADS = 0  # torch / onnxruntime intra-op threads, 0 = library default
+
+# Per-host profile from autotune.py (backend, IMGSZ, THREADS, CPU affinity).
+# When this box has one it overrides the constants above.
+USE_PROFILE = True
+PROFILE_PATH = profile_path()
+
 IMGSZ = 640
 CONF = 0.35
 TARGET_FPS = 15
-LOG_EVERY_N_FRAMES = 1  # keep 1 for detailed logs; set 5 to reduce CSV size
+# Pace from absolute frame deadlines and drop frames that are already late, so a
+# file source plays in real time and counts describe "now". False for live cameras.
+REALTIME_SOURCE = True
+LOG_EVERY_N_FRAMES = 1  # keep 1 for detailed logs; set 5 to keep every 5th frame only
+
+# Frame source: "opencv" = cv2.VideoCapture, full frames. "ffmpeg" = ffmpeg subprocess
+# that crops to STOPLINE_ROI (and optionally scales) inside the decoder and reads
+# into reusable buffers, much less copying for 1080p sources (see ffmpeg_source.py).
+FRAME_SOURCE = "opencv"
+FFMPEG_BIN = "ffmpeg"
+FFMPEG_SCALE = 1.0  # < 1.0 when the ROI is much larger than IMGSZ anyway
+
+# Run capture / inference / publish on separate threads (see pipeline.py).
+# False = original one-thread loop (handy for debugging).
+USE_PIPELINE = True
+QUEUE_SIZE = 1  # bounded queues drop the oldest frame when full
+FFMPEG_BUFFERS = 4 + 3 * QUEUE_SIZE  # >= frames that can be in flight (queues + stages)
+
+# Multi-process mode (see shm_pipeline.py): a capture process writes frames into a
+# shared-memory ring, INFER_PROCS inference processes read them without copying,
+# this process publishes and renders. Sidesteps the GIL between decode and the
+# Python parts of inference. Takes precedence over USE_PIPELINE.
+PROCESS_MODE = False
+INFER_PROCS = 1     # >1 disables tracking (each process would only see some frames)
+RING_SLOTS = None   # None = 2 * INFER_PROCS + 3
+
+# Skip YOLO when the ROI did not change (red-phase queue, empty road at night)
+# and reuse the last counts. Inference is still forced every N frames.
+MOTION_GATE = True
+MOTION_FORCE_EVERY = TARGET_FPS  # at most 1 s between real inferences
+MOTION_PIXEL_THRESH = 25         # gray-level change that counts as "changed"
+MOTION_CHANGED_FRAC = 0.002      # fraction of ROI pixels that must change
+
+# Tracking: persistent vehicle IDs + stop-line crossings (true flow in vehicles/min).
+# The detector runs only every DETECT_STRIDE-th frame; the tracker extrapolates in between.
+TRACKING = True
+DETECT_STRIDE = 3
+STOP_LINES = None   # {lane: ((x1, y1), (x2, y2))} full-frame px; None = across the ROI at 80% height
+FLOW_WINDOW_S = 60  # sliding window for vehicles/min
+
+# Headless = no overlay, imshow or waitKey at all (edge boxes have no display).
+# Headless runs can still save an annotated snapshot every N seconds (0 = off).
+# The render_ms column shows what the display costs per frame in either mode.
+HEADLESS = False
+SNAPSHOT_EVERY_S = 0
+SNAPSHOT_DIR = REPO_ROOT / "week4" / "metrics" / "snapshots"
+
+# Warm-up inferences on a dummy image before the measured loop (the first real
+# call used to take >1 s and ended up in the metrics and the first live_counts.json)
+WARMUP_RUNS = 3
+
+# Per-frame metrics are kept in an in-memory ring (see metrics_ring.py) and written
+# in blocks of METRICS_BLOCK rows to one file per column, in a new directory per run
+# under METRICS_DIR, plus 1 s / 10 s / 60 s rollups (rollups.csv, mean/p50/p95/p99/max).
+# METRICS_FULL_RES = False writes only the rollups (long soak runs).
+# EXPORT_CSV = True (default) also writes the full run as OUT_CSV at exit (the old
+# edge_metrics.csv, same columns), or later: python week4/edge/metrics_ring.py <run_dir> out.csv
+METRICS_DIR = REPO_ROOT / "week4" / "metrics" / "runs"
+METRICS_BLOCK = 512
+METRICS_FULL_RES = True
+ROLLUP_WINDOWS_S = (1, 10, 60)
+EXPORT_CSV = True
+
+# CPU / memory / RSS / CPU frequency / temperature and per-thread CPU are sampled
+# on a background thread every SAMPLE_EVERY_S (see resource_sampler.py); metrics
+# rows carry the latest sample. resources.csv / threads.csv go into the run directory.
+SAMPLE_EVERY_S = 1.0
 
 # Output files
 OUT_CSV = REPO_ROOT / "week4" / "metrics" / "edge_metrics.csv"
+OUT_STARTUP_CSV = REPO_ROOT / "week4" / "metrics" / "startup_metrics.csv"
 OUT_JSON = REPO_ROOT / "week4" / "integration" / "live_counts.json"
 
+# Controllers read counts from a seqlock-guarded binary record in a memory-mapped
+# file (see live_channel.py, LiveCountsReader). live_counts.json is only a
+# rate-limited, atomically replaced mirror for humans.
+OUT_CHANNEL = default_channel_path()
+JSON_MIRROR = True
+JSON_MIRROR_EVERY_S = 1.0
+
+# Push every update to subscribers over a Unix datagram socket (a path) or UDP
+# (("127.0.0.1", port)), see live_pubsub.py / LiveSubscriber. Non-blocking.
+PUBSUB = True
+PUBSUB_ADDRESS = default_pubsub_address()
+
 # COCO classes we care about
 VEHICLE_LABELS = {"car", "motorcycle", "bus", "truck"}
 
@@ -38,175 +147,592 @@ EMERGENCY_LABELS = {"ambulance"}  # if you train/use a model with this class
 STOPLINE_ROI = None  # set after first frame as (x1,y1,x2,y2)
 # ------------------------------------------
 
-
-def point_in_rect(cx, cy, rect):
-    x1, y1, x2, y2 = rect
-    return x1 <= cx <= x2 and y1 <= cy <= y2
+# Per-frame metrics row (column name, numpy type); same columns as the old edge_metrics.csv.
+# Empty values are stored as NaN (float columns) / -1 (integer columns).
+METRICS_DTYPE = [
+    ("frame_idx", "i4"), ("sim_time_sec", "f8"),
+    ("inference_ms", "f4"), ("loop_ms", "f4"), ("target_fps", "i2"),
+    ("cpu_percent", "f4"), ("mem_percent", "f4"),
+    ("vehicle_count", "i2"), ("emergency_detected", "i1"),
+    ("e2e_ms", "f4"), ("inference_skipped", "i1"), ("motion_frac", "f4"),
+    ("frame_q_depth", "i2"), ("frame_q_drops", "i4"), ("result_q_depth", "i2"), ("result_q_drops", "i4"),
+    ("achieved_fps", "f4"), ("lateness_ms", "f4"), ("dropped_ticks", "i4"), ("grabbed_frames", "i4"),
+    ("detector_ran", "i1"), ("detect_stride", "i2"), ("tracks", "i2"), ("crossings_total", "i4"),
+    ("flow_per_min", "f4"),
+    ("render_ms", "f4"), ("cpu_capture", "f4"), ("cpu_infer", "f4"), ("cpu_main", "f4"),
+    ("proc_cpu_percent", "f4"), ("rss_mb", "f4"), ("cpu_freq_mhz", "f4"), ("temp_c", "f4"),
+    ("sample_age_ms", "f4"),
+]
 
 
 def ensure_parent(path: Path):
     path.parent.mkdir(parents=True, exist_ok=True)
 
 
-def get_cpu_mem():
-    # cpu_percent(None) gives % since last call; that's fine for per-frame logging
-    return psutil.cpu_percent(interval=None), psutil.virtual_memory().percent
+def open_metrics(**info):
+    """(ring, rollups) for a new run directory under METRICS_DIR."""
+    run_dir = METRICS_DIR / f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+    # the ring must hold the longest rollup window, at the target frame rate plus headroom
+    capacity = max(4096, 2 * max(ROLLUP_WINDOWS_S) * TARGET_FPS)
+    ring = MetricsRing(run_dir, METRICS_DTYPE, capacity=capacity, block=METRICS_BLOCK,
+                       full_res=METRICS_FULL_RES, **info)
+    rollups = Rollups(ring, run_dir / "rollups.csv", "sim_time_sec",
+                      latency=("inference_ms", "loop_ms", "e2e_ms"), counts=("vehicle_count",),
+                      windows=ROLLUP_WINDOWS_S, only_if={"inference_ms": "detector_ran"},
+                      frame_field="frame_idx")
+    return ring, rollups
 
 
-def main():
-    if not VIDEO_PATH.exists():
-        raise RuntimeError(f"Video not found: {VIDEO_PATH}")
-    if not MODEL_PATH.exists():
-        raise RuntimeError(f"Model not found: {MODEL_PATH}")
+def detect_vehicles(model, roi_frame, class_filter):
+    """Run YOLO on the ROI crop. Returns (vehicle Detections in ROI coords, emergency, inference_ms)."""
+    # YOLO inference timing (classes= drops non-vehicle classes inside NMS already)
+    t0 = time.time()
+    dets = model.detect(roi_frame, IMGSZ, CONF, class_filter.classes)
+    inference_ms = (time.time() - t0) * 1000.0
 
-    model = YOLO(str(MODEL_PATH))
-    cap = cv2.VideoCapture(str(VIDEO_PATH))
-    if not cap.isOpened():
-        raise RuntimeError(f"Cannot open video: {VIDEO_PATH}")
+    # Emergency demo (optional)
+    emergency_detected = ENABLE_EMERGENCY and any_class(dets, class_filter.emergency)
 
-    # Read first frame to size ROIs
-    ret, frame0 = cap.read()
-    if not ret:
-        raise RuntimeError("Could not read first frame.")
-    h, w = frame0.shape[:2]
+    return select(dets, class_filter.vehicle), emergency_detected, inference_ms
 
-    global STOPLINE_ROI
-    if STOPLINE_ROI is None:
-        # Default: bottom-middle region (common stop-line area for forward-facing videos)
-        # You MUST adjust after you see the green rectangle on-screen.
-        # STOPLINE_ROI = (int(w * 0.10), int(h * 0.40), int(w * 0.35), int(h * 0.95))
-        STOPLINE_ROI = (232,230,775,1000)
 
-    ROIS = {"Approach": STOPLINE_ROI}
+def count_in_roi(cx, cy, roi_w, roi_h):
+    # Boxes are already from roi_frame, so just check inside ROI frame bounds
+    return int(in_rect(cx, cy, (0, 0, roi_w, roi_h)).sum())
 
-    # restart video
-    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
 
-    ensure_parent(OUT_CSV)
-    ensure_parent(OUT_JSON)
+def default_stop_lines(roi):
+    x1, y1, x2, y2 = roi
+    y = y1 + int((y2 - y1) * 0.8)
+    return {"Approach": ((x1, y), (x2, y))}
 
-    # Prepare CSV
-    write_header = not OUT_CSV.exists()
-    csv_f = open(OUT_CSV, "a", newline="")
-    writer = csv.writer(csv_f)
-    if write_header:
-        writer.writerow([
-            "frame_idx", "sim_time_sec",
-            "inference_ms", "loop_ms", "target_fps",
-            "cpu_percent", "mem_percent",
-            "vehicle_count", "emergency_detected"
-        ])
 
-    frame_idx = 0
-    start_wall = time.time()
-    last_frame_wall = time.time()
-    frame_interval = 1.0 / TARGET_FPS
+def write_live_counts(live, sim_time, counts, emergency, extra=None):
+    # Binary record + push to subscribers every frame, JSON mirror when due
+    channel, mirror, pub = live
+    extra = extra or {}
+    seq = channel.publish(sim_time, counts, emergency, flow=extra.get("flow"))
+    if pub is not None:
+        pub.publish(seq, sim_time, counts, emergency, flow=extra.get("flow"))
+    if mirror is not None:
+        payload = {
+            "t": round(sim_time, 3),
+            "seq": seq,
+            "counts": {name: int(c) for name, c in counts.items()},
+            "emergency": bool(emergency)
+        }
+        payload.update(extra)
+        mirror.write(payload)
+
+
+def draw_overlay(frame, roi, vehicle_count, inference_ms, cpu, mem, skipped=False):
+    # Draw ROI on full frame for tuning
+    x1, y1, x2, y2 = roi
+    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+    cv2.putText(frame, "ROI: Approach", (x1 + 10, y1 + 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+
+    cv2.putText(frame, f"Count: {vehicle_count}", (30, 40),
+                cv2.FONT_HERSHEY_SIMPLEX, 1.1, (255, 255, 255), 2)
+    infer_txt = "skipped (no motion)" if skipped else f"{inference_ms:.1f} ms"
+    cv2.putText(frame, f"Infer: {infer_txt} | CPU: {cpu:.0f}% | MEM: {mem:.0f}%",
+                (30, 85), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255, 255, 255), 2)
+    cv2.putText(frame, f"Target FPS: {TARGET_FPS}", (30, 125),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255, 255, 255), 2)
+
+
+def make_paced_reader(pacer):
+    """pacer.read() wrapper for the pipeline: frame + pacing stats, or None at end."""
+    def read_frame():
+        frame = pacer.read()
+        if frame is None:
+            return None
+        return {"frame": frame, "pace": pacer.stats()}
+
+    return read_frame
+
+
+def roi_in_frame(roi, frame_origin=(0, 0), frame_scale=1.0):
+    """Full-frame ROI -> coords in the frames the source delivers (cropped / scaled by ffmpeg)."""
+    ox, oy = frame_origin
+    return tuple(int(round((v - o) * frame_scale)) for v, o in zip(roi, (ox, oy, ox, oy)))
+
+
+def detect_stride():
+    return DETECT_STRIDE if TRACKING else 1
+
+
+def make_stages(model, roi, metrics, latency, sampler, start_wall, render_timer, live,
+                frame_origin=(0, 0), frame_scale=1.0):
+    """Build the infer / publish callables shared by the serial and pipelined loops."""
+    infer = make_infer(model, roi, frame_origin, frame_scale)
+    publish = make_publish(metrics, latency, sampler, start_wall, render_timer, live)
+    return infer, publish
+
+
+def make_infer(model, roi, frame_origin=(0, 0), frame_scale=1.0):
+    """infer(item) -> result: ROI crop, motion gate, detector every k-th frame, tracker."""
+    class_filter = make_class_filter(
+        model.names, VEHICLE_LABELS, EMERGENCY_LABELS if ENABLE_EMERGENCY else ()
+    )
+    x1, y1, x2, y2 = roi_in_frame(roi, frame_origin, frame_scale)
+    roi_w, roi_h = x2 - x1, y2 - y1
+    stride = detect_stride()
+
+    gate = None
+    if MOTION_GATE:
+        # the gate is only asked on detector frames, so scale its forced interval
+        gate = MotionGate(pixel_thresh=MOTION_PIXEL_THRESH, changed_frac=MOTION_CHANGED_FRAC,
+                          force_every=max(1, MOTION_FORCE_EVERY // stride))
+
+    tracker, lines = None, None
+    if TRACKING:
+        tracker = Tracker()
+        # tracker works in ROI-crop coords, so map the full-frame stop lines once
+        rx, ry, s = roi[0], roi[1], frame_scale
+        lines = StopLineCounter({
+            lane: (((ax - rx) * s, (ay - ry) * s), ((bx - rx) * s, (by - ry) * s))
+            for lane, ((ax, ay), (bx, by)) in (STOP_LINES or default_stop_lines(roi)).items()
+        }, window_s=FLOW_WINDOW_S)
+
+    last = {"vehicle_count": 0, "emergency": False, "t": None, "n": 0}
+
+    def infer(item):
+        loop_t0 = time.time()
+        tp = time.perf_counter()
+        stages = {}  # stage -> ms for this frame (latency histograms)
+        if "decode_ms" in item.get("pace", {}):
+            stages["decode"] = item["pace"]["decode_ms"]
 
-    # Warm-up CPU percent
-    psutil.cpu_percent(interval=None)
+        # Crop ROI to reduce compute
+        roi_frame = item["frame"][y1:y2, x1:x2]
+
+        detector_frame = last["n"] % stride == 0
+        last["n"] += 1
+        skipped = detector_frame and gate is not None and not gate.should_infer(roi_frame)
+        run_detector = detector_frame and not skipped
+        stages["crop"] = (time.perf_counter() - tp) * 1000.0  # crop + motion gate
+
+        inference_ms = 0.0
+        emergency = last["emergency"]
+        vehicles = None
+        if run_detector:
+            vehicles, emergency, inference_ms = detect_vehicles(model, roi_frame, class_filter)
+            last["emergency"] = emergency
+            # detector's own preprocess / inference / postprocess split when it has one
+            stages.update(getattr(model, "last_timing", None) or {"inference": inference_ms})
+
+        tp = time.perf_counter()
+
+        if tracker is None:
+            if vehicles is not None:
+                cx, cy = centroids(vehicles.xyxy)
+                last["vehicle_count"] = count_in_roi(cx, cy, roi_w, roi_h)
+            # else: nothing moved inside the ROI, the previous count is still valid
+            vehicle_count = last["vehicle_count"]
+            flow = {}
+        else:
+            # move tracks to this frame, then correct them if the detector ran
+            t = item["t_capture"]
+            tracker.predict(0.0 if last["t"] is None else t - last["t"])
+            last["t"] = t
+            if vehicles is not None:
+                tracker.update(vehicles.xyxy)
+            lines.update(tracker, now=t)
+
+            centers = tracker.centers()
+            active = tracker.active()
+            vehicle_count = count_in_roi(centers[active, 0], centers[active, 1], roi_w, roi_h)
+            flow = {
+                "flow": {k: round(v, 2) for k, v in lines.flow_per_min(now=t).items()},
+                "crossings": dict(lines.totals),
+                "tracks": len(tracker),
+            }
+        stages["track"] = (time.perf_counter() - tp) * 1000.0  # counting (+ tracker, stop lines)
+
+        return {
+            "frame_idx": item["frame_idx"],
+            "t_capture": item["t_capture"],
+            "frame": item["frame"],
+            "vehicle_count": vehicle_count,
+            "emergency": emergency,
+            "inference_ms": inference_ms,
+            "inference_skipped": skipped,
+            "detector_ran": run_detector,
+            "motion_frac": gate.last_change if gate is not None else 1.0,
+            "tracking": flow,
+            "loop_ms": (time.time() - loop_t0) * 1000.0,
+            "pace": item.get("pace", {}),
+            "stages": stages,
+        }
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    return infer
 
-        # FPS throttle
-        now = time.time()
-        elapsed = now - last_frame_wall
-        if elapsed < frame_interval:
-            time.sleep(frame_interval - elapsed)
-        last_frame_wall = time.time()
 
-        loop_t0 = time.time()
+def make_publish(metrics, latency, sampler, start_wall, render_timer, live):
+    """
+    publish(result, stats): live counts record + metrics row (with the latest resource
+    sample), and the frame's stage timings into the latency histograms.
+    """
+    ring, rollups = metrics
+    stride = detect_stride()
 
-        # Crop ROI to reduce compute
-        x1, y1, x2, y2 = ROIS["Approach"]
-        roi_frame = frame[y1:y2, x1:x2]
-
-        # YOLO inference timing
-        t0 = time.time()
-        results = model.predict(
-            source=roi_frame,
-            imgsz=IMGSZ,
-            conf=CONF,
-            verbose=False
-        )[0]
-        inference_ms = (time.time() - t0) * 1000.0
-
-        # Count vehicles by center point (in ROI coords)
-        vehicle_count = 0
-        emergency_detected = False
-
-        if results.boxes is not None and len(results.boxes) > 0:
-            for box in results.boxes:
-                cls_id = int(box.cls[0])
-                label = results.names.get(cls_id, str(cls_id))
-
-                # Emergency demo (optional)
-                if ENABLE_EMERGENCY and label in EMERGENCY_LABELS:
-                    emergency_detected = True
-
-                if label not in VEHICLE_LABELS:
-                    continue
-
-                # Boxes are in ROI coordinate space
-                bx1, by1, bx2, by2 = box.xyxy[0]
-                cx = int((bx1 + bx2) / 2)
-                cy = int((by1 + by2) / 2)
-
-                # Since boxes are already from roi_frame, we just check inside ROI frame bounds:
-                if 0 <= cx <= (x2 - x1) and 0 <= cy <= (y2 - y1):
-                    vehicle_count += 1
-
-        cpu, mem = get_cpu_mem()
+    def publish(result, stats):
+        sample = sampler.latest()  # no syscalls here, the sampler thread made them
         sim_time = time.time() - start_wall
-        loop_ms = (time.time() - loop_t0) * 1000.0
-
-        # Write integration JSON (controller will read this)
-        payload = {
-            "t": round(sim_time, 3),
-            "counts": {
-                "Approach": int(vehicle_count)
-            },
-            "emergency": bool(emergency_detected)
-        }
-        OUT_JSON.write_text(json.dumps(payload, indent=2))
-
-        # Write CSV metrics
-        if frame_idx % LOG_EVERY_N_FRAMES == 0:
-            writer.writerow([
-                frame_idx, round(sim_time, 3),
-                round(inference_ms, 2), round(loop_ms, 2), TARGET_FPS,
-                round(cpu, 1), round(mem, 1),
-                int(vehicle_count), int(emergency_detected)
-            ])
-            csv_f.flush()
-
-        # Draw ROI on full frame for tuning
-        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-        cv2.putText(frame, "ROI: Approach", (x1 + 10, y1 + 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-
-        cv2.putText(frame, f"Count: {vehicle_count}", (30, 40),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1.1, (255, 255, 255), 2)
-        cv2.putText(frame, f"Infer: {inference_ms:.1f} ms | CPU: {cpu:.0f}% | MEM: {mem:.0f}%",
-                    (30, 85), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255, 255, 255), 2)
-        cv2.putText(frame, f"Target FPS: {TARGET_FPS}", (30, 125),
+        result["cpu"], result["mem"] = sample.get("cpu_percent", 0.0), sample.get("mem_percent", 0.0)
+
+        tp = time.perf_counter()
+        extra = None
+        if result["tracking"]:
+            extra = {"flow": result["tracking"]["flow"], "crossings": result["tracking"]["crossings"],
+                     "detect_stride": stride}
+        write_live_counts(live, sim_time, {"Approach": result["vehicle_count"]}, result["emergency"], extra)
+        latency.record("publish", (time.perf_counter() - tp) * 1000.0)
+        latency.record_all(result["stages"])
+
+        tp = time.perf_counter()
+
+        # Metrics row into the ring (written to disk in blocks) + rollups when due
+        if result["frame_idx"] % LOG_EVERY_N_FRAMES == 0:
+            row = {
+                "frame_idx": result["frame_idx"], "sim_time_sec": sim_time,
+                "inference_ms": result["inference_ms"],
+                "loop_ms": result["loop_ms"], "target_fps": TARGET_FPS,
+                "cpu_percent": sample.get("cpu_percent"), "mem_percent": sample.get("mem_percent"),
+                "vehicle_count": result["vehicle_count"],
+                "emergency_detected": int(result["emergency"]),
+                "e2e_ms": (time.time() - result["t_capture"]) * 1000.0,
+                "inference_skipped": int(result["inference_skipped"]),
+                "motion_frac": result["motion_frac"],
+                "achieved_fps": result["pace"].get("achieved_fps", 0.0),
+                "lateness_ms": result["pace"].get("lateness_ms", 0.0),
+                "dropped_ticks": result["pace"].get("dropped_ticks", 0),
+                "grabbed_frames": result["pace"].get("grabbed_frames", 0),
+                "detector_ran": int(result["detector_ran"]),
+                "detect_stride": stride,
+                "tracks": result["tracking"].get("tracks"),
+                "crossings_total": sum(result["tracking"].get("crossings", {}).values()),
+                "flow_per_min": sum(result["tracking"].get("flow", {}).values()),
+                # rendering happens after publish, so this is the previous displayed frame
+                "render_ms": render_timer.last_ms,
+            }
+            row.update(stats)
+            if sample:
+                row.update(proc_cpu_percent=sample["proc_cpu_percent"], rss_mb=sample["rss_mb"],
+                           cpu_freq_mhz=sample["cpu_freq_mhz"], temp_c=sample["temp_c"],
+                           sample_age_ms=(time.time() - sample["t"]) * 1000.0)
+            pc = sample.get("procs")
+            if pc:  # process mode: CPU of the capture / inference processes
+                row.update(cpu_capture=pc.get("capture"), cpu_main=pc.get("main"),
+                           cpu_infer=sum(v for k, v in pc.items() if k.startswith("inference")))
+            ring.append(row)
+            rollups.update(sim_time)
+        latency.record("log", (time.perf_counter() - tp) * 1000.0)
+
+    return publish
+
+
+def draw_result(result, roi):
+    draw_overlay(result["frame"], roi, result["vehicle_count"], result["inference_ms"],
+                 result.get("cpu", 0.0), result.get("mem", 0.0), result["inference_skipped"])
+    if result["tracking"]:
+        flow = ", ".join(f"{k} {v:.1f}" for k, v in result["tracking"]["flow"].items())
+        cv2.putText(result["frame"], f"Flow (veh/min): {flow} | stride {DETECT_STRIDE}", (30, 165),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255, 255, 255), 2)
 
-        cv2.imshow("Week4 Edge Metrics", frame)
-        if cv2.waitKey(1) & 0xFF == ord("q"):
+
+def make_show(roi, render_timer, snapshots, latency):
+    """show(result) -> False when the user pressed q. Headless: only sampled snapshots."""
+    def show(result):
+        render_timer.start()
+        keep_running = True
+        if not HEADLESS:
+            draw_result(result, roi)
+            cv2.imshow("Week4 Edge Metrics", result["frame"])
+            keep_running = not (cv2.waitKey(1) & 0xFF == ord("q"))
+        elif snapshots.due():
+            draw_result(result, roi)
+            snapshots.save(result["frame"])
+        render_timer.stop()
+        latency.record("render", render_timer.last_ms)
+        return keep_running
+
+    return show
+
+
+def run_serial(read_frame, infer, publish, show):
+    no_stats = {"frame_q_depth": 0, "frame_q_drops": 0, "result_q_depth": 0, "result_q_drops": 0}
+    frame_idx = 0
+    while True:
+        item = read_frame()
+        if item is None:
+            break
+
+        item["frame_idx"] = frame_idx
+        item["t_capture"] = time.time()
+        result = infer(item)
+        publish(result, no_stats)
+        if not show(result):
             break
 
         frame_idx += 1
 
-    cap.release()
-    csv_f.close()
-    cv2.destroyAllWindows()
+
+def run_pipeline(read_frame, infer, publish, show):
+    pipe = StagedPipeline(read_frame, infer, publish, queue_size=QUEUE_SIZE)
+    pipe.start()
+    try:
+        # Main thread only renders the newest result (cv2 GUI is not thread-safe)
+        while pipe.is_running():
+            result = pipe.display_q.get(timeout=0.1)
+            if result is None:
+                continue
+            if not show(result):
+                break
+    finally:
+        pipe.stop()
+        pipe.join(timeout=5)
+
+    stats = pipe.stats()
+    print(f"Dropped frames: capture->infer={stats['frame_q_drops']}, "
+          f"infer->publish={stats['result_q_drops']}")
+
+
+def run_processes(pipe, publish, show):
+    # systemd / docker stop: leave the loop normally so children and shm are cleaned up
+    signal.signal(signal.SIGTERM, lambda *_: pipe.stop())
+    try:
+        while pipe.is_running():
+            result = pipe.get(timeout=0.1)
+            if result is None:
+                continue
+            result["frame"] = pipe.frame(result["slot"])  # view into the ring
+            try:
+                publish(result, pipe.stats())
+                keep_running = show(result)
+            finally:
+                result["frame"] = None
+                pipe.release(result["slot"])
+            if not keep_running:
+                break
+    except KeyboardInterrupt:
+        print("Interrupted.")
+    finally:
+        pipe.join(timeout=5)
+
+    if pipe.failed():
+        print("Stopped because a child process died:", ", ".join(pipe.failed()))
+    stats = pipe.stats()
+    print(f"Dropped frames (ring full / stale): {stats['frame_q_drops']}")
+    print("CPU per process (mean %, 100 = one core):", pipe.cpu_summary())
+
+
+def make_process_pipeline(frame_shape, frame_origin, frame_scale):
+    """Capture / inference factories run in the child processes (fork: config is inherited)."""
+    x1, y1, x2, y2 = roi_in_frame(STOPLINE_ROI, frame_origin, frame_scale)
+    roi_shape = (y2 - y1, x2 - x1, 3)
+
+    def make_reader():
+        cap, _, _ = open_source(STOPLINE_ROI)
+        pacer = FramePacer(cap, TARGET_FPS, realtime=REALTIME_SOURCE)
+        paced = make_paced_reader(pacer)
+
+        def read_frame():
+            item = paced()
+            if item is None:
+                cap.release()
+                print("Pacing:", pacer.summary())
+            return item
+
+        return read_frame
+
+    def make_worker():
+        timer = StartupTimer()
+        with timer.phase("runtime_import"):
+            import_runtime(BACKEND)
+        with timer.phase("model_load"):
+            model = load_detector(BACKEND, MODEL_PATH, ONNX_PATH, INT8_PATH, OPENVINO_DIR, THREADS)
+        with timer.phase("warmup"):
+            warm = warm_up(model, roi_shape, IMGSZ, CONF, runs=WARMUP_RUNS)
+        info = {"phases": timer.phases, "warmup_ms": warm}
+        return make_infer(model, STOPLINE_ROI, frame_origin, frame_scale), info
+
+    return ProcessPipeline(make_reader, make_worker, frame_shape, workers=INFER_PROCS, slots=RING_SLOTS)
+
+
+def backend_model_path():
+    return {"pytorch": MODEL_PATH, "onnx": ONNX_PATH, "onnx-int8": INT8_PATH,
+            "openvino": OPENVINO_DIR}.get(BACKEND, MODEL_PATH)
+
+
+def open_source(roi):
+    """(capture, frame_origin, frame_scale) for FRAME_SOURCE. ffmpeg frames start at the ROI corner."""
+    if FRAME_SOURCE == "ffmpeg":
+        cap = FFmpegCapture(VIDEO_PATH, crop=roi, scale=FFMPEG_SCALE, buffers=FFMPEG_BUFFERS,
+                            ffmpeg_bin=FFMPEG_BIN)
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open video: {VIDEO_PATH}")
+        return cap, cap.crop[:2], FFMPEG_SCALE
+
+    cap = cv2.VideoCapture(str(VIDEO_PATH))
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video: {VIDEO_PATH}")
+    return cap, (0, 0), 1.0
+
+
+def apply_profile():
+    global BACKEND, IMGSZ, THREADS
+    profile = load_profile(PROFILE_PATH) if USE_PROFILE else None
+    if profile is None:
+        return
+    BACKEND, IMGSZ, THREADS = profile["backend"], profile["imgsz"], profile["threads"]
+    if profile["affinity"]:
+        set_affinity(profile["affinity"])
+    print(f"Profile {PROFILE_PATH.name}: backend={BACKEND} imgsz={IMGSZ} threads={THREADS} "
+          f"affinity={profile['affinity']}")
+
+
+def main():
+    global STOPLINE_ROI, TRACKING
+    apply_profile()
+    if not VIDEO_PATH.exists():
+        raise RuntimeError(f"Video not found: {VIDEO_PATH}")
+    model_file = backend_model_path()
+    if not model_file.exists():
+        raise RuntimeError(f"Model not found for backend {BACKEND}: {model_file}")
+
+    # ---------- startup (not part of the measured loop or the publish clock) ----------
+    startup = StartupTimer(T_PROCESS_START)
+    startup.mark("imports", T_PROCESS_START, T_IMPORTS_DONE)
+    model = None
+    if not PROCESS_MODE:  # process mode loads the model in the inference processes
+        with startup.phase("runtime_import"):
+            import_runtime(BACKEND)
+        with startup.phase("model_load"):
+            model = load_detector(BACKEND, MODEL_PATH, ONNX_PATH, INT8_PATH, OPENVINO_DIR, THREADS)
+
+    if STOPLINE_ROI is None:
+        # Default: bottom-middle region (common stop-line area for forward-facing videos)
+        # You MUST adjust after you see the green rectangle on-screen.
+        # STOPLINE_ROI = (int(w * 0.10), int(h * 0.40), int(w * 0.35), int(h * 0.95))
+        STOPLINE_ROI = (232,230,775,1000)
+
+    with startup.phase("first_frame"):
+        cap, frame_origin, frame_scale = open_source(STOPLINE_ROI)
+        ret, frame0 = cap.read()
+        if not ret:
+            raise RuntimeError("Could not read first frame.")
+
+    ROIS = {"Approach": STOPLINE_ROI}
+    frame_roi = roi_in_frame(STOPLINE_ROI, frame_origin, frame_scale)
+
+    ensure_parent(OUT_JSON)
+    live = (LiveCountsWriter(OUT_CHANNEL, ["Approach"]),
+            JsonMirror(OUT_JSON, JSON_MIRROR_EVERY_S) if JSON_MIRROR else None,
+            LivePublisher(PUBSUB_ADDRESS) if PUBSUB else None)
+
+    # Metrics ring + rollups, one directory per run
+    metrics = open_metrics(backend=BACKEND, imgsz=IMGSZ, target_fps=TARGET_FPS, frame_source=FRAME_SOURCE,
+                           video=VIDEO_PATH.name)
+    if EXPORT_CSV and METRICS_FULL_RES:
+        print(f"Metrics: {metrics[0].run_dir}, exported to {OUT_CSV} at exit")
+    else:
+        print(f"Metrics: {metrics[0].run_dir} only, {OUT_CSV.name} is not written "
+              f"(EXPORT_CSV / METRICS_FULL_RES; python week4/edge/metrics_ring.py <dir> out.csv)")
+
+    pipe = None
+    if PROCESS_MODE:
+        cap.release()  # the capture process opens its own source
+        if INFER_PROCS > 1 and TRACKING:
+            print("INFER_PROCS > 1: tracking disabled (frames are split across processes)")
+            TRACKING = False
+        pipe = make_process_pipeline(frame0.shape, frame_origin, frame_scale)
+        with startup.phase("workers_ready"):  # model load + warm-up, in parallel per process
+            pipe.start()
+        warmup_ms = []
+        for pid, info in pipe.startup_info.items():
+            phases = ", ".join(f"{k} {v:.0f} ms" for k, v in info["phases"].items())
+            print(f"Inference process {pid}: {phases}")
+            warmup_ms = warmup_ms or info["warmup_ms"]
+    else:
+        # Warm up on a dummy image shaped like the ROI crop the loop will feed
+        x1, y1, x2, y2 = frame_roi
+        roi_shape = frame0[y1:y2, x1:x2].shape
+        with startup.phase("warmup"):
+            warmup_ms = warm_up(model, roi_shape, IMGSZ, CONF, runs=WARMUP_RUNS)
+
+        # restart video
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    print("Startup:", startup.summary())
+    if warmup_ms:
+        print("Warm-up inference ms:", ", ".join(f"{t:.1f}" for t in warmup_ms))
+    mode = "processes" if PROCESS_MODE else "threads" if USE_PIPELINE else "serial"
+    startup.append_csv(OUT_STARTUP_CSV, mode=mode, backend=BACKEND, imgsz=IMGSZ, warmup_runs=WARMUP_RUNS,
+                       first_infer_ms=round(warmup_ms[0], 1) if warmup_ms else "",
+                       warm_infer_ms=round(warmup_ms[-1], 1) if warmup_ms else "")
+
+    start_wall = time.time()
+
+    # Resource sampling off the frame loop (process mode: children's CPU too)
+    sampler = ResourceSampler(SAMPLE_EVERY_S, out_dir=metrics[0].run_dir,
+                              extra_procs=(lambda: pipe.cpu_percent(0)) if pipe is not None else None).start()
+
+    render_timer = RenderTimer()
+    snapshots = SnapshotWriter(SNAPSHOT_DIR, SNAPSHOT_EVERY_S if HEADLESS else 0)
+
+    # Per-stage latency histograms: summary at exit, or any time with kill -USR1 <pid>
+    latency = StageLatency()
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda *_: print(latency.summary(), flush=True))
+    show = make_show(frame_roi, render_timer, snapshots, latency)
+
+    pacer = None
+    if pipe is not None:
+        publish = make_publish(metrics, latency, sampler, start_wall, render_timer, live)
+        run_processes(pipe, publish, show)
+    else:
+        pacer = FramePacer(cap, TARGET_FPS, realtime=REALTIME_SOURCE)
+        read_frame = make_paced_reader(pacer)
+        infer, publish = make_stages(model, ROIS["Approach"], metrics, latency, sampler, start_wall,
+                                     render_timer, live, frame_origin, frame_scale)
+        if USE_PIPELINE:
+            run_pipeline(read_frame, infer, publish, show)
+        else:
+            run_serial(read_frame, infer, publish, show)
+        cap.release()
+
+    sampler.stop()
+    metrics[0].close()
+    metrics[1].close()
+    latency.save_json(metrics[0].run_dir / "stage_latency.json")
+    if EXPORT_CSV and METRICS_FULL_RES:
+        ensure_parent(OUT_CSV)
+        export_csv(metrics[0].run_dir, OUT_CSV)
+    live[0].close()
+    if live[2] is not None:
+        print(f"Pub/sub: {live[2].sent} messages sent, {live[2].dropped} dropped (slow subscribers)")
+        live[2].close()
+    close_windows(HEADLESS)
 
     print("Done.")
-    print("Metrics CSV:", OUT_CSV)
-    print("Live counts JSON:", OUT_JSON)
+    if pacer is not None:
+        print("Pacing:", pacer.summary())
+    print("Render:", render_timer.summary(HEADLESS))
+    print("Stage latency:\n" + latency.summary())
+    print("Thread CPU (mean %, 100 = one core):", sampler.summary())
+    if snapshots.saved:
+        print(f"Debug snapshots: {snapshots.saved} in {SNAPSHOT_DIR}")
+    print(f"Metrics: {metrics[0].n} rows in {metrics[0].run_dir} (python week4/edge/metrics_ring.py <dir> [out.csv])")
+    if EXPORT_CSV and METRICS_FULL_RES:
+        print("Metrics CSV:", OUT_CSV)
+    print("Live counts channel:", OUT_CHANNEL, "(python week4/edge/live_channel.py to watch it)")
+    if PUBSUB:
+        print("Live counts pub/sub:", PUBSUB_ADDRESS, "(python week4/edge/live_pubsub.py to subscribe)")
+    if JSON_MIRROR:
+        print("Live counts JSON mirror:", OUT_JSON)
+    print("Startup CSV:", OUT_STARTUP_CSV)
 
 
 if __name__ == "__main__":
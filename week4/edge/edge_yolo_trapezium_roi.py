@@ -1,22 +1,54 @@
-from ultralytics import YOLO
 import cv2
 import numpy as np
 import psutil
 import time
 from pathlib import Path
 
+from backends import load_detector
+from motion_gate import MotionGate
+from pacing import FramePacer
+from postprocess import make_class_filter, select, centroids, offset, drop_cut, letterbox_scale, cut_tolerance
+from render import SnapshotWriter, RenderTimer, close_windows
+from roi_labels import RoiLabelMap, roi_to_polygon, crop_rect, rect_imgsz
+
 # ===================== PATHS =====================
 REPO_ROOT = Path(__file__).resolve().parents[2]
 VIDEO_PATH = REPO_ROOT / "week1" / "videos" / "traffic_2.mp4"
 MODEL_PATH = REPO_ROOT / "week1" / "yolov8n.pt"
+ONNX_PATH = REPO_ROOT / "week1" / "yolov8n.onnx"
+INT8_PATH = REPO_ROOT / "week1" / "yolov8n_int8.onnx"
+OPENVINO_DIR = REPO_ROOT / "week1" / "yolov8n_openvino_model"
 
 # ===================== CONFIG =====================
 IMGSZ = 640
 CONF = 0.35  # confidence threshold -defualt 0.35
 TARGET_FPS = 15
+BACKEND = "pytorch"  # "pytorch" | "onnx" | "onnx-int8" | "openvino" (see backends.py)
+THREADS = 0  # torch / onnxruntime intra-op threads, 0 = library default
+REALTIME_SOURCE = True  # drop late frames so a video file plays in real time
 
 VEHICLE_LABELS = {"car", "motorcycle", "bus", "truck"}
 
+# Run YOLO only on the bounding rectangle of the lane ROIs (+ margin) instead of
+# the full frame. Boxes are mapped back to full-frame coords before counting.
+CROP_TO_ROI = True
+# Longest vehicle side (full-frame px) anywhere in the lane ROIs, e.g. a bus close
+# to the camera. The crop margin is half of it, so a vehicle whose center is in a
+# lane is never cut by the crop. Boxes the crop edge does cut belong to vehicles
+# centered outside the lanes and are dropped (their centers would be shifted).
+MAX_VEHICLE_PX = 400
+
+# Skip YOLO when nothing changed inside the lane ROIs and reuse the last counts.
+MOTION_GATE = True
+MOTION_FORCE_EVERY = TARGET_FPS  # at most 1 s between real inferences
+
+# No overlay / imshow / waitKey on boxes without a display. A sampled annotated
+# frame can still be written every SNAPSHOT_EVERY_S seconds (0 = off).
+HEADLESS = False
+SNAPSHOT_EVERY_S = 0
+SNAPSHOT_DIR = REPO_ROOT / "week4" / "metrics" / "snapshots"
+WINDOW = "Trapezium ROI - Edge YOLO"
+
 # 🔴 ADJUST THESE POINTS USING MOUSE COORDINATES
 # Format: (x, y) clockwise
 ROI_POLY = [
@@ -26,6 +58,12 @@ ROI_POLY = [
     (200, 720)    # bottom-left
 ]
 
+# Lanes counted separately: name -> polygon or rect (x1, y1, x2, y2).
+# Add more lane polygons here, they all cost the same single lookup per box.
+LANE_ROIS = {
+    "ROI": ROI_POLY,
+}
+
 # =================================================
 
 
@@ -37,22 +75,84 @@ def mouse_move(event, x, y, flags, param):
         mouse_x, mouse_y = x, y
 
 
-# ---------- Geometry helpers ----------
-def create_roi_mask(frame_shape, polygon):
-    mask = np.zeros(frame_shape[:2], dtype=np.uint8)
-    pts = np.array(polygon, dtype=np.int32)
-    cv2.fillPoly(mask, [pts], 255)
-    return mask
+# ---------- Inference window ----------
+def inference_window(frame_shape, fixed_hw=None):
+    """
+    (crop rect, imgsz) for model.detect. Full frame at IMGSZ when CROP_TO_ROI is off.
+    fixed_hw: input size of a static model (model.fixed_hw), which is then the
+    imgsz that really runs: the crop is letterboxed into it.
+    """
+    h, w = frame_shape[:2]
+    if not CROP_TO_ROI:
+        return (0, 0, w, h), list(fixed_hw) if fixed_hw else IMGSZ
+    # downscale of the full frame (into fixed_hw, or at IMGSZ so detections keep their size)
+    scale = letterbox_scale(w, h, list(fixed_hw)) if fixed_hw else min(IMGSZ / max(w, h), 1.0)
+    # a crop is never scaled down more than the full frame, so this bounds the
+    # drop_cut tolerance: a lane vehicle's box stays clear of it
+    tol = int(np.ceil(cut_tolerance(scale)))
+    x1, y1, x2, y2 = crop_rect(LANE_ROIS, frame_shape, MAX_VEHICLE_PX // 2 + 1 + tol)
+    if fixed_hw:
+        return (x1, y1, x2, y2), list(fixed_hw)
+    return (x1, y1, x2, y2), rect_imgsz(x2 - x1, y2 - y1, scale)
+
+
+def detect_vehicles(model, frame, crop, imgsz, class_filter):
+    """Vehicle detections inside the inference window, in full-frame coords."""
+    cx1, cy1, cx2, cy2 = crop
+    dets = model.detect(frame[cy1:cy2, cx1:cx2], imgsz, CONF, class_filter.classes)
+    vehicles = drop_cut(select(dets, class_filter.vehicle), crop, frame.shape, imgsz)
+    return offset(vehicles, cx1, cy1)
+
+
+def crop_mask(roi_mask, crop):
+    x1, y1, x2, y2 = crop
+    return roi_mask[y1:y2, x1:x2]
+
+
+# ---------- Overlay ----------
+def draw_overlay(frame, names, vehicles, lane_ids, lane_counts, infer_ms, skipped, pacer):
+    boxes_int = vehicles.xyxy.astype(np.int32)
+    inside = lane_ids > 0
+    for (x1, y1, x2, y2), cls_id in zip(boxes_int[inside].tolist(), vehicles.cls[inside]):
+        cv2.rectangle(frame, (x1, y1), (x2, y2),
+                    (0, 0, 255), 2)
+        cv2.putText(frame, names[int(cls_id)], (x1, y1 - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6,
+                    (0, 0, 255), 2)
+
+    # Draw lane ROIs
+    for lane, roi in LANE_ROIS.items():
+        poly = roi_to_polygon(roi)
+        roi_pts = np.array(poly, np.int32)
+        cv2.polylines(frame, [roi_pts], True, (0, 255, 0), 2)
+        cv2.putText(frame, f"{lane}: {lane_counts[lane]}", tuple(poly[0]),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9,
+                    (0, 255, 0), 2)
 
-def point_in_polygon(cx, cy, polygon):
-    poly_np = np.array(polygon, dtype=np.int32)
-    return cv2.pointPolygonTest(poly_np, (cx, cy), False) >= 0
+    # Metrics
+    cpu = psutil.cpu_percent(interval=None)
+    mem = psutil.virtual_memory().percent
+
+    cv2.putText(frame, f"Vehicles in ROI: {int(inside.sum())}", (30, 40),
+                cv2.FONT_HERSHEY_SIMPLEX, 1.1, (255, 255, 255), 2)
+    infer_txt = "skipped (no motion)" if skipped else f"{infer_ms:.1f} ms"
+    cv2.putText(frame, f"Infer: {infer_txt} | CPU: {cpu:.0f}% | MEM: {mem:.0f}%",
+                (30, 85), cv2.FONT_HERSHEY_SIMPLEX, 0.9,
+                (255, 255, 255), 2)
+    cv2.putText(frame, f"FPS: {pacer.achieved_fps():.1f}/{TARGET_FPS} | late: {pacer.lateness_ms:.0f} ms"
+                       f" | dropped: {pacer.dropped_ticks}", (30, 175),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.8,
+                (255, 255, 255), 2)
+    if not HEADLESS:
+        cv2.putText(frame, f"Mouse x={mouse_x}, y={mouse_y}", (30, 130),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8,
+                    (0, 255, 255), 2)
 
 
 # ===================== MAIN =====================
 def main():
     print("Loading model...")
-    model = YOLO(str(MODEL_PATH))
+    model = load_detector(BACKEND, MODEL_PATH, ONNX_PATH, INT8_PATH, OPENVINO_DIR, THREADS)
 
     cap = cv2.VideoCapture(str(VIDEO_PATH))
     if not cap.isOpened():
@@ -62,91 +162,79 @@ def main():
     if not ret:
         raise RuntimeError("Cannot read first frame")
 
-    roi_mask = create_roi_mask(frame0.shape, ROI_POLY)
-
-    frame_interval = 1.0 / TARGET_FPS
-    last_frame_time = time.time()
-
-    cv2.namedWindow("Trapezium ROI - Edge YOLO")
-    cv2.setMouseCallback("Trapezium ROI - Edge YOLO", mouse_move)
-
-    print("Running... Press Q to quit")
+    # Compiled once per frame size: lane lookup for counting + union mask for display
+    label_map = RoiLabelMap(LANE_ROIS, frame0.shape)
+    roi_mask = label_map.mask()
+    class_filter = make_class_filter(model.names, VEHICLE_LABELS)
+    crop, crop_imgsz = inference_window(frame0.shape, model.fixed_hw)
+    if CROP_TO_ROI and model.fixed_hw:
+        print(f"Static {model.fixed_hw[0]}x{model.fixed_hw[1]} model: the ROI crop is letterboxed into it, "
+              "so the input does not shrink (export with dynamic=True for that)")
+    gate = MotionGate(crop_mask(roi_mask, crop), force_every=MOTION_FORCE_EVERY) if MOTION_GATE else None
+    last_boxes, last_lane_ids = None, None
+
+    pacer = FramePacer(cap, TARGET_FPS, realtime=REALTIME_SOURCE)
+
+    render_timer = RenderTimer()
+    snapshots = SnapshotWriter(SNAPSHOT_DIR, SNAPSHOT_EVERY_S if HEADLESS else 0, prefix="trapezium")
+
+    if HEADLESS:
+        print("Running headless... Ctrl+C to stop")
+    else:
+        cv2.namedWindow(WINDOW)
+        cv2.setMouseCallback(WINDOW, mouse_move)
+        print("Running... Press Q to quit")
 
     while True:
-        ret, frame = cap.read()
-        if not ret:
+        # Deadline pacing: sleeps when early, skips late frames with grab()
+        frame = pacer.read()
+        if frame is None:
             break
 
-        # FPS throttle
-        now = time.time()
-        elapsed = now - last_frame_time
-        if elapsed < frame_interval:
-            time.sleep(frame_interval - elapsed)
-        last_frame_time = time.time()
-
-        # Masked frame (visual only)
-        masked_frame = cv2.bitwise_and(frame, frame, mask=roi_mask)
+        if label_map.ensure_shape(frame.shape):
+            roi_mask = label_map.mask()
+            crop, crop_imgsz = inference_window(frame.shape, model.fixed_hw)
+            if gate is not None:
+                gate.set_mask(crop_mask(roi_mask, crop))
 
         # YOLO inference
-        t0 = time.time()
-        results = model.predict(
-            source=frame,
-            imgsz=IMGSZ,
-            conf=CONF,
-            verbose=False
-        )[0]
-        infer_ms = (time.time() - t0) * 1000
-
-        vehicle_count = 0
-
-        if results.boxes is not None:
-            for box in results.boxes:
-                cls_id = int(box.cls[0])
-                label = results.names[cls_id]
-
-                if label not in VEHICLE_LABELS:
-                    continue
-
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                cx = int((x1 + x2) / 2)
-                cy = int((y1 + y2) / 2)
-
-                # 🔑 Only vehicles INSIDE trapezium
-                if point_in_polygon(cx, cy, ROI_POLY):
-                    vehicle_count += 1
-                    cv2.rectangle(frame, (x1, y1), (x2, y2),
-                                (0, 0, 255), 2)
-                    cv2.putText(frame, label, (x1, y1 - 5),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6,
-                                (0, 0, 255), 2)
-
-        # Draw trapezium ROI
-        roi_pts = np.array(ROI_POLY, np.int32)
-        cv2.polylines(frame, [roi_pts], True, (0, 255, 0), 2)
-        cv2.putText(frame, "ROI", ROI_POLY[0],
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.9,
-                    (0, 255, 0), 2)
-
-        # Metrics
-        cpu = psutil.cpu_percent(interval=None)
-        mem = psutil.virtual_memory().percent
-
-        cv2.putText(frame, f"Vehicles in ROI: {vehicle_count}", (30, 40),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1.1, (255, 255, 255), 2)
-        cv2.putText(frame, f"Infer: {infer_ms:.1f} ms | CPU: {cpu:.0f}% | MEM: {mem:.0f}%",
-                    (30, 85), cv2.FONT_HERSHEY_SIMPLEX, 0.9,
-                    (255, 255, 255), 2)
-        cv2.putText(frame, f"Mouse x={mouse_x}, y={mouse_y}", (30, 130),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.8,
-                    (0, 255, 255), 2)
-
-        cv2.imshow("Trapezium ROI - Edge YOLO", frame)
-        if cv2.waitKey(1) & 0xFF in (ord('q'), ord('Q')):
-            break
+        cx1, cy1, cx2, cy2 = crop
+        skipped = gate is not None and not gate.should_infer(frame[cy1:cy2, cx1:cx2])
+
+        if skipped:
+            # nothing moved inside the lanes: reuse the last detections
+            infer_ms = 0.0
+            vehicles, lane_ids = last_boxes, last_lane_ids
+        else:
+            t0 = time.time()
+            # All boxes at once: class filter -> drop cut boxes -> full-frame coords -> centers -> lane lookup
+            vehicles = detect_vehicles(model, frame, crop, crop_imgsz, class_filter)
+            infer_ms = (time.time() - t0) * 1000
+            cx, cy = centroids(vehicles.xyxy.astype(np.int32))
+
+            # 🔑 Only vehicles INSIDE a lane ROI (one label-image lookup per box)
+            lane_ids = label_map.assign(cx, cy)
+            last_boxes, last_lane_ids = vehicles, lane_ids
+
+        lane_counts = label_map.tally(lane_ids)
+
+        # Rendering only when someone looks at it (window) or a snapshot is due
+        render_timer.start()
+        if not HEADLESS:
+            draw_overlay(frame, model.names, vehicles, lane_ids, lane_counts, infer_ms, skipped, pacer)
+            cv2.imshow(WINDOW, frame)
+            if cv2.waitKey(1) & 0xFF in (ord('q'), ord('Q')):
+                break
+        elif snapshots.due():
+            draw_overlay(frame, model.names, vehicles, lane_ids, lane_counts, infer_ms, skipped, pacer)
+            snapshots.save(frame)
+        render_timer.stop()
 
     cap.release()
-    cv2.destroyAllWindows()
+    close_windows(HEADLESS)
     print("Stopped.")
+    print("Pacing:", pacer.summary())
+    print("Render:", render_timer.summary(HEADLESS))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+import subprocess
+
+import cv2
+import numpy as np
+
+# Frame source that decodes with an ffmpeg subprocess instead of cv2.VideoCapture.
+#
+# ffmpeg crops (and optionally scales) inside the decoder, so only the ROI is
+# converted to BGR and sent through the pipe. Frames are read with readinto()
+# into a small pool of preallocated buffers, no new array per frame.
+#
+# Same interface as cv2.VideoCapture for what the edge scripts use:
+# isOpened / read / grab / get / set(CAP_PROP_POS_FRAMES) / release.
+
+
+class FFmpegCapture:
+    """
+    crop:  (x1, y1, x2, y2) in source pixels, None = full frame
+    scale: output size factor applied after the crop (1.0 = no scale filter)
+
+    read() returns views into a ring of `buffers` arrays: a frame stays valid
+    until `buffers` more frames have been read. Keep it above the number of
+    frames that can be in flight (queues + stages), or copy the frame.
+    """
+
+    def __init__(self, source, crop=None, scale=1.0, buffers=8, ffmpeg_bin="ffmpeg"):
+        self.source = str(source)
+        self.ffmpeg_bin = ffmpeg_bin
+        self.proc = None
+        self.pos = 0
+
+        # Stream info from OpenCV (no ffprobe needed), the decode itself is ffmpeg's
+        probe = cv2.VideoCapture(self.source)
+        self.src_w = int(probe.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.src_h = int(probe.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = probe.get(cv2.CAP_PROP_FPS) or 0.0
+        self.frame_count = probe.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+        probe.release()
+        if self.src_w <= 0 or self.src_h <= 0:
+            return
+
+        x1, y1, x2, y2 = crop if crop is not None else (0, 0, self.src_w, self.src_h)
+        x1, y1 = max(0, int(x1)), max(0, int(y1))
+        x2, y2 = min(self.src_w, int(x2)), min(self.src_h, int(y2))
+        self.crop = (x1, y1, x2, y2)
+        self.scale = scale
+        self.width = max(1, int(round((x2 - x1) * scale)))
+        self.height = max(1, int(round((y2 - y1) * scale)))
+
+        self._frame_bytes = self.width * self.height * 3
+        self._pool = [np.empty((self.height, self.width, 3), dtype=np.uint8) for _ in range(max(1, buffers))]
+        self._views = [memoryview(b).cast("B") for b in self._pool]
+        self._next = 0
+        self._scratch = memoryview(bytearray(self._frame_bytes))  # grab() target
+
+        self._start(0)
+
+    def _filters(self):
+        x1, y1, x2, y2 = self.crop
+        vf = []
+        if (x1, y1, x2, y2) != (0, 0, self.src_w, self.src_h):
+            # exact=1: no rounding to the chroma grid, frames must be exactly width x height
+            vf.append(f"crop={x2 - x1}:{y2 - y1}:{x1}:{y1}:exact=1")
+        if self.scale != 1.0:
+            vf.append(f"scale={self.width}:{self.height}:flags=area")
+        return ["-vf", ",".join(vf)] if vf else []
+
+    def _start(self, frame_idx):
+        self.release()
+        seek = ["-ss", f"{frame_idx / self.fps:.3f}"] if frame_idx and self.fps else []
+        cmd = [self.ffmpeg_bin, "-nostdin", "-loglevel", "error", *seek, "-i", self.source,
+               "-an", "-sn", *self._filters(), "-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
+        try:
+            self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, bufsize=self._frame_bytes)
+        except FileNotFoundError:
+            self.proc = None
+            raise RuntimeError(f"ffmpeg not found ({self.ffmpeg_bin}); install it or use FRAME_SOURCE='opencv'")
+        self.pos = frame_idx
+
+    def _read_into(self, view):
+        if self.proc is None:
+            return False
+        got = 0
+        while got < self._frame_bytes:
+            n = self.proc.stdout.readinto(view[got:])
+            if not n:
+                return False  # end of stream (or ffmpeg died)
+            got += n
+        self.pos += 1
+        return True
+
+    # ---------- cv2.VideoCapture interface ----------
+    def isOpened(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def read(self):
+        i = self._next
+        if not self._read_into(self._views[i]):
+            return False, None
+        self._next = (i + 1) % len(self._pool)
+        return True, self._pool[i]
+
+    def grab(self):
+        # the pipe still has to be drained, but no buffer of ours is touched
+        return self._read_into(self._scratch)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.pos
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.frame_count
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return getattr(self, "width", 0)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return getattr(self, "height", 0)
+        return 0.0
+
+    def set(self, prop, value):
+        if prop != cv2.CAP_PROP_POS_FRAMES or self.src_w <= 0:
+            return False
+        self._start(int(value))  # restart ffmpeg with an input seek
+        return True
+
+    def release(self):
+        if self.proc is None:
+            return
+        # kill before closing the pipe: ffmpeg blocked on a full pipe ignores SIGTERM
+        # for a while, and a closed pipe makes it log "Broken pipe". Nothing to flush.
+        if self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc.stdout.close()
+        self.proc = None
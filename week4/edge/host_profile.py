@@ -0,0 +1,79 @@
+import json
+import os
+import socket
+import time
+from pathlib import Path
+
+import psutil
+
+# Per-host tuning profile written by autotune.py and loaded by the edge scripts.
+# One JSON per box (named after the hostname), so the same repo checkout can be
+# deployed on devices with different core counts.
+
+PROFILE_DIR = Path(__file__).resolve().parent / "profiles"
+PROFILE_KEYS = ("backend", "imgsz", "threads", "affinity")
+
+
+def _start_affinity():
+    proc = psutil.Process()
+    return sorted(proc.cpu_affinity()) if hasattr(proc, "cpu_affinity") else None
+
+
+# CPUs this process may run on, captured at import before anything pins it: the
+# container cpuset / isolcpus / taskset the box gives us, not range(cpu_count()).
+# "Unpinned" means back to this set.
+START_AFFINITY = _start_affinity()
+
+
+def allowed_cpus():
+    """Core ids this process may use (all cores where affinity is unsupported)."""
+    return list(START_AFFINITY) if START_AFFINITY is not None else list(range(os.cpu_count() or 1))
+
+
+def profile_path(profile_dir=PROFILE_DIR, host=None):
+    return Path(profile_dir) / f"{host or socket.gethostname()}.json"
+
+
+def save_profile(path, best, results, **info):
+    profile = {
+        "host": socket.gethostname(),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "cpu_count": os.cpu_count(),
+        "allowed_cpus": allowed_cpus(),
+        **{k: best[k] for k in PROFILE_KEYS},
+        "fps": best["fps"],
+        "p95_ms": best["p95_ms"],
+        **info,
+        "results": results,
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(profile, indent=2))
+    return profile
+
+
+def load_profile(path):
+    """The tuned settings, or None when this host has no profile yet."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    profile = json.loads(path.read_text())
+    return {k: profile.get(k) for k in PROFILE_KEYS}
+
+
+def set_affinity(cores):
+    """
+    Pin this process to the given cores (None = every allowed core). Cores outside
+    the allowed set (e.g. a profile from before the cpuset changed) are skipped.
+    Returns the previous affinity. No-op where unsupported (macOS).
+    """
+    proc = psutil.Process()
+    if not hasattr(proc, "cpu_affinity"):
+        return None
+    previous = proc.cpu_affinity()
+    allowed = allowed_cpus()
+    pinned = [c for c in cores if c in allowed] if cores else []
+    if cores and len(pinned) < len(cores):
+        print(f"Affinity {list(cores)}: only {pinned or 'none'} allowed (allowed: {allowed})")
+    proc.cpu_affinity(pinned or allowed)
+    return previous
@@ -0,0 +1,98 @@
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+
+# Fixed-memory latency histograms, one per stage of the edge loop.
+#
+# Buckets are log-spaced (BUCKETS_PER_DECADE per factor of 10 between MIN_MS and
+# MAX_MS), so a histogram is a few hundred counters no matter how long the run is,
+# and a percentile is off by at most half a bucket (~2 % at 50 per decade).
+# Exact count / sum / min / max are kept alongside.
+
+MIN_MS = 0.001
+MAX_MS = 100000.0
+BUCKETS_PER_DECADE = 50
+
+# Edge loop stages in pipeline order (the summary prints them in this order)
+# crop = ROI crop + motion gate; preprocess / inference / postprocess = the detector's
+# own split (letterbox, forward pass, NMS + box conversion); track = counting + tracker.
+STAGES = ("decode", "crop", "preprocess", "inference", "postprocess", "track", "publish", "log", "render")
+
+
+class LatencyHistogram:
+    def __init__(self, min_ms=MIN_MS, max_ms=MAX_MS, per_decade=BUCKETS_PER_DECADE):
+        self.min_ms = min_ms
+        self.per_decade = per_decade
+        self.n_buckets = int(math.ceil(math.log10(max_ms / min_ms) * per_decade)) + 1
+        self.counts = np.zeros(self.n_buckets, dtype=np.int64)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, ms):
+        i = int(math.log10(ms / self.min_ms) * self.per_decade) if ms > self.min_ms else 0
+        self.counts[min(i, self.n_buckets - 1)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+
+    def _bucket_ms(self, i):
+        # geometric middle of bucket i
+        return self.min_ms * 10 ** ((i + 0.5) / self.per_decade)
+
+    def percentiles(self, ps=(50, 95, 99)):
+        if self.count == 0:
+            return [0.0 for _ in ps]
+        cum = np.cumsum(self.counts)
+        out = []
+        for p in ps:
+            i = int(np.searchsorted(cum, max(1, math.ceil(self.count * p / 100.0))))
+            out.append(min(max(self._bucket_ms(i), self.min), self.max))
+        return out
+
+    def stats(self):
+        p50, p95, p99 = self.percentiles((50, 95, 99))
+        return {"count": self.count, "mean_ms": self.sum_ms / self.count if self.count else 0.0,
+                "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+                "min_ms": self.min if self.count else 0.0, "max_ms": self.max}
+
+
+class StageLatency:
+    """
+    One LatencyHistogram per stage. record_all({"decode": 3.1, "inference": 40.2})
+    for the timings a frame collected on its way through the pipeline.
+    Each stage should be recorded from one thread only.
+    """
+
+    def __init__(self, stages=STAGES):
+        self.hists = {name: LatencyHistogram() for name in stages}
+
+    def record(self, stage, ms):
+        hist = self.hists.get(stage)
+        if hist is None:
+            hist = self.hists[stage] = LatencyHistogram()
+        hist.record(ms)
+
+    def record_all(self, timings):
+        for stage, ms in timings.items():
+            self.record(stage, ms)
+
+    def to_dict(self):
+        return {name: {k: round(v, 3) if isinstance(v, float) else v for k, v in h.stats().items()}
+                for name, h in self.hists.items() if h.count}
+
+    def summary(self):
+        lines = [f"{'stage':<12}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)"]
+        for name, s in self.to_dict().items():
+            lines.append(f"{name:<12}{s['count']:>8}{s['mean_ms']:>10.2f}{s['p50_ms']:>10.2f}"
+                         f"{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}")
+        return "\n".join(lines)
+
+    def save_json(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2))
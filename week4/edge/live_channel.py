@@ -0,0 +1,251 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from pathlib import Path
+
+# Live counts channel: ONE fixed-size binary record in a memory-mapped file,
+# guarded by a seqlock, instead of rewriting live_counts.json every frame.
+#
+# Writer (edge counter): seq += 1 (odd = writing) -> payload + crc -> seq += 1 (even).
+# Reader (controller):   read seq, copy payload + crc, read seq again; retry if the
+#                        two differ or are odd, or if the crc does not match.
+#                        Readers never block the writer and never see a
+#                        half-written record.
+#
+# The seq check alone relies on the stores and loads through the mmap staying in
+# program order, which x86 gives but ARM (the edge boxes) does not: a reader there
+# can see an even, unchanged seq around a torn payload. The crc32 of (seq, payload)
+# catches that on any CPU, and ties the payload to the seq it was written under.
+#
+# Layout (little-endian):
+#   header  : magic "LCNT", version u16, n_lanes u16, generation u64,
+#             lane names n_lanes x 16 bytes (utf-8, NUL padded)
+#   seq     : u64 (8-byte aligned, so it is written in one store)
+#   payload : t f64 (seconds since the counter started), wall f64 (unix time),
+#             emergency u8 + 7 pad, counts i32[n], flow f32[n] (vehicles/min)
+#   crc     : u32, zlib.crc32 of the even seq (u64) followed by the payload bytes
+#
+# Put the file on tmpfs (/dev/shm) so it never touches the SD card.
+
+MAGIC = b"LCNT"
+VERSION = 2
+NAME_LEN = 16
+HEADER = struct.Struct("<4sHHQ")
+SEQ = struct.Struct("<Q")
+CRC = struct.Struct("<I")
+
+
+def default_path():
+    shm = Path("/dev/shm")
+    if shm.is_dir():
+        return shm / "fyp_live_counts.bin"
+    return Path(__file__).resolve().parents[1] / "integration" / "live_counts.bin"
+
+
+def _layout(n_lanes):
+    names_off = HEADER.size
+    seq_off = names_off + n_lanes * NAME_LEN
+    seq_off += -seq_off % 8
+    payload = struct.Struct(f"<ddB7x{n_lanes}i{n_lanes}f")
+    return seq_off, payload, seq_off + SEQ.size + payload.size + CRC.size
+
+
+def record_crc(seq, payload):
+    return zlib.crc32(payload, zlib.crc32(SEQ.pack(seq)))
+
+
+class LiveCountsWriter:
+    """Creates (or reuses, when the lanes match) the channel file and publishes records."""
+
+    def __init__(self, path, lanes):
+        self.path = Path(path)
+        self.lanes = list(lanes)
+        self._seq_off, self._payload, size = _layout(len(self.lanes))
+        self._payload_off = self._seq_off + SEQ.size
+
+        if not self._compatible(size):
+            self._create(size)
+        self._f = open(self.path, "r+b")
+        self._mm = mmap.mmap(self._f.fileno(), size)
+        self.seq = SEQ.unpack_from(self._mm, self._seq_off)[0]
+        if self.seq % 2:
+            self.seq += 1  # previous writer died mid-write; start from a clean (even) value
+            SEQ.pack_into(self._mm, self._seq_off, self.seq)
+
+    def _compatible(self, size):
+        try:
+            if self.path.stat().st_size != size:
+                return False
+            with open(self.path, "rb") as f:
+                return read_header(f.read(size))[2] == self.lanes
+        except (OSError, ValueError):
+            return False
+
+    def _create(self, size):
+        # build the new file aside and rename it in, readers of an old layout keep a valid file
+        buf = bytearray(size)
+        HEADER.pack_into(buf, 0, MAGIC, VERSION, len(self.lanes), int.from_bytes(os.urandom(8), "little"))
+        for i, name in enumerate(self.lanes):
+            raw = name.encode()[:NAME_LEN]
+            buf[HEADER.size + i * NAME_LEN: HEADER.size + i * NAME_LEN + len(raw)] = raw
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_bytes(buf)
+        os.replace(tmp, self.path)
+
+    def publish(self, t, counts, emergency=False, flow=None, wall=None):
+        """counts / flow: {lane: value}; lanes not given are written as 0."""
+        flow = flow or {}
+        values = [int(counts.get(lane, 0)) for lane in self.lanes]
+        values += [float(flow.get(lane, 0.0)) for lane in self.lanes]
+
+        payload = self._payload.pack(t, time.time() if wall is None else wall, 1 if emergency else 0, *values)
+        record = payload + CRC.pack(record_crc(self.seq + 2, payload))
+
+        self.seq += 1
+        SEQ.pack_into(self._mm, self._seq_off, self.seq)  # odd: write in progress
+        self._mm[self._payload_off:self._payload_off + len(record)] = record
+        self.seq += 1
+        SEQ.pack_into(self._mm, self._seq_off, self.seq)  # even: record complete
+        return self.seq // 2
+
+    def close(self):
+        self._mm.close()
+        self._f.close()
+
+
+def read_header(buf):
+    magic, version, n, generation = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a live counts channel (or a different version)")
+    names = [bytes(buf[HEADER.size + i * NAME_LEN: HEADER.size + (i + 1) * NAME_LEN]).rstrip(b"\0").decode()
+             for i in range(n)]
+    return version, generation, names
+
+
+def _yield():
+    if hasattr(os, "sched_yield"):
+        os.sched_yield()
+    else:
+        time.sleep(0)
+
+
+class LiveCountsReader:
+    """
+    Controller-side API:
+
+        reader = LiveCountsReader(path)
+        rec = reader.read()        # latest complete record (dict) or None if nothing published yet
+        rec = reader.wait_new(0.5) # block (polling) until a newer record arrives, None on timeout
+    """
+
+    def __init__(self, path=None, retries=1000):
+        self.path = Path(path or default_path())
+        self.retries = retries
+        self.last_seq = 0
+        self._mm = None
+        self._open()
+
+    def _open(self):
+        self.close()
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            self._ino = os.fstat(f.fileno()).st_ino
+        _, self.generation, self.lanes = read_header(self._mm)
+        self._seq_off, self._payload, _ = _layout(len(self.lanes))
+        self._payload_off = self._seq_off + SEQ.size
+
+    def _replaced(self):
+        try:
+            return os.stat(self.path).st_ino != self._ino
+        except FileNotFoundError:
+            return False
+
+    def read(self):
+        for _ in range(self.retries):
+            s1 = SEQ.unpack_from(self._mm, self._seq_off)[0]
+            if s1 % 2:
+                _yield()  # writer is in the middle of a record (maybe preempted there)
+                continue
+            record = self._mm[self._payload_off:self._payload_off + self._payload.size + CRC.size]
+            if SEQ.unpack_from(self._mm, self._seq_off)[0] != s1:
+                _yield()  # overwritten while we copied it
+                continue
+            if s1 == 0:
+                return None
+            payload = record[:self._payload.size]
+            if CRC.unpack_from(record, self._payload.size)[0] != record_crc(s1, payload):
+                _yield()  # torn copy the seq did not catch (weakly ordered CPU)
+                continue
+            values = self._payload.unpack(payload)
+            n = len(self.lanes)
+            t, wall, emergency = values[:3]
+            self.last_seq = s1 // 2
+            return {
+                "seq": s1 // 2, "t": t, "wall": wall, "emergency": bool(emergency),
+                "counts": dict(zip(self.lanes, values[3:3 + n])),
+                "flow": dict(zip(self.lanes, values[3 + n:3 + 2 * n])),
+            }
+        raise RuntimeError("live counts channel: could not get a consistent record")
+
+    def wait_new(self, timeout=1.0, poll_s=0.0005):
+        """Poll (cheap: one 8-byte read) until a record newer than the last one read appears."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            seq = SEQ.unpack_from(self._mm, self._seq_off)[0]
+            if seq // 2 > self.last_seq and seq % 2 == 0:
+                return self.read()
+            if self._replaced():
+                self._open()  # writer restarted with another lane layout
+                self.last_seq = 0
+                continue
+            time.sleep(poll_s)
+        return None
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+class JsonMirror:
+    """
+    Human-readable copy of the live counts for debugging, at most every every_s
+    seconds, written to a temp file and renamed (readers never see half a file).
+    """
+
+    def __init__(self, path, every_s=1.0):
+        self.path = Path(path)
+        self.every_s = every_s
+        self._next = 0.0
+
+    def write(self, payload, force=False):
+        now = time.time()
+        if not force and now < self._next:
+            return False
+        self._next = now + self.every_s
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(payload, indent=2))
+        os.replace(tmp, self.path)
+        return True
+
+
+if __name__ == "__main__":
+    # python week4/edge/live_channel.py [path]  -> print every new record
+    reader = LiveCountsReader(sys.argv[1] if len(sys.argv) > 1 else None)
+    print("Lanes:", reader.lanes)
+    try:
+        while True:
+            rec = reader.wait_new(timeout=5.0)
+            if rec is None:
+                print("(no update for 5 s)")
+                continue
+            print(rec, flush=True)
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
@@ -0,0 +1,215 @@
+import errno
+import os
+import socket
+import struct
+import sys
+import tempfile
+import time
+
+# Push live counts to local subscribers (controller, logger, dashboard) over
+# datagram sockets, so they wake up on every update instead of polling a file.
+#
+# address: a path -> Unix datagram socket; ("127.0.0.1", port) -> UDP.
+#
+# Subscribers send SUB to the publisher address and repeat it as a heartbeat;
+# the publisher forgets them after SUB_TIMEOUT_S without one, or as soon as a
+# send fails because their socket is gone. Sends are non-blocking: a slow or
+# dead subscriber only loses its own messages, the detector loop never waits.
+#
+# Message (little-endian): "LC" version u8, flags u8 (bit 0 = emergency),
+# seq u32, t f64, wall f64, n_lanes u8, then per lane: name_len u8, name,
+# count u16, flow f32.
+
+VERSION = 1
+HEAD = struct.Struct("<2sBBIddB")
+LANE = struct.Struct("<Hf")
+SUB, UNSUB = b"SUB", b"UNSUB"
+HEARTBEAT_S = 2.0
+SUB_TIMEOUT_S = 10.0
+
+
+def default_address():
+    if hasattr(socket, "AF_UNIX"):
+        return os.path.join(tempfile.gettempdir(), "fyp_live_counts.sock")
+    return ("127.0.0.1", 47800)
+
+
+def _family(address):
+    return socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX
+
+
+def encode(seq, t, counts, emergency=False, flow=None, wall=None):
+    flow = flow or {}
+    parts = [HEAD.pack(b"LC", VERSION, 1 if emergency else 0, seq & 0xFFFFFFFF, t,
+                       time.time() if wall is None else wall, len(counts))]
+    for lane, c in counts.items():
+        name = lane.encode()[:255]
+        parts.append(bytes([len(name)]) + name + LANE.pack(max(0, min(int(c), 0xFFFF)), float(flow.get(lane, 0.0))))
+    return b"".join(parts)
+
+
+def decode(data):
+    magic, version, flags, seq, t, wall, n = HEAD.unpack_from(data, 0)
+    if magic != b"LC" or version != VERSION:
+        raise ValueError("not a live counts message")
+    off = HEAD.size
+    counts, flow = {}, {}
+    for _ in range(n):
+        k = data[off]
+        name = data[off + 1:off + 1 + k].decode()
+        off += 1 + k
+        counts[name], flow[name] = LANE.unpack_from(data, off)
+        off += LANE.size
+    return {"seq": seq, "t": t, "wall": wall, "emergency": bool(flags & 1), "counts": counts, "flow": flow}
+
+
+class LivePublisher:
+    """Edge side. publish() never blocks; subscribers register themselves."""
+
+    def __init__(self, address=None):
+        self.address = address or default_address()
+        self.sock = socket.socket(_family(self.address), socket.SOCK_DGRAM)
+        if self.sock.family == socket.AF_UNIX:
+            try:
+                os.unlink(self.address)  # stale socket file from a previous run
+            except FileNotFoundError:
+                pass
+        self.sock.bind(self.address)
+        self.sock.setblocking(False)
+        self.subscribers = {}  # address -> last heartbeat time
+        self.sent = 0
+        self.dropped = 0       # subscriber buffer full, message skipped for that one
+
+    def _poll_control(self, now):
+        while True:
+            try:
+                msg, addr = self.sock.recvfrom(64)
+            except (BlockingIOError, InterruptedError):
+                break
+            if not addr:
+                continue  # unbound Unix client, cannot answer it
+            if msg == SUB:
+                self.subscribers[addr] = now
+            elif msg == UNSUB:
+                self.subscribers.pop(addr, None)
+        for addr, seen in list(self.subscribers.items()):
+            if now - seen > SUB_TIMEOUT_S:
+                del self.subscribers[addr]
+
+    def publish(self, seq, t, counts, emergency=False, flow=None):
+        now = time.time()
+        self._poll_control(now)
+        if not self.subscribers:
+            return 0
+        msg = encode(seq, t, counts, emergency, flow, wall=now)
+        for addr in list(self.subscribers):
+            try:
+                self.sock.sendto(msg, addr)
+                self.sent += 1
+            except (BlockingIOError, InterruptedError):
+                self.dropped += 1
+            except OSError as e:
+                if e.errno in (errno.ENOENT, errno.ECONNREFUSED, errno.ENOTCONN):
+                    self.subscribers.pop(addr, None)  # subscriber is gone
+                else:
+                    self.dropped += 1
+        return len(self.subscribers)
+
+    def close(self):
+        self.sock.close()
+        if self.sock.family == socket.AF_UNIX:
+            try:
+                os.unlink(self.address)
+            except FileNotFoundError:
+                pass
+
+
+class LiveSubscriber:
+    """
+    Controller / logger side:
+
+        sub = LiveSubscriber()
+        while True:
+            msg = sub.recv(timeout=1.0)   # dict like LiveCountsReader.read(), None on timeout
+    """
+
+    def __init__(self, publisher_address=None, address=None):
+        self.publisher = publisher_address or default_address()
+        family = _family(self.publisher)
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        if family == socket.AF_UNIX and address is None and sys.platform.startswith("linux"):
+            # abstract namespace: no socket file left behind when a subscriber is killed
+            address = f"\0fyp_live_sub_{os.getpid()}_{id(self)}"
+        elif family == socket.AF_UNIX:
+            address = address or os.path.join(tempfile.gettempdir(), f"fyp_live_sub_{os.getpid()}_{id(self)}.sock")
+            try:
+                os.unlink(address)
+            except FileNotFoundError:
+                pass
+        else:
+            address = address or ("127.0.0.1", 0)
+        self.sock.bind(address)
+        self.address = self.sock.getsockname()
+        self.last_seq = None
+        self.missed = 0
+        self._next_heartbeat = 0.0
+
+    def _heartbeat(self):
+        now = time.time()
+        if now >= self._next_heartbeat:
+            self._next_heartbeat = now + HEARTBEAT_S
+            try:
+                self.sock.sendto(SUB, self.publisher)
+            except OSError:
+                pass  # publisher not running (yet); retried on the next heartbeat
+
+    def recv(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            self._heartbeat()
+            wait = HEARTBEAT_S if deadline is None else min(HEARTBEAT_S, deadline - time.time())
+            if wait <= 0:
+                return None
+            self.sock.settimeout(wait)
+            try:
+                data = self.sock.recv(2048)
+            except socket.timeout:
+                continue
+            try:
+                msg = decode(data)
+            except (ValueError, struct.error, IndexError):
+                continue
+            if self.last_seq is not None and msg["seq"] > self.last_seq + 1:
+                self.missed += msg["seq"] - self.last_seq - 1
+            self.last_seq = msg["seq"]
+            return msg
+
+    def close(self):
+        try:
+            self.sock.sendto(UNSUB, self.publisher)
+        except OSError:
+            pass
+        self.sock.close()
+        if self.sock.family == socket.AF_UNIX and isinstance(self.address, str) and self.address:
+            try:
+                os.unlink(self.address)
+            except FileNotFoundError:
+                pass
+
+
+if __name__ == "__main__":
+    # python week4/edge/live_pubsub.py [socket path | port]  -> print updates with delivery latency
+    arg = sys.argv[1] if len(sys.argv) > 1 else None
+    sub = LiveSubscriber(("127.0.0.1", int(arg)) if arg and arg.isdigit() else arg)
+    try:
+        while True:
+            msg = sub.recv(timeout=5.0)
+            if msg is None:
+                print("(no update for 5 s)")
+                continue
+            latency_ms = (time.time() - msg["wall"]) * 1000.0
+            print(f"{msg}  latency {latency_ms:.3f} ms  missed {sub.missed}", flush=True)
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    finally:
+        sub.close()
@@ -0,0 +1,238 @@
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Per-frame metrics without one CSV write + flush per frame.
+#
+# Rows go into a structured NumPy array used as a ring (the last `capacity`
+# frames stay in memory). Every `block` rows the new ones are appended to one
+# raw file per column (<run_dir>/<field>.bin, dtypes in schema.json), so the SD
+# card sees a few large writes per minute instead of a tiny write every frame.
+# Rolling 1 s / 10 s / 60 s aggregates go to <run_dir>/rollups.csv.
+#
+#   python week4/edge/metrics_ring.py <run_dir>            -> run summary
+#   python week4/edge/metrics_ring.py <run_dir> out.csv    -> export the full-resolution rows
+
+
+def _missing(dtype):
+    return np.nan if dtype.kind == "f" else -1
+
+
+class MetricsRing:
+    """
+    dtype: [(field, numpy type), ...]. append(row) takes a dict; missing fields
+    (or None / "") are stored as NaN for floats and -1 for integers.
+    full_res=False keeps only the in-memory ring (and whatever rollups read from it).
+    """
+
+    def __init__(self, run_dir, dtype, capacity=4096, block=512, full_res=True, **info):
+        self.dtype = np.dtype(dtype)
+        self.block = block
+        self.capacity = max(capacity, 2 * block)  # a block is always on disk before it is overwritten
+        self.buf = np.zeros(self.capacity, dtype=self.dtype)
+        self.n = 0        # rows appended so far
+        self.flushed = 0  # rows written to the column files
+        self._defaults = {name: _missing(self.dtype[name]) for name in self.dtype.names}
+
+        self.run_dir = Path(run_dir)
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        schema = {"fields": [[name, self.dtype[name].str] for name in self.dtype.names],
+                  "created": time.strftime("%Y-%m-%d %H:%M:%S"), **info}
+        (self.run_dir / "schema.json").write_text(json.dumps(schema, indent=2))
+        self._files = {}
+        if full_res:
+            self._files = {name: open(self.run_dir / f"{name}.bin", "ab") for name in self.dtype.names}
+
+    def __len__(self):
+        return min(self.n, self.capacity)
+
+    def append(self, row):
+        values = []
+        for name, default in self._defaults.items():
+            v = row.get(name)
+            values.append(default if v is None or v == "" else v)
+        self.buf[self.n % self.capacity] = tuple(values)
+        self.n += 1
+        if self.n - self.flushed >= self.block:
+            self.flush()
+
+    def recent(self, count=None):
+        """The last `count` rows (all rows still in memory when None), oldest first. A copy."""
+        count = len(self) if count is None else min(count, len(self))
+        end = self.n % self.capacity
+        return self.buf[np.arange(end - count, end) % self.capacity]
+
+    def since(self, field, t, before=0):
+        """
+        Rows whose `field` (non-decreasing, e.g. the time) is > t, oldest first,
+        plus up to `before` rows just ahead of them. Binary search, then a copy
+        of only those rows.
+        """
+        lo, hi = self.n - len(self), self.n  # logical row numbers still in memory
+        col = self.buf[field]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if col[mid % self.capacity] > t:
+                hi = mid
+            else:
+                lo = mid + 1
+        return self.recent(self.n - max(lo - before, self.n - len(self)))
+
+    def flush(self):
+        if not self._files:
+            self.flushed = self.n
+            return
+        self.flushed = max(self.flushed, self.n - self.capacity)
+        while self.flushed < self.n:
+            start = self.flushed % self.capacity
+            count = min(self.n - self.flushed, self.capacity - start)
+            chunk = self.buf[start:start + count]
+            for name, f in self._files.items():
+                f.write(chunk[name].tobytes())
+            self.flushed += count
+        for f in self._files.values():
+            f.flush()
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+
+class Rollups:
+    """
+    Every w seconds (for each w in windows) one rollups.csv row over the last w
+    seconds of the ring: mean / p50 / p95 / p99 / max of the latency fields and
+    mean / min / max / last of the count fields.
+    only_if={"inference_ms": "detector_ran"} leaves frames without a detector
+    call out of that field's statistics.
+    frame_field: frame counter of the rows (e.g. "frame_idx"). fps is then the
+    frames it advanced over the window, so it stays right when only every n-th
+    frame is logged; "frames" is always the number of rows in the window.
+    Without it, fps = rows / window.
+    """
+
+    STATS = ("mean", "p50", "p95", "p99", "max")
+
+    def __init__(self, ring, path, time_field, latency=(), counts=(), windows=(1, 10, 60), only_if=None,
+                 frame_field=None):
+        self.ring = ring
+        self.time_field = time_field
+        self.frame_field = frame_field
+        self.latency = list(latency)
+        self.counts = list(counts)
+        self.windows = sorted(windows)
+        self.only_if = only_if or {}
+        self._next = {w: None for w in self.windows}
+
+        self.fields = ["window_s", "t_end", "frames", "fps"]
+        self.fields += [f"{f}_{s}" for f in self.latency for s in self.STATS]
+        self.fields += [f"{f}_{s}" for f in self.counts for s in ("mean", "min", "max", "last")]
+        self.path = Path(path)
+        self._f = open(self.path, "a", newline="")
+        self._writer = csv.DictWriter(self._f, fieldnames=self.fields)
+        if self._f.tell() == 0:
+            self._writer.writeheader()
+
+    def update(self, now):
+        """Call once per row with the row's time; writes the windows that are due."""
+        for w in self.windows:
+            due = self._next[w]
+            if due is None:
+                self._next[w] = now + w
+            elif now >= due:
+                self._writer.writerow(self.compute(w, now))
+                self._next[w] = due + w if due + w > now else now + w
+                if w == self.windows[-1]:
+                    self._f.flush()  # the file is small; flush on the slowest window only
+
+    def fps(self, rows, prev, window_s):
+        if not self.frame_field or len(rows) == 0:
+            return len(rows) / window_s
+        frames = rows[self.frame_field]
+        first = prev[self.frame_field] if prev is not None else frames[0] - 1
+        return (int(frames[-1]) - int(first)) / window_s
+
+    def compute(self, window_s, now):
+        # only the window's tail of the ring, plus the row before it (frame counter start)
+        rows = self.ring.since(self.time_field, now - window_s, before=1)
+        prev = None
+        if len(rows) and rows[0][self.time_field] <= now - window_s:
+            prev, rows = rows[0], rows[1:]
+        out = {"window_s": window_s, "t_end": round(now, 3), "frames": len(rows),
+               "fps": round(self.fps(rows, prev, window_s), 2)}
+        for f in self.latency:
+            values = rows[f]
+            if f in self.only_if:
+                values = values[rows[self.only_if[f]] > 0]
+            values = values[~np.isnan(values)] if values.dtype.kind == "f" else values
+            if len(values) == 0:
+                continue
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            out.update({f"{f}_mean": round(float(values.mean()), 2), f"{f}_p50": round(float(p50), 2),
+                        f"{f}_p95": round(float(p95), 2), f"{f}_p99": round(float(p99), 2),
+                        f"{f}_max": round(float(values.max()), 2)})
+        for f in self.counts:
+            values = rows[f]
+            if len(values) == 0:
+                continue
+            out.update({f"{f}_mean": round(float(values.mean()), 2), f"{f}_min": values.min().item(),
+                        f"{f}_max": values.max().item(), f"{f}_last": values[-1].item()})
+        return out
+
+    def close(self):
+        self._f.close()
+
+
+def load_run(run_dir):
+    """Full-resolution columns of a run: {field: array}."""
+    run_dir = Path(run_dir)
+    schema = json.loads((run_dir / "schema.json").read_text())
+    cols = {}
+    for name, dtype in schema["fields"]:
+        path = run_dir / f"{name}.bin"
+        cols[name] = np.fromfile(path, dtype=dtype) if path.exists() else np.array([], dtype=dtype)
+    return cols
+
+
+def export_csv(run_dir, out_path):
+    """Write a run as a CSV with the same columns as the old edge_metrics.csv. Returns the row count."""
+    cols = load_run(run_dir)
+    names = list(cols)
+    n = min((len(c) for c in cols.values()), default=0)  # a column can be one block ahead after a crash
+    with open(out_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        for i in range(n):
+            row = []
+            for name in names:
+                v = cols[name][i].item()
+                if isinstance(v, float):
+                    v = "" if np.isnan(v) else round(v, 3)
+                row.append(v)
+            writer.writerow(row)
+    return n
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python week4/edge/metrics_ring.py <run_dir> [out.csv]")
+        sys.exit(1)
+    run = Path(sys.argv[1])
+    if len(sys.argv) > 2:
+        print(f"{export_csv(run, sys.argv[2])} rows -> {sys.argv[2]}")
+    else:
+        for name, col in load_run(run).items():
+            if col.dtype.kind == "f" and len(col):
+                col = col[~np.isnan(col)]
+            if len(col) == 0:
+                print(f"{name:<20} (empty)")
+                continue
+            p50, p95, p99 = np.percentile(col, [50, 95, 99])
+            print(f"{name:<20} n={len(col):<7} mean {col.mean():10.2f}  p50 {p50:10.2f}  "
+                  f"p95 {p95:10.2f}  p99 {p99:10.2f}  max {col.max():10.2f}")
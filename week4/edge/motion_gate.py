@@ -0,0 +1,71 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap "did anything change in the ROI?" check before running YOLO.
+
+    The frame is converted to gray and downscaled, then compared with the frame
+    of the LAST INFERENCE (not the previous frame), so slow changes still add
+    up and trigger eventually. Inference is forced every force_every frames
+    so counts can never go stale for long.
+
+    mask: optional uint8 mask (same size as the frames passed in), 0 = ignore.
+    """
+
+    def __init__(self, mask=None, scale=0.25, pixel_thresh=25, changed_frac=0.002, force_every=15):
+        self.scale = scale
+        self.pixel_thresh = pixel_thresh
+        self.changed_frac = changed_frac
+        self.force_every = force_every
+
+        self._mask_src = mask
+        self._mask = None
+        self._mask_pixels = 0
+        self._ref = None
+        self.frames_since_infer = 0
+        self.last_change = 0.0  # fraction of ROI pixels that changed (for logging)
+
+    def _small_gray(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+    def _prepare_mask(self, small_shape):
+        h, w = small_shape
+        if self._mask_src is None:
+            self._mask = None
+            self._mask_pixels = h * w
+        else:
+            m = cv2.resize(self._mask_src, (w, h), interpolation=cv2.INTER_NEAREST) > 0
+            self._mask = m
+            self._mask_pixels = max(int(m.sum()), 1)
+
+    def set_mask(self, mask):
+        """New ROI mask (e.g. frame size changed). Forces the next inference."""
+        self._mask_src = mask
+        self._ref = None
+
+    def should_infer(self, frame):
+        small = self._small_gray(frame)
+
+        if self._ref is None or self._ref.shape != small.shape:
+            self._prepare_mask(small.shape)
+            return self._accept(small, 1.0)
+
+        diff = cv2.absdiff(small, self._ref) > self.pixel_thresh
+        if self._mask is not None:
+            diff &= self._mask
+        self.last_change = float(np.count_nonzero(diff)) / self._mask_pixels
+
+        if self.last_change >= self.changed_frac or self.frames_since_infer + 1 >= self.force_every:
+            return self._accept(small, self.last_change)
+
+        self.frames_since_infer += 1
+        return False
+
+    def _accept(self, small, change):
+        self._ref = small
+        self.frames_since_infer = 0
+        self.last_change = change
+        return True
@@ -0,0 +1,101 @@
+import time
+
+import cv2
+
+
+class FramePacer:
+    """
+    Frame pacing from ABSOLUTE deadlines: tick k is due at t0 + k / target_fps.
+
+    - Early: sleep until the deadline (no drift, unlike "sleep since last frame").
+    - Late by one interval or more: the missed ticks are dropped, so the run never
+      falls behind real time.
+    - File sources: the frame shown at tick k is the one that would be on screen
+      at that moment in the video (source_fps aware). Frames in between are
+      skipped with cap.grab(), which does not decode them.
+
+    Set realtime=False for live cameras (they are real time already, every
+    read() simply returns the next frame).
+    """
+
+    def __init__(self, cap, target_fps, realtime=True):
+        self.cap = cap
+        self.target_fps = target_fps
+        self.interval = 1.0 / target_fps
+        self.realtime = realtime
+
+        src_fps = cap.get(cv2.CAP_PROP_FPS)
+        self.source_fps = src_fps if src_fps and src_fps > 0 else target_fps
+        self.src_pos = int(cap.get(cv2.CAP_PROP_POS_FRAMES) or 0)  # next frame index in the file
+        self._src_start = self.src_pos
+
+        self.t0 = None
+        self.tick = 0
+
+        # stats
+        self.frames = 0            # frames delivered
+        self.dropped_ticks = 0     # deadlines missed and skipped
+        self.grabbed = 0           # source frames skipped without decoding
+        self.lateness_ms = 0.0     # lateness of the last delivered frame
+        self.decode_ms = 0.0       # grab + read time of the last delivered frame (no sleep)
+        self.max_lateness_ms = 0.0
+
+    def read(self):
+        """Return the frame due now, or None at end of stream."""
+        now = time.perf_counter()
+        if self.t0 is None:
+            self.t0 = now
+
+        deadline = self.t0 + self.tick * self.interval
+        if now < deadline:
+            time.sleep(deadline - now)
+            now = time.perf_counter()
+
+        late = now - deadline
+        if late >= self.interval:
+            missed = int(late // self.interval)
+            self.tick += missed
+            self.dropped_ticks += missed
+            late -= missed * self.interval
+
+        t_decode = time.perf_counter()
+        if self.realtime:
+            want = self._src_start + int(round(self.tick * self.source_fps / self.target_fps))
+            while self.src_pos < want:
+                if not self.cap.grab():
+                    return None
+                self.src_pos += 1
+                self.grabbed += 1
+
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self.decode_ms = (time.perf_counter() - t_decode) * 1000.0
+        self.src_pos += 1
+        self.tick += 1
+        self.frames += 1
+
+        self.lateness_ms = late * 1000.0
+        self.max_lateness_ms = max(self.max_lateness_ms, self.lateness_ms)
+        return frame
+
+    def achieved_fps(self):
+        if self.t0 is None or self.frames == 0:
+            return 0.0
+        elapsed = time.perf_counter() - self.t0
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def stats(self):
+        return {
+            "achieved_fps": self.achieved_fps(),
+            "lateness_ms": self.lateness_ms,
+            "dropped_ticks": self.dropped_ticks,
+            "grabbed_frames": self.grabbed,
+            "decode_ms": self.decode_ms,
+            "source_frame": self.src_pos - 1,
+        }
+
+    def summary(self):
+        return (f"achieved {self.achieved_fps():.1f}/{self.target_fps} FPS, "
+                f"dropped {self.dropped_ticks} late ticks, skipped {self.grabbed} source frames (grab), "
+                f"max lateness {self.max_lateness_ms:.1f} ms")
@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import deque
+
+
+class LatestQueue:
+    """
+    Bounded queue that drops the OLDEST item when full.
+    Consumers therefore always get the freshest frame, never a backlog.
+    """
+
+    def __init__(self, maxsize=1):
+        self._items = deque()
+        self._maxsize = maxsize
+        self._cond = threading.Condition()
+        self._closed = False
+        self.drops = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self._maxsize:
+                self._items.popleft()
+                self.drops += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the next item, or None once the queue is closed and empty."""
+        with self._cond:
+            while not self._items and not self._closed:
+                if not self._cond.wait(timeout):
+                    return None
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def depth(self):
+        with self._cond:
+            return len(self._items)
+
+
+class StagedPipeline:
+    """
+    capture thread -> frame_q -> inference worker -> result_q -> publisher thread
+                                                  \\-> display_q (read by main thread)
+
+    read_frame() -> {"frame": ..., extra fields} or None (end of stream)
+    infer(item) -> result dict (item = read_frame() dict + "frame_idx", "t_capture")
+    publish(result, stats) -> None
+
+    cv2.imshow must stay on the main thread, so rendering is done by whoever
+    drains display_q (see edge_yolo_metrics.run_pipeline).
+
+    An exception in any stage stops the pipeline; join() re-raises it in the
+    calling thread.
+    """
+
+    def __init__(self, read_frame, infer, publish, queue_size=1):
+        self.read_frame = read_frame
+        self.infer = infer
+        self.publish = publish
+
+        self.frame_q = LatestQueue(queue_size)
+        self.result_q = LatestQueue(queue_size)
+        self.display_q = LatestQueue(1)
+        self.stop_event = threading.Event()
+        self.error = None
+
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._infer_loop, name="inference", daemon=True),
+            threading.Thread(target=self._publish_loop, name="publisher", daemon=True),
+        ]
+
+    # ---------- stages ----------
+    def _capture_loop(self):
+        frame_idx = 0
+        try:
+            while not self.stop_event.is_set():
+                item = self.read_frame()
+                if item is None:
+                    break
+                item["frame_idx"] = frame_idx
+                item["t_capture"] = time.time()
+                self.frame_q.put(item)
+                frame_idx += 1
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self.frame_q.close()
+
+    def _infer_loop(self):
+        try:
+            while not self.stop_event.is_set():
+                item = self.frame_q.get(timeout=0.5)
+                if item is None:
+                    if self.frame_q.closed:
+                        break
+                    continue
+                result = self.infer(item)
+                self.result_q.put(result)
+                self.display_q.put(result)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self.result_q.close()
+            self.display_q.close()
+
+    def _publish_loop(self):
+        try:
+            while True:
+                result = self.result_q.get(timeout=0.5)
+                if result is None:
+                    if self.result_q.closed:
+                        break
+                    continue
+                self.publish(result, self.stats())
+        except BaseException as e:
+            self._fail(e)
+
+    def _fail(self, exc):
+        """Keep the first stage error for join() and stop the other stages."""
+        if self.error is None:
+            self.error = exc
+        self.stop_event.set()
+
+    # ---------- control ----------
+    def start(self):
+        for th in self._threads:
+            th.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        """Wait for the stage threads; re-raises the first exception a stage hit."""
+        for th in self._threads:
+            th.join(timeout)
+        if self.error is not None:
+            raise self.error
+
+    def is_running(self):
+        return self._threads[1].is_alive() or self._threads[2].is_alive()
+
+    def stats(self):
+        return {
+            "frame_q_depth": self.frame_q.depth(),
+            "frame_q_drops": self.frame_q.drops,
+            "result_q_depth": self.result_q.depth(),
+            "result_q_drops": self.result_q.drops,
+        }
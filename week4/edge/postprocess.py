@@ -0,0 +1,158 @@
+from collections import namedtuple
+
+import numpy as np
+
+# One frame of detections as plain NumPy arrays:
+#   xyxy (N, 4) float32, conf (N,) float32, cls (N,) int32
+Detections = namedtuple("Detections", ["xyxy", "conf", "cls"])
+
+
+def empty_detections():
+    return Detections(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int32))
+
+
+def detections_from_results(results):
+    """ultralytics Results -> Detections, with ONE device->host copy for all boxes."""
+    boxes = results.boxes
+    if boxes is None or len(boxes) == 0:
+        return empty_detections()
+
+    data = boxes.data  # (N, 6): x1, y1, x2, y2, conf, cls
+    if hasattr(data, "cpu"):
+        data = data.cpu().numpy()
+    data = np.asarray(data, dtype=np.float32)
+    return Detections(data[:, :4], data[:, 4], data[:, 5].astype(np.int32))
+
+
+def class_ids_for(names, labels):
+    """Class ids whose name is in labels (names = model.names, dict or list)."""
+    items = names.items() if isinstance(names, dict) else enumerate(names)
+    return sorted(int(i) for i, n in items if n in labels)
+
+
+def class_lookup(names, labels):
+    """Boolean table indexed by class id: lookup[cls] is True for wanted labels."""
+    ids = list(names.keys()) if isinstance(names, dict) else range(len(names))
+    table = np.zeros(max(ids, default=-1) + 2, dtype=bool)  # +1 spare slot for unknown ids
+    table[class_ids_for(names, labels)] = True
+    return table
+
+
+def select(dets, lookup):
+    """Keep only detections whose class is True in lookup."""
+    cls = np.clip(dets.cls, 0, len(lookup) - 1)
+    keep = lookup[cls]
+    return Detections(dets.xyxy[keep], dets.conf[keep], dets.cls[keep])
+
+
+def any_class(dets, lookup):
+    if len(dets.cls) == 0:
+        return False
+    return bool(lookup[np.clip(dets.cls, 0, len(lookup) - 1)].any())
+
+
+def centroids(xyxy):
+    """Integer box centers, truncated like int((x1 + x2) / 2) in the old loops."""
+    cx = ((xyxy[:, 0] + xyxy[:, 2]) / 2).astype(np.int32)
+    cy = ((xyxy[:, 1] + xyxy[:, 3]) / 2).astype(np.int32)
+    return cx, cy
+
+
+def in_rect(cx, cy, rect):
+    x1, y1, x2, y2 = rect
+    return (cx >= x1) & (cx <= x2) & (cy >= y1) & (cy <= y2)
+
+
+def in_polygon(cx, cy, polygon):
+    """
+    Vectorized point-in-polygon, boundary counts as inside
+    (same as cv2.pointPolygonTest(...) >= 0 for integer points).
+    """
+    poly = np.asarray(polygon, dtype=np.int64)
+    px = np.asarray(cx, dtype=np.int64)[:, None]
+    py = np.asarray(cy, dtype=np.int64)[:, None]
+
+    ax, ay = poly[:, 0][None, :], poly[:, 1][None, :]
+    bx, by = np.roll(poly[:, 0], -1)[None, :], np.roll(poly[:, 1], -1)[None, :]
+
+    # on an edge: collinear and inside the segment's bounding box
+    cross = (bx - ax) * (py - ay) - (by - ay) * (px - ax)
+    on_edge = (
+        (cross == 0)
+        & (px >= np.minimum(ax, bx)) & (px <= np.maximum(ax, bx))
+        & (py >= np.minimum(ay, by)) & (py <= np.maximum(ay, by))
+    ).any(axis=1)
+
+    # even-odd ray casting to +x
+    straddles = (ay > py) != (by > py)
+    dy = np.where(by - ay == 0, 1, by - ay)
+    x_cross = ax + (py - ay) * (bx - ax) / dy
+    inside = (straddles & (px < x_cross)).sum(axis=1) % 2 == 1
+
+    return inside | on_edge
+
+
+# Class filtering precomputed once from model.names:
+#   vehicle / emergency: lookup tables for select()/any_class()
+#   classes: ids to pass as model.predict(classes=...) so NMS only keeps what we count
+ClassFilter = namedtuple("ClassFilter", ["vehicle", "emergency", "classes"])
+
+
+def make_class_filter(names, vehicle_labels, emergency_labels=()):
+    wanted = set(vehicle_labels) | set(emergency_labels)
+    return ClassFilter(
+        vehicle=class_lookup(names, vehicle_labels),
+        emergency=class_lookup(names, emergency_labels),
+        classes=class_ids_for(names, wanted) or None,
+    )
+
+
+def offset(dets, dx, dy):
+    """Shift boxes from crop coordinates back to full-frame coordinates."""
+    if dx == 0 and dy == 0:
+        return dets
+    shift = np.array([dx, dy, dx, dy], dtype=np.float32)
+    return Detections(dets.xyxy + shift, dets.conf, dets.cls)
+
+
+# Box edges the detector regresses are only good to about this many pixels of
+# *model input*; drop_cut converts it to crop pixels with the letterbox scale.
+CUT_TOL_PX = 2.0
+
+
+def letterbox_scale(src_w, src_h, imgsz):
+    """Resize factor of an src_w x src_h image letterboxed into imgsz (int or [h, w])."""
+    in_h, in_w = (imgsz, imgsz) if isinstance(imgsz, int) else imgsz
+    return min(in_h / src_h, in_w / src_w)
+
+
+def cut_tolerance(scale, tol_px=CUT_TOL_PX):
+    """CUT_TOL_PX of model input in source pixels; never below tol_px when upscaling."""
+    return tol_px / min(scale, 1.0)
+
+
+def drop_cut(dets, crop, frame_shape, imgsz=None):
+    """
+    Drop boxes (crop coordinates) that touch a crop edge which is not also a
+    frame edge: the detector only saw part of that vehicle, so its center is
+    shifted towards the inside of the crop.
+    imgsz: the model input the crop was letterboxed into. "Touch" is then
+    CUT_TOL_PX input pixels, scaled back to crop pixels; None = CUT_TOL_PX crop pixels.
+    """
+    x1, y1, x2, y2 = crop
+    h, w = frame_shape[:2]
+    tol = CUT_TOL_PX if imgsz is None else cut_tolerance(letterbox_scale(x2 - x1, y2 - y1, imgsz))
+    xyxy = dets.xyxy
+    cut = np.zeros(len(xyxy), dtype=bool)
+    if x1 > 0:
+        cut |= xyxy[:, 0] <= tol
+    if y1 > 0:
+        cut |= xyxy[:, 1] <= tol
+    if x2 < w:
+        cut |= xyxy[:, 2] >= (x2 - x1) - tol
+    if y2 < h:
+        cut |= xyxy[:, 3] >= (y2 - y1) - tol
+    if not cut.any():
+        return dets
+    keep = ~cut
+    return Detections(xyxy[keep], dets.conf[keep], dets.cls[keep])
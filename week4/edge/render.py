@@ -0,0 +1,77 @@
+import time
+from pathlib import Path
+
+import cv2
+
+# Display helpers shared by the edge scripts.
+#
+# Interactive mode draws the overlay, calls imshow and polls waitKey every frame.
+# Headless mode (edge boxes, no display) skips all of that; SnapshotWriter can
+# still dump an annotated frame to disk every N seconds for debugging, and
+# RenderTimer measures what the rendering costs per frame in either mode.
+
+
+class SnapshotWriter:
+    """
+    Saves an annotated JPEG every every_s seconds (0 = disabled).
+    Only the newest `keep` files are kept so a long run cannot fill the disk.
+    """
+
+    def __init__(self, out_dir, every_s=0, keep=200, prefix="snap"):
+        self.out_dir = Path(out_dir)
+        self.every_s = every_s
+        self.keep = keep
+        self.prefix = prefix
+        self._next = 0.0
+        self._written = []
+        self.saved = 0
+
+    def due(self, now=None):
+        if self.every_s <= 0:
+            return False
+        now = time.time() if now is None else now
+        return now >= self._next
+
+    def save(self, frame, now=None):
+        now = time.time() if now is None else now
+        self._next = now + self.every_s
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        path = self.out_dir / f"{self.prefix}_{time.strftime('%Y%m%d_%H%M%S', time.localtime(now))}_{self.saved:05d}.jpg"
+        cv2.imwrite(str(path), frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        self.saved += 1
+        self._written.append(path)
+        while len(self._written) > self.keep:
+            self._written.pop(0).unlink(missing_ok=True)
+        return path
+
+
+class RenderTimer:
+    """Per-frame render cost (overlay + imshow + waitKey, or snapshot in headless mode)."""
+
+    def __init__(self):
+        self.last_ms = 0.0
+        self.total_ms = 0.0
+        self.frames = 0
+        self._t0 = None
+
+    def start(self):
+        self._t0 = time.perf_counter()
+
+    def stop(self):
+        self.last_ms = (time.perf_counter() - self._t0) * 1000.0
+        self.total_ms += self.last_ms
+        self.frames += 1
+        return self.last_ms
+
+    def mean_ms(self):
+        return self.total_ms / self.frames if self.frames else 0.0
+
+    def summary(self, headless):
+        mode = "headless" if headless else "interactive"
+        return f"{mode} render cost {self.mean_ms():.2f} ms/frame over {self.frames} frames"
+
+
+def close_windows(headless):
+    # opencv-python-headless raises on every GUI call, even destroyAllWindows
+    if not headless:
+        cv2.destroyAllWindows()
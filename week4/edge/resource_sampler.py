@@ -0,0 +1,169 @@
+import csv
+import threading
+import time
+from pathlib import Path
+
+import psutil
+
+# System / process resources sampled on a background thread at a fixed interval,
+# so the frame loop never makes these syscalls itself: it only picks up the
+# latest sample (latest()) and stores it next to its own timestamp.
+#
+# Per sample: system CPU % and memory %, this process's CPU % and RSS, CPU
+# frequency and temperature (when the platform exposes them), CPU % of every
+# thread of this process (torch / onnxruntime pools included) and, optionally,
+# of other processes (the process-mode children).
+#
+# CPU % here: 100 = one core (system cpu_percent is psutil's 0-100 over all cores).
+
+RESOURCE_FIELDS = ["t", "cpu_percent", "mem_percent", "proc_cpu_percent", "rss_mb", "cpu_freq_mhz", "temp_c"]
+FLUSH_EVERY = 60  # samples between flushes of the CSV files
+
+
+def read_temperature():
+    """Highest CPU temperature in degrees C, None when not available (VMs, macOS, Windows)."""
+    read = getattr(psutil, "sensors_temperatures", None)
+    if read is None:
+        return None
+    try:
+        sensors = read()
+    except (OSError, RuntimeError):
+        return None
+    # Raspberry Pi: cpu_thermal, Intel: coretemp, AMD: k10temp
+    for key in ("cpu_thermal", "coretemp", "k10temp"):
+        if sensors.get(key):
+            return max(s.current for s in sensors[key])
+    temps = [s.current for entries in sensors.values() for s in entries]
+    return max(temps) if temps else None
+
+
+def read_cpu_freq():
+    try:
+        freq = psutil.cpu_freq()
+    except (OSError, NotImplementedError):
+        return None
+    return freq.current if freq else None
+
+
+def thread_name(tid, py_names):
+    """Python threads by their threading name, native ones (torch, onnxruntime) by /proc comm."""
+    if tid in py_names:
+        return py_names[tid]
+    try:
+        with open(f"/proc/self/task/{tid}/comm") as f:
+            return f.read().strip()
+    except OSError:
+        return "native"
+
+
+class ResourceSampler:
+    """
+    sampler = ResourceSampler(1.0, out_dir=run_dir); sampler.start()
+    sample = sampler.latest()   # dict, {} until the first sample
+    sampler.stop()
+
+    extra_procs(): optional {name: cpu %}, called on the sampler thread
+    (e.g. ProcessPipeline.cpu_percent for the capture / inference processes).
+    out_dir: resources.csv (one row per sample) and threads.csv (one row per
+    thread that used CPU in that interval).
+    """
+
+    def __init__(self, interval_s=1.0, extra_procs=None, out_dir=None):
+        self.interval_s = interval_s
+        self.extra_procs = extra_procs
+        self.proc = psutil.Process()
+        self._latest = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_threads = {}
+        self._last_t = None
+        self._thread_sum = {}  # thread name -> summed CPU % (for summary())
+        self.samples = 0
+
+        self._files = []
+        self._res_writer = self._thr_writer = None
+        if out_dir is not None:
+            out_dir = Path(out_dir)
+            out_dir.mkdir(parents=True, exist_ok=True)
+            res_f = open(out_dir / "resources.csv", "w", newline="")
+            thr_f = open(out_dir / "threads.csv", "w", newline="")
+            self._files = [res_f, thr_f]
+            self._res_writer = csv.DictWriter(res_f, fieldnames=RESOURCE_FIELDS, extrasaction="ignore")
+            self._res_writer.writeheader()
+            self._thr_writer = csv.writer(thr_f)
+            self._thr_writer.writerow(["t", "tid", "name", "cpu_percent"])
+
+    def start(self):
+        # prime the "since last call" counters, the first real sample is one interval later
+        psutil.cpu_percent(interval=None)
+        self.proc.cpu_percent(None)
+        self._sample_threads(time.time())
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def latest(self):
+        return self._latest
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                self._latest = self.sample()
+            except psutil.Error:
+                continue  # process table changed under us (child exited); try again next tick
+
+    def _sample_threads(self, now):
+        """CPU % per thread since the previous call: {tid: (name, %)}."""
+        py_names = {t.native_id: t.name for t in threading.enumerate() if getattr(t, "native_id", None)}
+        times = {t.id: t.user_time + t.system_time for t in self.proc.threads()}
+        out = {}
+        if self._last_t is not None and now > self._last_t:
+            dt = now - self._last_t
+            for tid, cpu_s in times.items():
+                used = cpu_s - self._last_threads.get(tid, cpu_s)
+                if used > 0:
+                    out[tid] = (thread_name(tid, py_names), used / dt * 100.0)
+        self._last_threads, self._last_t = times, now
+        return out
+
+    def sample(self):
+        now = time.time()
+        threads = self._sample_threads(now)
+        s = {
+            "t": now,
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "mem_percent": psutil.virtual_memory().percent,
+            "proc_cpu_percent": self.proc.cpu_percent(None),
+            "rss_mb": self.proc.memory_info().rss / 2 ** 20,
+            "cpu_freq_mhz": read_cpu_freq(),
+            "temp_c": read_temperature(),
+            "threads": {tid: cpu for tid, (_, cpu) in threads.items()},
+            "procs": self.extra_procs() if self.extra_procs is not None else {},
+        }
+        self.samples += 1
+        for name, cpu in threads.values():
+            self._thread_sum[name] = self._thread_sum.get(name, 0.0) + cpu
+
+        if self._res_writer is not None:
+            self._res_writer.writerow({k: round(v, 2) if isinstance(v, float) else v
+                                       for k, v in s.items() if k in RESOURCE_FIELDS})
+            for tid, (name, cpu) in threads.items():
+                self._thr_writer.writerow([round(now, 3), tid, name, round(cpu, 1)])
+            if self.samples % FLUSH_EVERY == 0:
+                for f in self._files:
+                    f.flush()
+        return s
+
+    def summary(self, top=6):
+        """Mean CPU % per thread name (threads with the same name summed), busiest first."""
+        n = max(self.samples, 1)
+        busiest = sorted(self._thread_sum.items(), key=lambda kv: -kv[1])[:top]
+        return ", ".join(f"{name} {total / n:.0f}%" for name, total in busiest) or "no samples"
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2 * self.interval_s + 1)
+        for f in self._files:
+            f.close()
+        self._files = []
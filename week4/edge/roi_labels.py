@@ -0,0 +1,162 @@
+import numpy as np
+
+from postprocess import in_polygon
+
+ROWS_PER_CHUNK = 64  # keeps the polygon rasterization temporaries small on 1080p frames
+
+
+def is_rect(roi):
+    return len(roi) == 4 and all(np.isscalar(v) for v in roi)
+
+
+def roi_to_polygon(roi):
+    """Accept a rect (x1, y1, x2, y2) or a polygon [(x, y), ...] and return the polygon."""
+    if is_rect(roi):
+        x1, y1, x2, y2 = roi
+        return [(x1, y1), (x2, y1), (x2, y2), (x1, y2)]
+    return list(roi)
+
+
+def paint_roi(labels, roi, value):
+    """
+    Set labels to value at every integer pixel inside roi (boundary included),
+    i.e. the same decision x1 <= x <= x2 and y1 <= y <= y2 /
+    cv2.pointPolygonTest(...) >= 0 make for a single ROI.
+    """
+    h, w = labels.shape
+    if is_rect(roi):
+        x1, y1, x2, y2 = roi
+        labels[max(y1, 0):min(y2 + 1, h), max(x1, 0):min(x2 + 1, w)] = value
+        return
+
+    poly = np.asarray(roi, dtype=np.int64)
+    x_lo, y_lo = np.maximum(poly.min(axis=0), 0)
+    x_hi, y_hi = np.minimum(poly.max(axis=0), [w - 1, h - 1])
+    if x_lo > x_hi or y_lo > y_hi:
+        return
+
+    xs = np.arange(x_lo, x_hi + 1)
+    for y0 in range(y_lo, y_hi + 1, ROWS_PER_CHUNK):
+        ys = np.arange(y0, min(y0 + ROWS_PER_CHUNK, y_hi + 1))
+        gx, gy = np.meshgrid(xs, ys)
+        inside = in_polygon(gx.ravel(), gy.ravel(), poly).reshape(gx.shape)
+        labels[ys[0]:ys[-1] + 1, x_lo:x_hi + 1][inside] = value
+
+
+class RoiLabelMap:
+    """
+    All lane ROIs compiled ONCE into a label image:
+        labels[y, x] = 0 (no lane) or i (1-based index into names)
+    Assigning box centers to lanes is then one indexed lookup for all boxes,
+    no matter how many polygons there are.
+
+    rois: {name: rect or polygon}.
+
+    By default each pixel holds ONE label, so a point is counted in at most one
+    ROI: where ROIs overlap or share an edge, the later one in rois wins. The
+    old per-ROI loop (count_rois.py before the label map) counted such a point
+    in every ROI containing it, e.g. a center exactly on the w // 2 line of the
+    quadrant ROIs was counted twice.
+
+    count_overlaps=True keeps that per-ROI behaviour: labels is then a bitmask
+    (bit i - 1 set = inside ROI i, up to 64 ROIs), assign() returns the masks and
+    counts() counts a point in every ROI whose bit it has.
+    """
+
+    def __init__(self, rois, frame_shape, count_overlaps=False):
+        self.rois = dict(rois)
+        self.names = list(self.rois)
+        self.count_overlaps = count_overlaps
+        if count_overlaps and len(self.names) > 64:
+            raise ValueError(f"count_overlaps supports up to 64 ROIs, got {len(self.names)}")
+        self.shape = None
+        self.labels = None
+        self.compile(frame_shape)
+
+    def compile(self, frame_shape):
+        h, w = frame_shape[:2]
+        if self.count_overlaps:
+            n = len(self.names)
+            dtype = np.uint8 if n <= 8 else np.uint16 if n <= 16 else np.uint32 if n <= 32 else np.uint64
+            labels = np.zeros((h, w), dtype=dtype)
+            inside = np.zeros((h, w), dtype=bool)
+            for i, name in enumerate(self.names):
+                inside[:] = False
+                paint_roi(inside, self.rois[name], True)
+                labels[inside] |= dtype(1 << i)
+        else:
+            dtype = np.uint8 if len(self.names) < 255 else np.uint16
+            labels = np.zeros((h, w), dtype=dtype)
+            for i, name in enumerate(self.names, start=1):
+                paint_roi(labels, self.rois[name], i)
+        self.labels = labels
+        self.shape = (h, w)
+
+    def ensure_shape(self, frame_shape):
+        """Recompile only if the frame size changed (e.g. camera switched resolution). True if recompiled."""
+        if tuple(frame_shape[:2]) != self.shape:
+            self.compile(frame_shape)
+            return True
+        return False
+
+    def assign(self, cx, cy):
+        """Label id (bitmask with count_overlaps) per point, 0 = outside every ROI. Points off-frame get 0."""
+        cx = np.asarray(cx, dtype=np.int64)
+        cy = np.asarray(cy, dtype=np.int64)
+        h, w = self.shape
+        on_frame = (cx >= 0) & (cx < w) & (cy >= 0) & (cy < h)
+        ids = np.zeros(cx.shape, dtype=self.labels.dtype)
+        ids[on_frame] = self.labels[cy[on_frame], cx[on_frame]]
+        return ids
+
+    def counts(self, cx, cy):
+        """{name: number of points inside that ROI}"""
+        return self.tally(self.assign(cx, cy))
+
+    def tally(self, ids):
+        """Label ids from assign() -> {name: count}"""
+        if self.count_overlaps:
+            ids = np.asarray(ids, dtype=self.labels.dtype)
+            return {name: int(np.count_nonzero(ids & self.labels.dtype.type(1 << i)))
+                    for i, name in enumerate(self.names)}
+        per_label = np.bincount(ids, minlength=len(self.names) + 1)
+        return {name: int(per_label[i]) for i, name in enumerate(self.names, start=1)}
+
+    def mask(self, name=None):
+        """uint8 0/255 mask of one ROI, or of all ROIs when name is None."""
+        if name is None:
+            hit = self.labels > 0
+        elif self.count_overlaps:
+            hit = (self.labels & self.labels.dtype.type(1 << self.names.index(name))) > 0
+        else:
+            hit = self.labels == self.names.index(name) + 1
+        return hit.astype(np.uint8) * 255
+
+
+def crop_rect(rois, frame_shape, margin=0):
+    """
+    Bounding rectangle of all ROIs plus margin, clipped to the frame.
+    Returns (x1, y1, x2, y2) usable as frame[y1:y2, x1:x2].
+    """
+    h, w = frame_shape[:2]
+    pts = np.concatenate([np.asarray(roi_to_polygon(r), dtype=np.int64) for r in rois.values()])
+    x1, y1 = pts.min(axis=0) - margin
+    x2, y2 = pts.max(axis=0) + 1 + margin
+    return int(max(x1, 0)), int(max(y1, 0)), int(min(x2, w)), int(min(y2, h))
+
+
+def rect_imgsz(crop_w, crop_h, scale, stride=32):
+    """
+    Rectangle-aware model input size [h, w] for a crop.
+    scale is the resize the full frame would get (e.g. 640 / 1280), so vehicles
+    keep the same pixel size as with full-frame inference and the input area
+    (= inference cost) shrinks with the crop area. Sides round up to the stride.
+
+    Only models that accept any input size use it (pytorch, dynamic exports).
+    Static exports (export_model, onnx / onnx-int8 / openvino) letterbox the
+    crop into their fixed input, so there the crop saves nothing.
+    """
+    def up(v):
+        return max(stride, int(np.ceil(v * scale / stride)) * stride)
+
+    return [up(crop_h), up(crop_w)]
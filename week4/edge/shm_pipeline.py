@@ -0,0 +1,296 @@
+import os
+import queue
+import signal
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+import psutil
+
+
+def attach_shm(name):
+    """Attach to an existing segment without handing it to this process's resource tracker."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # older Pythons: fork children share the owner's tracker, so attaching is harmless
+        return shared_memory.SharedMemory(name=name)
+
+
+class ShmFrameRing:
+    """
+    `slots` fixed-size frames in ONE multiprocessing.shared_memory segment.
+    name=None creates (and later unlinks) the segment, otherwise attaches to it.
+    ring.frames[i] is a zero-copy NumPy view of slot i.
+    """
+
+    def __init__(self, slots, shape, dtype=np.uint8, name=None):
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.owner = name is None
+        nbytes = slots * int(np.prod(shape)) * np.dtype(dtype).itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=nbytes) if self.owner else attach_shm(name)
+        self.frames = np.ndarray((slots, *self.shape), dtype=dtype, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        if self.frames is None:
+            return
+        self.frames = None  # drop our view first, close() fails while views are exported
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a caller still holds a frame view; the mapping goes away with the process
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _ignore_sigint():
+    # Ctrl+C goes to the whole process group; only the main process handles it
+    # and shuts the children down in order.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _orphaned(parent_pid):
+    # main process was killed (no clean stop): do not keep decoding for nobody
+    return os.getppid() != parent_pid
+
+
+def _capture_main(make_reader, ring_name, shape, slots, free_q, ready_q, stop, n_workers, drops, parent_pid):
+    _ignore_sigint()
+    ring = ShmFrameRing(slots, shape, name=ring_name)
+    try:
+        read_frame = make_reader()
+        frame_idx = 0
+        while not stop.is_set() and not _orphaned(parent_pid):
+            item = read_frame()
+            if item is None:
+                break
+            frame = item.pop("frame")
+            idx, frame_idx = frame_idx, frame_idx + 1  # counts skipped frames too, like StagedPipeline
+            try:
+                slot = free_q.get_nowait()
+            except queue.Empty:
+                drops.value += 1  # every slot is still in use downstream: skip this frame
+                continue
+            if frame.shape != ring.shape:
+                free_q.put(slot)
+                drops.value += 1
+                continue
+            ring.frames[slot][...] = frame  # the only copy: decoder buffer -> shared memory
+            item.update(slot=slot, frame_idx=idx, t_capture=time.time())
+            ready_q.put(item)
+    finally:
+        for _ in range(n_workers):
+            ready_q.put(None)
+        ring.close()
+
+
+def _infer_main(make_infer, ring_name, shape, slots, ready_q, free_q, result_q, stop, stale, parent_pid):
+    _ignore_sigint()
+    ring = ShmFrameRing(slots, shape, name=ring_name)
+    pid = os.getpid()
+    try:
+        infer, info = make_infer()
+        result_q.put(("ready", pid, info))
+        while not stop.is_set() and not _orphaned(parent_pid):
+            try:
+                item = ready_q.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            # newest frame wins: hand older waiting slots straight back to capture
+            while True:
+                try:
+                    newer = ready_q.get_nowait()
+                except queue.Empty:
+                    break
+                if newer is None:
+                    ready_q.put(None)  # another worker's stop signal
+                    break
+                free_q.put(item["slot"])
+                with stale.get_lock():  # shared by all inference processes
+                    stale.value += 1
+                item = newer
+
+            item["frame"] = ring.frames[item["slot"]]  # view, no copy
+            result = infer(item)
+            result.pop("frame", None)
+            result["slot"] = item["slot"]
+            result_q.put(("result", pid, result))
+    finally:
+        result_q.put(("done", pid, None))
+        ring.close()
+
+
+class ProcessPipeline:
+    """
+    capture process -> shm ring -> inference process(es) -> main process (publish + display)
+
+    make_reader() runs in the capture process and returns read_frame() (same
+    contract as StagedPipeline). make_infer() runs in each inference process
+    (load the model there) and returns (infer, startup_info).
+    Only slot indices, timestamps and small result dicts cross process
+    boundaries; the main process reads the frame from the ring by slot and
+    must release(slot) when done with it.
+
+    Uses the "fork" start method, so the factories can be closures over the
+    script's config (Linux edge boxes).
+    """
+
+    def __init__(self, make_reader, make_infer, frame_shape, workers=1, slots=None):
+        self.ctx = mp.get_context("fork")
+        self.workers = workers
+        self.slots = slots or 2 * workers + 3
+        self.frame_shape = tuple(frame_shape)
+        self.make_reader = make_reader
+        self.make_infer = make_infer
+
+        self.ring = None
+        self.free_q = self.ctx.Queue()
+        self.ready_q = self.ctx.Queue()
+        self.result_q = self.ctx.Queue()
+        self.stop_event = self.ctx.Event()
+        self.capture_drops = self.ctx.Value("i", 0)
+        self.stale_drops = self.ctx.Value("i", 0)
+
+        self.capture_proc = None
+        self.infer_procs = []
+        self.startup_info = {}
+        self._done = set()
+        self._cpu = {}
+        self._cpu_cache, self._cpu_t = {}, 0.0
+        self._cpu_sum, self._cpu_n = {}, 0
+
+    # ---------- control ----------
+    def start(self, ready_timeout=120):
+        """Start inference processes, wait until their models are warm, then start capture."""
+        self.ring = ShmFrameRing(self.slots, self.frame_shape)
+        for i in range(self.slots):
+            self.free_q.put(i)
+
+        for i in range(self.workers):
+            p = self.ctx.Process(target=_infer_main, name=f"inference-{i}", daemon=True,
+                                 args=(self.make_infer, self.ring.name, self.frame_shape, self.slots,
+                                       self.ready_q, self.free_q, self.result_q, self.stop_event,
+                                       self.stale_drops, os.getpid()))
+            p.start()
+            self.infer_procs.append(p)
+
+        deadline = time.time() + ready_timeout
+        while len(self.startup_info) < self.workers:
+            try:
+                kind, pid, info = self.result_q.get(timeout=0.5)
+            except queue.Empty:
+                if self._child_failed() or time.time() > deadline:
+                    raise RuntimeError("Inference process failed to start (see its traceback above)")
+                continue
+            if kind == "ready":
+                self.startup_info[pid] = info
+
+        self.capture_proc = self.ctx.Process(target=_capture_main, name="capture", daemon=True,
+                                             args=(self.make_reader, self.ring.name, self.frame_shape,
+                                                   self.slots, self.free_q, self.ready_q, self.stop_event,
+                                                   self.workers, self.capture_drops, os.getpid()))
+        self.capture_proc.start()
+
+        self._cpu = {"main": psutil.Process()}
+        self._cpu["capture"] = psutil.Process(self.capture_proc.pid)
+        for p in self.infer_procs:
+            self._cpu[p.name] = psutil.Process(p.pid)
+        for proc in self._cpu.values():
+            proc.cpu_percent(None)
+
+    def get(self, timeout=0.1):
+        """Next result dict (with "slot"), or None on timeout / when finished."""
+        while True:
+            try:
+                kind, pid, result = self.result_q.get(timeout=timeout)
+            except queue.Empty:
+                if self._child_failed():
+                    self.stop()
+                return None
+            if kind == "result":
+                return result
+            if kind == "done":
+                self._done.add(pid)
+
+    def frame(self, slot):
+        return self.ring.frames[slot]
+
+    def release(self, slot):
+        self.free_q.put(slot)
+
+    def is_running(self):
+        return not self.stop_event.is_set() and len(self._done) < self.workers
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self, timeout=5):
+        """Stop, wait for the children (terminate stragglers) and remove the shm segment."""
+        self.stop()
+        procs = ([self.capture_proc] if self.capture_proc else []) + self.infer_procs
+        deadline = time.time() + timeout
+        for p in procs:
+            p.join(max(0.0, deadline - time.time()))
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+                p.join(1)
+        for q in (self.free_q, self.ready_q, self.result_q):
+            q.cancel_join_thread()  # never block exit on undelivered queue items
+            q.close()
+        if self.ring is not None:
+            self.ring.close()
+
+    def _child_failed(self):
+        return bool(self.failed())
+
+    def failed(self):
+        """Names of child processes that died with an error (or were killed)."""
+        procs = ([self.capture_proc] if self.capture_proc else []) + self.infer_procs
+        return [f"{p.name} (exit {p.exitcode})" for p in procs if p.exitcode not in (None, 0)]
+
+    # ---------- stats ----------
+    def stats(self):
+        try:
+            depth = self.ready_q.qsize()
+        except NotImplementedError:  # macOS
+            depth = 0
+        return {
+            "frame_q_depth": depth,
+            "frame_q_drops": self.capture_drops.value + self.stale_drops.value,
+            "result_q_depth": 0,
+            "result_q_drops": 0,
+        }
+
+    def cpu_percent(self, every_s=1.0):
+        """Per-process CPU % (100 = one core), sampled at most every every_s seconds."""
+        now = time.time()
+        if now - self._cpu_t >= every_s:
+            self._cpu_t = now
+            cpu = {}
+            for name, proc in self._cpu.items():
+                try:
+                    cpu[name] = proc.cpu_percent(None)
+                except psutil.NoSuchProcess:
+                    cpu[name] = 0.0
+            self._cpu_cache = cpu
+            self._cpu_n += 1
+            for name, v in cpu.items():
+                self._cpu_sum[name] = self._cpu_sum.get(name, 0.0) + v
+        return self._cpu_cache
+
+    def cpu_summary(self):
+        """Mean CPU % per process over the run."""
+        n = max(self._cpu_n, 1)
+        return {name: round(v / n, 1) for name, v in self._cpu_sum.items()}
@@ -0,0 +1,79 @@
+import csv
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+# Columns of the startup CSV, in order, for every mode: a phase a mode does not
+# have (e.g. workers_ready outside process mode) stays blank, so switching modes
+# never changes the header and the cold-start history stays in one file.
+CSV_PHASES = ("imports", "runtime_import", "model_load", "first_frame", "warmup", "workers_ready")
+
+
+class StartupTimer:
+    """
+    Wall time of each startup phase (imports, model load, warm-up, first frame ...).
+    t0 should be taken as early as possible in the process (before the heavy imports).
+    """
+
+    def __init__(self, t0=None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - t) * 1000.0
+
+    def mark(self, name, start, end):
+        """Record a phase timed before the timer existed (e.g. module imports)."""
+        self.phases[name] = (end - start) * 1000.0
+
+    def total_ms(self):
+        return (time.perf_counter() - self.t0) * 1000.0
+
+    def summary(self):
+        parts = ", ".join(f"{k} {v:.0f} ms" for k, v in self.phases.items())
+        return f"{self.total_ms():.0f} ms total ({parts})"
+
+    def append_csv(self, path, **info):
+        """One row per run, so cold-start regressions show up across reboots."""
+        row = {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), **info}
+        phases = list(CSV_PHASES) + [k for k in self.phases if k not in CSV_PHASES]
+        row.update({f"{k}_ms": round(self.phases[k], 1) if k in self.phases else "" for k in phases})
+        row["total_ms"] = round(self.total_ms(), 1)
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            with open(path, newline="") as f:
+                header = next(csv.reader(f), [])
+            if header != list(row):
+                backup = path.with_name(f"{path.stem}_{int(path.stat().st_mtime)}{path.suffix}")
+                path.rename(backup)
+        write_header = not path.exists()
+        with open(path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(row))
+            if write_header:
+                writer.writeheader()
+            writer.writerow(row)
+
+
+def warm_up(model, shape, imgsz, conf, classes=None, runs=3):
+    """
+    Run a few inferences on a dummy (gray) image so lazy init, memory pools and
+    kernel selection happen before the measured loop. shape = the (h, w, 3) the
+    loop will actually feed (e.g. the ROI crop), so the letterboxed size matches.
+    Returns the per-run latencies in ms.
+    """
+    dummy = np.full(shape, 114, dtype=np.uint8)
+    times = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        model.detect(dummy, imgsz, conf, classes)
+        times.append((time.perf_counter() - t) * 1000.0)
+    return times
@@ -0,0 +1,252 @@
+import time
+from collections import deque
+
+import numpy as np
+
+
+def iou_matrix(a, b):
+    """IoU between every box in a (N, 4) and b (M, 4), xyxy."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def greedy_match(iou, thresh):
+    """Pairs (track_i, det_j) by descending IoU, each used once. Good enough for < 100 boxes."""
+    pairs = []
+    if iou.size == 0:
+        return pairs
+    order = np.dstack(np.unravel_index(np.argsort(-iou, axis=None), iou.shape))[0]
+    used_t, used_d = set(), set()
+    for i, j in order:
+        if iou[i, j] < thresh:
+            break
+        if i in used_t or j in used_d:
+            continue
+        used_t.add(i)
+        used_d.add(j)
+        pairs.append((i, j))
+    return pairs
+
+
+def center_similarity(a, b):
+    """1 - (center distance / track box diagonal), so 0 means "one box size away"."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    ca = (a[:, :2] + a[:, 2:]) / 2
+    cb = (b[:, :2] + b[:, 2:]) / 2
+    diag = np.hypot(a[:, 2] - a[:, 0], a[:, 3] - a[:, 1])
+    dist = np.hypot(ca[:, None, 0] - cb[None, :, 0], ca[:, None, 1] - cb[None, :, 1])
+    return 1.0 - dist / np.maximum(diag[:, None], 1.0)
+
+
+def xyxy_to_state(xyxy):
+    cx = (xyxy[:, 0] + xyxy[:, 2]) / 2
+    cy = (xyxy[:, 1] + xyxy[:, 3]) / 2
+    return np.column_stack([cx, cy, xyxy[:, 2] - xyxy[:, 0], xyxy[:, 3] - xyxy[:, 1]])
+
+
+def segments_cross(p1, p2, a, b):
+    """Vectorized: does segment p1->p2 (N, 2) cross segment a->b? Returns (crossed, side_after)."""
+    d = b - a
+
+    def side(p):
+        return np.sign(d[0] * (p[:, 1] - a[1]) - d[1] * (p[:, 0] - a[0]))
+
+    s1, s2 = side(p1), side(p2)
+    move = p2 - p1
+    # and the stop line's end points must be on opposite sides of the movement
+    e1 = np.sign(move[:, 0] * (a[1] - p1[:, 1]) - move[:, 1] * (a[0] - p1[:, 0]))
+    e2 = np.sign(move[:, 0] * (b[1] - p1[:, 1]) - move[:, 1] * (b[0] - p1[:, 0]))
+    crossed = (s1 != 0) & (s2 != 0) & (s1 != s2) & (e1 != e2)
+    return crossed, s2
+
+
+class Tracker:
+    """
+    Multi-object tracker: constant-velocity Kalman filter per box + greedy IoU matching.
+    All tracks are filtered together with batched NumPy matrices.
+
+    State per track: [cx, cy, w, h, vx, vy] (velocity in px/s, so predict() works
+    with any dt and can extrapolate boxes on frames where the detector did not run).
+    """
+
+    def __init__(self, iou_thresh=0.3, max_misses=3, min_hits=2):
+        self.iou_thresh = iou_thresh
+        self.max_misses = max_misses  # detector runs a track may go unmatched
+        self.min_hits = min_hits      # matches before a track counts for crossings
+        self.next_id = 1
+
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.x = np.zeros((0, 6))
+        self.P = np.zeros((0, 6, 6))
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.misses = np.zeros(0, dtype=np.int64)
+
+        self.H = np.eye(4, 6)
+        self.R = np.diag([4.0, 4.0, 16.0, 16.0])  # measurement noise (px^2)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ---------- Kalman ----------
+    def predict(self, dt):
+        if len(self) == 0 or dt <= 0:
+            return
+        F = np.eye(6)
+        F[0, 4] = F[1, 5] = dt
+        Q = np.diag([1.0, 1.0, 4.0, 4.0, 100.0, 100.0]) * dt
+        self.x = self.x @ F.T
+        self.P = F @ self.P @ F.T + Q
+        self.x[:, 2:4] = np.maximum(self.x[:, 2:4], 1.0)
+
+    def _correct(self, idx, z):
+        H = self.H
+        P = self.P[idx]
+        y = z - self.x[idx] @ H.T
+        S = H @ P @ H.T + self.R
+        K = P @ H.T @ np.linalg.inv(S)
+        self.x[idx] = self.x[idx] + np.einsum("nij,nj->ni", K, y)
+        self.P[idx] = (np.eye(6) - K @ H) @ P
+
+    # ---------- tracking ----------
+    def update(self, xyxy):
+        """Feed one detector run; call predict(dt) up to this frame first."""
+        xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+        tracks = self.boxes()
+        pairs = greedy_match(iou_matrix(tracks, xyxy), self.iou_thresh)
+
+        # Fast or newly born tracks (velocity still 0) may not overlap their next
+        # detection at all when the detector skips frames: match leftovers by center distance.
+        left_t = np.setdiff1d(np.arange(len(tracks)), [i for i, _ in pairs])
+        left_d = np.setdiff1d(np.arange(len(xyxy)), [j for _, j in pairs])
+        if len(left_t) and len(left_d):
+            sim = center_similarity(tracks[left_t], xyxy[left_d])
+            pairs += [(left_t[i], left_d[j]) for i, j in greedy_match(sim, 0.0)]
+
+        matched_t = np.array([i for i, _ in pairs], dtype=np.int64)
+        matched_d = np.array([j for _, j in pairs], dtype=np.int64)
+        if len(pairs):
+            self._correct(matched_t, xyxy_to_state(xyxy[matched_d]))
+            self.hits[matched_t] += 1
+
+        self.misses += 1
+        self.misses[matched_t] = 0
+
+        new_d = np.setdiff1d(np.arange(len(xyxy)), matched_d)
+        if len(new_d):
+            n = len(new_d)
+            x = np.zeros((n, 6))
+            x[:, :4] = xyxy_to_state(xyxy[new_d])
+            P = np.tile(np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4]), (n, 1, 1))
+            self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + n)])
+            self.next_id += n
+            self.x = np.concatenate([self.x, x])
+            self.P = np.concatenate([self.P, P])
+            self.hits = np.concatenate([self.hits, np.ones(n, dtype=np.int64)])
+            self.misses = np.concatenate([self.misses, np.zeros(n, dtype=np.int64)])
+
+        keep = self.misses <= self.max_misses
+        if not keep.all():
+            self.ids, self.x, self.P = self.ids[keep], self.x[keep], self.P[keep]
+            self.hits, self.misses = self.hits[keep], self.misses[keep]
+
+    def boxes(self):
+        cx, cy, w, h = self.x[:, 0], self.x[:, 1], self.x[:, 2], self.x[:, 3]
+        return np.column_stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+    def centers(self):
+        return self.x[:, :2].copy()
+
+    def active(self):
+        """Tracks seen in the last detector run (what a per-frame count would see)."""
+        return self.misses == 0
+
+    def confirmed(self):
+        return self.hits >= self.min_hits
+
+
+class StopLineCounter:
+    """
+    Counts each confirmed track ONCE when its center crosses a lane's stop line,
+    and turns the crossing times into flow (vehicles/min over a sliding window).
+
+    A vehicle the detector loses near the line comes back as a new track. When a
+    counted track dies, its last center is kept for respawn_s. A crossing by a
+    track born after that death, within half a box of that center, is the same
+    vehicle and is not counted again.
+
+    lines: {lane: ((x1, y1), (x2, y2))}
+    """
+
+    def __init__(self, lines, window_s=60.0, respawn_s=2.0):
+        self.lines = {k: (np.asarray(a, float), np.asarray(b, float)) for k, (a, b) in lines.items()}
+        self.window_s = window_s
+        self.respawn_s = respawn_s
+        self.totals = {lane: 0 for lane in lines}
+        self._events = {lane: deque() for lane in lines}
+        self._prev = {}          # track id -> last center
+        self._counted = set()    # (track id, lane)
+        self._lost = {lane: deque() for lane in lines}  # counted tracks that died: (t, center, first newer id)
+        self._last_id = 0        # highest track id seen so far
+
+    def update(self, tracker, now=None):
+        now = time.time() if now is None else now
+        centers = tracker.centers()
+        ids = tracker.ids
+        confirmed = tracker.confirmed()
+
+        for lane, lost in self._lost.items():
+            while lost and lost[0][0] < now - self.respawn_s:
+                lost.popleft()
+
+        has_prev = np.array([i in self._prev for i in ids], dtype=bool)
+        if has_prev.any():
+            prev = np.array([self._prev[i] for i in ids[has_prev]])
+            cur = centers[has_prev]
+            radius = np.hypot(tracker.x[has_prev, 2], tracker.x[has_prev, 3]) / 2
+            for lane, (a, b) in self.lines.items():
+                crossed, _ = segments_cross(prev, cur, a, b)
+                for k in np.flatnonzero(crossed & confirmed[has_prev]):
+                    tid = int(ids[has_prev][k])
+                    if (tid, lane) in self._counted:
+                        continue
+                    self._counted.add((tid, lane))
+                    if self._respawned(lane, tid, cur[k], radius[k]):
+                        continue
+                    self.totals[lane] += 1
+                    self._events[lane].append(now)
+
+        live = {int(i): c for i, c in zip(ids, centers)}
+        for tid, lane in self._counted:
+            if tid not in live:
+                self._lost[lane].append((now, self._prev[tid], self._last_id + 1))
+        self._prev = live
+        self._counted = {k for k in self._counted if k[0] in live}
+        if len(ids):
+            self._last_id = max(self._last_id, int(ids.max()))
+
+    def _respawned(self, lane, tid, center, radius):
+        """Is this crossing a lost, already counted track coming back? Uses up the match."""
+        lost = self._lost[lane]
+        for k, (_, c, first_id) in enumerate(lost):
+            if tid >= first_id and np.hypot(*(center - c)) <= radius:
+                del lost[k]
+                return True
+        return False
+
+    def flow_per_min(self, now=None):
+        now = time.time() if now is None else now
+        out = {}
+        for lane, ev in self._events.items():
+            while ev and ev[0] < now - self.window_s:
+                ev.popleft()
+            out[lane] = len(ev) * 60.0 / self.window_s
+        return out
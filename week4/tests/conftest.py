@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The edge / bench modules are flat scripts that import each other by name
+WEEK4_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(WEEK4_DIR / "edge"))
+sys.path.append(str(WEEK4_DIR / "bench"))
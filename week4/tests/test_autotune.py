@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+import autotune
+import host_profile
+
+
+def test_static_models_sweep_only_their_export_size():
+    assert autotune.imgsz_candidates(SimpleNamespace(fixed_hw=(640, 640))) == [640]
+    assert autotune.imgsz_candidates(SimpleNamespace(fixed_hw=(384, 640))) == [[384, 640]]
+    assert autotune.imgsz_candidates(SimpleNamespace(fixed_hw=None)) == sorted(autotune.IMGSZ_CANDIDATES,
+                                                                               reverse=True)
+
+
+def test_openvino_has_no_thread_axis(monkeypatch):
+    monkeypatch.setattr(host_profile, "START_AFFINITY", [0, 1, 2, 3])
+    assert autotune.thread_candidates("openvino") == [0]
+    assert autotune.affinity_candidates(0) == [None]
+    assert autotune.thread_candidates("onnx") == [1, 2, 4]
+
+
+def test_threads_and_pinning_follow_the_allowed_cpus(monkeypatch):
+    # e.g. a container limited to cores 2, 3 and 6 of an 8-core box
+    monkeypatch.setattr(host_profile, "START_AFFINITY", [2, 3, 6])
+    assert autotune.thread_candidates("pytorch") == [1, 2, 3]
+    assert autotune.affinity_candidates(2) == [None, [2, 3]]
+    assert autotune.affinity_candidates(3) == [None]
@@ -0,0 +1,28 @@
+from backends import openvino_input_hw
+
+IR = """<?xml version="1.0"?>
+<net name="yolov8n" version="11">
+  <layers>
+    <layer id="0" name="images" type="Parameter" version="opset1">
+      <data shape="{shape}" element_type="f32"/>
+    </layer>
+  </layers>
+</net>
+"""
+
+
+def write_ir(tmp_path, shape):
+    (tmp_path / "yolov8n.xml").write_text(IR.format(shape=shape))
+    return tmp_path
+
+
+def test_openvino_static_input(tmp_path):
+    assert openvino_input_hw(write_ir(tmp_path, "1,3,384,640")) == (384, 640)
+
+
+def test_openvino_dynamic_input(tmp_path):
+    assert openvino_input_hw(write_ir(tmp_path, "?,3,?,?")) is None
+
+
+def test_openvino_missing_ir(tmp_path):
+    assert openvino_input_hw(tmp_path) is None
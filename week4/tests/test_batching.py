@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from batching import batch_class_filter, count_batched
+
+NAMES = {0: "person", 1: "car", 2: "truck", 3: "ambulance"}
+
+
+class FakeBoxes:
+    def __init__(self, rows):
+        self.data = np.array(rows, np.float32).reshape(-1, 6)
+
+    def __len__(self):
+        return len(self.data)
+
+
+class FakeModel:
+    """model.predict() returning canned boxes (x1, y1, x2, y2, conf, cls) per image."""
+
+    names = NAMES
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.classes = []
+
+    def predict(self, source, imgsz, conf, classes, verbose):
+        self.classes.append(classes)
+        return [SimpleNamespace(orig_shape=img.shape, boxes=FakeBoxes(b)) for img, b in zip(source, self.boxes)]
+
+
+def test_filter_is_built_per_model_and_passed_in():
+    images = [np.zeros((100, 100, 3), np.uint8)] * 2
+    model = FakeModel([
+        [(10, 10, 30, 30, 0.9, 1), (40, 40, 60, 60, 0.9, 0), (50, 50, 70, 70, 0.9, 3)],
+        [(10, 10, 30, 30, 0.9, 2), (90, 90, 130, 130, 0.9, 1)],  # second car centred off the image
+    ])
+    counts, emergency, _ = count_batched(model, ["a", "b"], images, batch_class_filter(NAMES))
+    assert counts == {"a": 1, "b": 1} and emergency is False
+    assert sorted(model.classes[0]) == [1, 2]
+
+    counts, emergency, _ = count_batched(model, ["a", "b"], images, batch_class_filter(NAMES, True))
+    assert emergency is True and sorted(model.classes[1]) == [1, 2, 3]
@@ -0,0 +1,112 @@
+import cv2
+import numpy as np
+import pytest
+
+import edge_yolo_trapezium_roi as trap
+from postprocess import Detections, centroids, drop_cut, letterbox_scale, make_class_filter
+from roi_labels import RoiLabelMap
+from stub_detector import StubDetector
+from synthetic_video import lane_bounds, make_video, max_vehicle_px
+
+W, H, LANES = 640, 360, 4
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    video, _ = make_video(tmp_path_factory.mktemp("clip"), W, H, fps=15, seconds=8, lanes=LANES, seed=0)
+    cap = cv2.VideoCapture(str(video))
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def middle_lanes():
+    """Two inner lanes in the lower half: the crop is cut on the left, right and top."""
+    (a1, a2), (b1, b2) = lane_bounds(W, LANES)[1:3]
+    return {"Lane2": [(a1, H // 2), (a2 - 1, H // 2), (a2 - 1, H - 1), (a1, H - 1)],
+            "Lane3": (b1, H // 2, b2 - 1, H - 1)}
+
+
+def lane_counts(frames, crop_to_roi, monkeypatch):
+    rois = middle_lanes()
+    monkeypatch.setattr(trap, "LANE_ROIS", rois)
+    monkeypatch.setattr(trap, "CROP_TO_ROI", crop_to_roi)
+    monkeypatch.setattr(trap, "MAX_VEHICLE_PX", max_vehicle_px(W, LANES))
+    model = StubDetector(latency_ms=0)
+    class_filter = make_class_filter(model.names, trap.VEHICLE_LABELS)
+    label_map = RoiLabelMap(rois, frames[0].shape)
+    crop, imgsz = trap.inference_window(frames[0].shape, model.fixed_hw)
+
+    counts, cut = [], 0
+    for frame in frames:
+        vehicles = trap.detect_vehicles(model, frame, crop, imgsz, class_filter)
+        cx, cy = centroids(vehicles.xyxy.astype(np.int32))
+        counts.append(label_map.counts(cx, cy))
+        x1, y1, x2, y2 = crop
+        cut += len(model.find_boxes(frame[y1:y2, x1:x2])[0]) - len(vehicles.xyxy)
+    return crop, counts, cut
+
+
+def test_crop_counts_match_full_frame(clip, monkeypatch):
+    full_crop, full, _ = lane_counts(clip, False, monkeypatch)
+    crop, cropped, cut = lane_counts(clip, True, monkeypatch)
+    assert full_crop == (0, 0, W, H)
+    x1, y1, x2, y2 = crop
+    assert x1 > 0 and y1 > 0 and x2 < W  # the window really is smaller than the frame
+    assert cut > 0  # and vehicles crossing its edge were seen and dropped
+    assert sum(sum(c.values()) for c in full) > 0
+    assert cropped == full
+
+
+def test_drop_cut_keeps_frame_edges():
+    # crop (10, 20)-(110, 100) of a 100 x 110 frame: left / top are inner edges,
+    # right / bottom are the frame edges
+    dets = Detections(np.array([[0, 30, 20, 40],    # touches inner left edge -> dropped
+                                [30, 0.5, 40, 10],  # touches inner top edge -> dropped
+                                [80, 70, 100, 80],  # touches the frame's right edge -> kept
+                                [30, 30, 40, 40]],  # inside -> kept
+                               dtype=np.float32),
+                      np.ones(4, np.float32), np.array([2, 2, 2, 2], np.int32))
+    kept = drop_cut(dets, (10, 20, 110, 100), (100, 110, 3))
+    assert kept.xyxy.tolist() == [[80, 70, 100, 80], [30, 30, 40, 40]]
+
+
+def test_drop_cut_tolerance_follows_letterbox_scale():
+    # crop (100, 100)-(740, 460) of a 1280 x 720 frame, all four edges inner
+    crop, shape = (100, 100, 740, 460), (720, 1280, 3)
+    dets = Detections(np.array([[1.5, 50, 60, 120],       # 1.5 px inside the left edge
+                                [200, 50, 638, 120],      # 2 px inside the right edge
+                                [200, 1, 260, 80],        # 1 px inside the top edge
+                                [300, 300, 360, 356.5],   # 3.5 px inside the bottom edge
+                                [300, 150, 360, 250]],    # well inside
+                               dtype=np.float32),
+                      np.ones(5, np.float32), np.full(5, 2, np.int32))
+
+    # input at the crop's own size: 2 px, the box 3.5 px inside still counts
+    assert letterbox_scale(640, 360, [384, 640]) == 1.0
+    kept = drop_cut(dets, crop, shape, [384, 640])
+    assert kept.xyxy.tolist() == [[300, 300, 360, 356.5], [300, 150, 360, 250]]
+
+    # crop letterboxed down to half size: the edge is only good to 4 crop px
+    assert letterbox_scale(640, 360, 320) == 0.5
+    kept = drop_cut(dets, crop, shape, 320)
+    assert kept.xyxy.tolist() == [[300, 150, 360, 250]]
+
+
+def test_inference_window_clears_drop_cut_tolerance(monkeypatch):
+    # a lane-sized box at the ROI edge must not be dropped, whatever the scale
+    monkeypatch.setattr(trap, "LANE_ROIS", {"Lane": (500, 300, 700, 500)})
+    monkeypatch.setattr(trap, "CROP_TO_ROI", True)
+    monkeypatch.setattr(trap, "MAX_VEHICLE_PX", 100)
+    for fixed_hw in (None, (320, 320)):
+        crop, imgsz = trap.inference_window((1080, 1920, 3), fixed_hw)
+        x1, y1, _, _ = crop
+        # centered on the ROI corner, MAX_VEHICLE_PX wide, in crop coordinates
+        box = np.array([[450 - x1, 250 - y1, 550 - x1, 350 - y1]], np.float32)
+        dets = Detections(box, np.ones(1, np.float32), np.full(1, 2, np.int32))
+        assert len(drop_cut(dets, crop, (1080, 1920, 3), imgsz).xyxy) == 1
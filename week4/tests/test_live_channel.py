@@ -0,0 +1,91 @@
+import json
+import threading
+
+import pytest
+
+from live_channel import JsonMirror, LiveCountsReader, LiveCountsWriter
+
+LANES = ["North", "East", "South", "West"]
+
+
+@pytest.fixture
+def channel(tmp_path):
+    writer = LiveCountsWriter(tmp_path / "live.bin", LANES)
+    reader = LiveCountsReader(tmp_path / "live.bin", retries=50)
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def test_round_trip(channel):
+    writer, reader = channel
+    assert reader.read() is None  # nothing published yet
+    seq = writer.publish(1.5, {"North": 3, "West": 1}, emergency=True, flow={"East": 12.5}, wall=100.0)
+    rec = reader.read()
+    assert rec == {"seq": seq, "t": 1.5, "wall": 100.0, "emergency": True,
+                   "counts": {"North": 3, "East": 0, "South": 0, "West": 1},
+                   "flow": {"North": 0.0, "East": 12.5, "South": 0.0, "West": 0.0}}
+
+
+def test_wait_new_sees_each_new_record(channel):
+    writer, reader = channel
+    writer.publish(1.0, {"North": 1})
+    assert reader.wait_new(timeout=0.5)["counts"]["North"] == 1
+    assert reader.wait_new(timeout=0.05) is None  # nothing newer
+    writer.publish(2.0, {"North": 2})
+    assert reader.wait_new(timeout=0.5)["counts"]["North"] == 2
+
+
+def test_torn_payload_with_even_seq_is_rejected(channel):
+    # what a reader on a weakly ordered CPU can observe: the seq says "complete",
+    # the payload bytes are partly from another write
+    writer, reader = channel
+    writer.publish(1.0, {"North": 5})
+    writer._mm[writer._payload_off + 20] ^= 0xFF
+    with pytest.raises(RuntimeError, match="consistent record"):
+        reader.read()
+
+
+def test_concurrent_reads_are_never_torn(channel):
+    writer, reader = channel
+    reader.retries = 100000
+    stop = threading.Event()
+
+    def write():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            writer.publish(float(i), {lane: i for lane in LANES}, flow={lane: float(i) for lane in LANES})
+
+    th = threading.Thread(target=write)
+    th.start()
+    try:
+        for _ in range(2000):
+            rec = reader.read()
+            if rec is None:
+                continue
+            i = int(rec["t"])
+            assert set(rec["counts"].values()) == {i} and set(rec["flow"].values()) == {float(i)}
+    finally:
+        stop.set()
+        th.join()
+
+
+def test_reader_follows_a_new_lane_layout(tmp_path):
+    path = tmp_path / "live.bin"
+    LiveCountsWriter(path, ["A"]).publish(1.0, {"A": 1})
+    reader = LiveCountsReader(path)
+    assert reader.read()["counts"] == {"A": 1}
+    LiveCountsWriter(path, ["A", "B"]).publish(2.0, {"B": 4})
+    assert reader.wait_new(timeout=0.5)["counts"] == {"A": 0, "B": 4}
+
+
+def test_json_mirror_is_rate_limited_and_atomic(tmp_path):
+    path = tmp_path / "live_counts.json"
+    mirror = JsonMirror(path, every_s=60.0)
+    assert mirror.write({"n": 1})
+    assert not mirror.write({"n": 2})  # within every_s: skipped
+    assert json.loads(path.read_text()) == {"n": 1}
+    assert mirror.write({"n": 3}, force=True)
+    assert json.loads(path.read_text()) == {"n": 3}
+    assert [p.name for p in tmp_path.iterdir()] == ["live_counts.json"]  # no temp file left
@@ -0,0 +1,78 @@
+import csv
+
+import numpy as np
+import pytest
+
+from metrics_ring import MetricsRing, Rollups, load_run
+
+DTYPE = [("frame_idx", "i4"), ("t", "f8"), ("latency_ms", "f4"), ("ran", "i1"), ("count", "i2")]
+FPS = 15
+
+
+def fill(ring, seconds, every=1):
+    """FPS frames per second; only every `every`-th frame is logged (LOG_EVERY_N_FRAMES)."""
+    for i in range(seconds * FPS):
+        if i % every == 0:
+            ring.append({"frame_idx": i, "t": i / FPS, "latency_ms": float(i % 10), "ran": i % 2,
+                         "count": i % 7})
+    return (seconds * FPS - 1) / FPS  # time of the last frame
+
+
+def make(tmp_path, capacity=4096, block=64, **kwargs):
+    ring = MetricsRing(tmp_path / "run", DTYPE, capacity=capacity, block=block)
+    rollups = Rollups(ring, tmp_path / "rollups.csv", "t", latency=("latency_ms",), counts=("count",),
+                      **kwargs)
+    return ring, rollups
+
+
+@pytest.mark.parametrize("every", [1, 5])
+def test_fps_counts_frames_not_logged_rows(tmp_path, every):
+    ring, rollups = make(tmp_path, frame_field="frame_idx")
+    now = fill(ring, 20, every)
+    for window in (1, 10):
+        out = rollups.compute(window, now)
+        assert out["fps"] == pytest.approx(FPS, abs=0.2)
+        assert out["frames"] == pytest.approx(window * FPS / every, abs=1)
+
+
+def test_fps_without_frame_field_is_rows_per_second(tmp_path):
+    ring, rollups = make(tmp_path)
+    now = fill(ring, 20, every=5)
+    assert rollups.compute(10, now)["fps"] == pytest.approx(FPS / 5, abs=0.2)
+
+
+def test_window_statistics(tmp_path):
+    ring, rollups = make(tmp_path, only_if={"latency_ms": "ran"}, frame_field="frame_idx")
+    now = fill(ring, 20)
+    rows = ring.recent()
+    rows = rows[rows["t"] > now - 10]
+    out = rollups.compute(10, now)
+    lat = rows["latency_ms"][rows["ran"] > 0]
+    assert out["latency_ms_mean"] == round(float(lat.mean()), 2)
+    assert out["latency_ms_p95"] == round(float(np.percentile(lat, 95)), 2)
+    assert out["latency_ms_max"] == lat.max()
+    assert (out["count_min"], out["count_max"], out["count_last"]) == (0, 6, rows["count"][-1])
+
+
+def test_since_copies_only_the_tail_across_wraparound(tmp_path):
+    ring, _ = make(tmp_path, capacity=128, block=32)
+    now = fill(ring, 20)  # 300 rows through a 128-row ring
+    tail = ring.since("t", now - 1.0)
+    assert len(tail) == FPS and list(tail["frame_idx"]) == list(range(300 - FPS, 300))
+    with_prev = ring.since("t", now - 1.0, before=1)
+    assert with_prev["frame_idx"][0] == 300 - FPS - 1
+    assert len(ring.since("t", -1.0)) == 128  # never more than the ring holds
+
+
+def test_update_writes_due_windows_and_blocks_reach_disk(tmp_path):
+    ring, rollups = make(tmp_path, windows=(1, 10), frame_field="frame_idx")
+    for i in range(20 * FPS):
+        ring.append({"frame_idx": i, "t": i / FPS, "latency_ms": 1.0, "ran": 1, "count": 2})
+        rollups.update(i / FPS)
+    ring.close()
+    rollups.close()
+    with open(tmp_path / "rollups.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert sum(r["window_s"] == "1" for r in rows) == 19
+    assert sum(r["window_s"] == "10" for r in rows) == 1
+    assert list(load_run(tmp_path / "run")["frame_idx"]) == list(range(20 * FPS))
@@ -0,0 +1,60 @@
+import itertools
+import time
+
+import pytest
+
+from pipeline import StagedPipeline
+
+
+def read_counter():
+    frames = itertools.count()
+
+    def read_frame():
+        time.sleep(0.001)
+        return {"frame": next(frames)}
+    return read_frame
+
+
+def drain(pipe):
+    pipe.start()
+    deadline = time.time() + 5
+    while pipe.is_running() and time.time() < deadline:
+        pipe.display_q.get(timeout=0.1)
+    assert not pipe.is_running()
+
+
+def test_infer_error_stops_pipeline_and_reraises():
+    def infer(item):
+        if item["frame_idx"] == 10:
+            raise ValueError("bad frame")
+        return item
+
+    pipe = StagedPipeline(read_counter(), infer, lambda result, stats: None)
+    drain(pipe)
+    with pytest.raises(ValueError, match="bad frame"):
+        pipe.join(timeout=2)
+    assert pipe.stop_event.is_set()
+
+
+def test_publish_error_stops_pipeline_and_reraises():
+    def publish(result, stats):
+        raise OSError("sink gone")
+
+    pipe = StagedPipeline(read_counter(), lambda item: item, publish)
+    drain(pipe)
+    with pytest.raises(OSError, match="sink gone"):
+        pipe.join(timeout=2)
+
+
+def test_end_of_stream_joins_cleanly():
+    frames = iter(range(20))
+    published = []
+
+    def read_frame():
+        f = next(frames, None)
+        return None if f is None else {"frame": f}
+
+    pipe = StagedPipeline(read_frame, lambda item: item, lambda result, stats: published.append(result))
+    drain(pipe)
+    pipe.join(timeout=2)
+    assert published and published[-1]["frame_idx"] <= 19
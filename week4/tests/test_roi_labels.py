@@ -0,0 +1,76 @@
+import cv2
+import numpy as np
+
+from roi_labels import RoiLabelMap
+
+W, H = 64, 48
+QUADRANTS = {  # count_rois.py layout: neighbours share the w // 2 and h // 2 lines
+    "North": (0, 0, W // 2, H // 2),
+    "South": (0, H // 2, W // 2, H),
+    "East": (W // 2, 0, W, H // 2),
+    "West": (W // 2, H // 2, W, H),
+}
+
+
+def test_rect_membership_includes_boundary():
+    m = RoiLabelMap({"a": (10, 5, 20, 15)}, (H, W, 3))
+    cx = np.array([10, 20, 15, 9, 21, 15, 15])
+    cy = np.array([5, 15, 10, 10, 10, 4, 16])
+    assert m.counts(cx, cy) == {"a": 3}
+
+
+def test_shared_edge_goes_to_later_roi_only():
+    m = RoiLabelMap(QUADRANTS, (H, W, 3))
+    names = m.names
+    # on the vertical edge x = W // 2 (North / East), on the horizontal edge
+    # y = H // 2 (North / South) and on the corner shared by all four
+    cx = np.array([W // 2, 5, W // 2])
+    cy = np.array([5, H // 2, H // 2])
+    ids = m.assign(cx, cy)
+    assert [names[i - 1] for i in ids] == ["East", "South", "West"]
+    # every point counted exactly once (the per-ROI loop counted 2, 2 and 4)
+    assert sum(m.counts(cx, cy).values()) == len(cx)
+
+
+def test_non_shared_points_match_per_roi_loop():
+    m = RoiLabelMap(QUADRANTS, (H, W, 3))
+    ys, xs = np.mgrid[0:H, 0:W]
+    cx, cy = xs.ravel(), ys.ravel()
+    on_edge = (cx == W // 2) | (cy == H // 2)
+    expected = {name: int(np.sum((x1 <= cx) & (cx <= x2) & (y1 <= cy) & (cy <= y2) & ~on_edge))
+                for name, (x1, y1, x2, y2) in QUADRANTS.items()}
+    assert m.counts(cx[~on_edge], cy[~on_edge]) == expected
+
+
+def test_polygon_matches_point_polygon_test():
+    trapezium = [(20, 5), (44, 5), (60, 45), (4, 45)]
+    m = RoiLabelMap({"lane": trapezium}, (H, W, 3))
+    contour = np.array(trapezium, dtype=np.int32).reshape(-1, 1, 2)
+    expected = np.array([[cv2.pointPolygonTest(contour, (float(x), float(y)), False) >= 0
+                          for x in range(W)] for y in range(H)])
+    assert np.array_equal(m.labels == 1, expected)
+
+
+def test_off_frame_points_are_unassigned():
+    m = RoiLabelMap({"all": (0, 0, W - 1, H - 1)}, (H, W, 3))
+    assert list(m.assign([-1, W, 3], [3, 3, H])) == [0, 0, 0]
+
+
+def test_count_overlaps_matches_per_roi_loop_everywhere():
+    m = RoiLabelMap(QUADRANTS, (H, W, 3), count_overlaps=True)
+    ys, xs = np.mgrid[0:H, 0:W]
+    cx, cy = xs.ravel(), ys.ravel()
+    expected = {name: int(np.sum((x1 <= cx) & (cx <= x2) & (y1 <= cy) & (cy <= y2)))
+                for name, (x1, y1, x2, y2) in QUADRANTS.items()}
+    assert m.counts(cx, cy) == expected
+    # the shared corner is in all four quadrants, as count_rois.py always counted it
+    assert m.counts([W // 2], [H // 2]) == {name: 1 for name in QUADRANTS}
+    assert np.array_equal(m.mask("East") > 0, (xs >= W // 2) & (ys <= H // 2))
+
+
+def test_count_overlaps_many_rois():
+    rois = {f"r{i}": (i, 0, i + 10, H - 1) for i in range(20)}  # 20 overlapping strips: uint32 masks
+    m = RoiLabelMap(rois, (H, W, 3), count_overlaps=True)
+    assert m.labels.dtype == np.uint32
+    counts = m.counts(np.arange(W), np.full(W, 5))
+    assert counts == {f"r{i}": 11 for i in range(20)}
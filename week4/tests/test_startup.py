@@ -0,0 +1,25 @@
+import csv
+
+from startup import CSV_PHASES, StartupTimer
+
+
+def test_modes_share_one_startup_csv(tmp_path):
+    path = tmp_path / "startup.csv"
+
+    serial = StartupTimer()
+    for name in ("imports", "runtime_import", "model_load", "first_frame", "warmup"):
+        serial.phases[name] = 10.0
+    serial.append_csv(path, mode="serial", backend="onnx")
+
+    processes = StartupTimer()
+    for name in ("imports", "first_frame", "workers_ready"):
+        processes.phases[name] = 20.0
+    processes.append_csv(path, mode="processes", backend="onnx")
+
+    assert [p.name for p in tmp_path.iterdir()] == ["startup.csv"]  # no rotated copy
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["mode"] for r in rows] == ["serial", "processes"]
+    assert [f"{p}_ms" for p in CSV_PHASES] == [k for k in rows[0] if k.endswith("_ms")][:len(CSV_PHASES)]
+    assert rows[0]["workers_ready_ms"] == "" and rows[0]["warmup_ms"] == "10.0"
+    assert rows[1]["model_load_ms"] == "" and rows[1]["workers_ready_ms"] == "20.0"